@@ -0,0 +1,94 @@
+"""
+Compare the memory used by the wide, long and sparse layouts of the run table
+on a synthetic project shaped like a real one: every run logs a handful of
+common metrics, and hundreds of other keys are logged only by a few runs.
+
+Usage::
+
+    python benchmarks/layout_memory.py --runs 5000 --rare-keys 800
+"""
+
+from typing import List, Dict, Any
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from wandb_utils.layout import (
+    flatten_record,
+    long_from_records,
+    sparse_from_records,
+)
+
+
+def synthetic_records(
+    num_runs: int,
+    common_keys: int,
+    rare_keys: int,
+    rare_per_run: int,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    records = []
+
+    for i in range(num_runs):
+        summary = {f"metric_{k}": rng.random() for k in range(common_keys)}
+
+        for k in rng.choice(rare_keys, size=rare_per_run, replace=False):
+            summary[f"rare_{k}"] = rng.random()
+        records.append(
+            {
+                "run": f"run{i}",
+                "run_name": f"name-{i}",
+                "entity": "entity",
+                "project": "project",
+                "path": f"entity/project/run{i}",
+                "tags": ["model@m", f"dataset@d{i % 7}"],
+                "sweep": f"sweep{i % 50}",
+                "sweep_name": f"sweep-{i % 50}",
+                "config": {"lr": 10.0 ** -rng.integers(1, 5), "seed": i},
+                "summary": summary,
+            }
+        )
+
+    return records
+
+
+def wide_from_records(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    return pd.DataFrame.from_records([flatten_record(r) for r in records])
+
+
+def measure(name: str, build: Any, records: List[Dict[str, Any]]) -> None:
+    start = time.perf_counter()
+    df = build(records)
+    elapsed = time.perf_counter() - start
+    memory = df.memory_usage(deep=True).sum() / 2**20
+    print(
+        f"{name:<8}{df.shape[0]:>10}{df.shape[1]:>8}"
+        f"{memory:>12.1f}{elapsed:>10.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5000)
+    parser.add_argument("--common-keys", type=int, default=20)
+    parser.add_argument("--rare-keys", type=int, default=800)
+    parser.add_argument("--rare-per-run", type=int, default=10)
+    args = parser.parse_args()
+    records = synthetic_records(
+        args.runs, args.common_keys, args.rare_keys, args.rare_per_run
+    )
+    print(
+        f"{'layout':<8}{'rows':>10}{'cols':>8}{'memory MB':>12}{'time s':>10}"
+    )
+
+    for name, build in [
+        ("wide", wide_from_records),
+        ("long", long_from_records),
+        ("sparse", sparse_from_records),
+    ]:
+        measure(name, build, records)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,14 @@ from typing import List, Tuple, Union, Dict, Any, Optional
 import pathlib
 import logging
 import pandas as pd
-from wandb_utils.misc import all_data_df, write_df
+from wandb_utils.misc import (
+    all_data_df,
+    write_df,
+    iter_run_records,
+    RunStream,
+)
 import wandb
+from wandb_utils.layout import index_and_select, is_long, LONG_QUERY_ERROR
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +26,23 @@ def get_all_data(
     filters: Optional[Dict] = None,
     skip_writing: bool = False,
     df: pd.DataFrame = None,
+    layout: str = "wide",
+    lazy_summary: bool = False,
 ) -> pd.DataFrame:
     assert entity is not None
     assert project is not None
-    df = all_data_df(entity, project, sweep, api, filters=filters)
+    df = all_data_df(
+        entity,
+        project,
+        sweep,
+        api,
+        filters=filters,
+        layout=layout,
+        lazy_summary=lazy_summary,
+    )
+
+    if df_filter and is_long(df):
+        raise ValueError(LONG_QUERY_ERROR.format(option="df_filter"))
 
     if df_filter:
         logger.info(f"Filtering using {filter}")
@@ -36,14 +55,29 @@ def get_all_data(
         else:
             df = df.query(df_filter, engine="python")
 
-    if index:
-        df = df.set_index(index)
-
-        if fields and index in fields:
-            fields.remove(index)
-
-    if fields:
-        df = df[list(fields)]
+    df = index_and_select(df, index, fields)
     write_df(df, output_file, skip_writing)
 
     return df
+
+
+def stream_all_data(
+    api: wandb.PublicApi,
+    entity: Optional[str],
+    project: Optional[str],
+    sweep: Optional[str],
+    filters: Optional[Dict] = None,
+) -> RunStream:
+    """
+    Same as `get_all_data` without the DataFrame level options, but does not
+    fetch anything until the returned stream is consumed.
+    """
+    assert entity is not None
+    assert project is not None
+
+    return RunStream(
+        lambda: iter_run_records(entity, project, sweep, api, filters),
+        lambda: get_all_data(
+            api, entity, project, sweep, filters=filters, skip_writing=True
+        ),
+    )
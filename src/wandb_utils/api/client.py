@@ -23,6 +23,14 @@ import json
 import click_config_file
 import pathlib
 from wandb_utils.file_filter import FileFilter, GlobBasedFileFilter
+from wandb_utils.governor import govern_api
+from wandb_utils.transfer import (
+    download_files,
+    TransferReport,
+    DEFAULT_JOBS,
+    listing_cache,
+    run_files,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,7 +44,7 @@ class WandbAPIWrapper(object):
     def __init__(
         self, entity: str = None, project: str = None, sweep: str = None
     ):
-        self.api = wandb.Api()  # type:ignore
+        self.api = govern_api(wandb.Api())  # type:ignore
         self.entity = entity
         self.project = project
         self.sweep = sweep
@@ -140,25 +148,26 @@ class WandbAPIWrapper(object):
         include_filter: Optional[List[str]] = None,
         exclude_filter: Optional[List[str]] = None,
         overwrite: bool = False,
-    ) -> None:
+        jobs: int = DEFAULT_JOBS,
+    ) -> TransferReport:
         api = self.api
         entity = self.entity
         project = self.project
 
         run_ = api.run(f"{entity}/{project}/{run}")
-        # pbar = tqdm.tqdm(run_.files(), desc="Downloading files")
         output_dir.mkdir(parents=True, exist_ok=overwrite)
 
         ff = GlobBasedFileFilter(
             include_filter=include_filter, exclude_filter=exclude_filter
         )
 
-        for file_ in run_.files():
-
-            if ff(file_):
-                # pbar.set_description(f"Downloading: {file_.name}")
-                logger.debug(f"Downloading: {file_.name}")
-                file_.download(output_dir, replace=overwrite)
+        return download_files(
+            (file_ for file_ in run_files(run_, listing_cache()) if ff(file_)),
+            output_dir,
+            overwrite=overwrite,
+            jobs=jobs,
+            desc=f"Downloading files of {run}",
+        )
 
 
 # alias
@@ -4,7 +4,9 @@ import wandb
 import pandas as pd
 import pathlib
 import sys
-from wandb_utils.api.all_data import get_all_data
+from wandb_utils.api.all_data import get_all_data, stream_all_data
+from wandb_utils.misc import RunStream
+from wandb_utils.layout import LONG_QUERY_ERROR
 from .wandb_utils import (
     pass_api_wrapper,
     pass_api_and_info,
@@ -61,6 +63,23 @@ logger = logging.getLogger(__name__)
     See https://docs.mongodb.com/manual/reference/operator/query/ to learn about all the query operators in MongoDB query.
     """,
 )
+@click.option(
+    "--layout",
+    type=click.Choice(["wide", "long", "sparse"]),
+    default="wide",
+    help="""Layout of the run table. 'wide' has one column per config/summary key.
+    'long' has one (path, key, value) row per key present in a run.
+    'sparse' is wide with sparse config/summary columns.
+    The last two use much less memory for projects that log many keys present only in a few runs. (default: wide)""",
+)
+@click.option(
+    "--lazy-summary",
+    is_flag=True,
+    default=False,
+    help="""Keep only the scalar summary values in the table. Non-scalar values like histograms,
+    tables and media metadata are fetched only when a chained command asks for them
+    (for instance, using `filter-df --load-summary KEY`).""",
+)
 @pass_api_and_info
 @processor
 @config_file_decorator()
@@ -75,8 +94,25 @@ def all_data_command(
     index: str,
     df_filter: str,
     filters: Optional[Dict],
+    layout: str = "wide",
+    lazy_summary: bool = False,
     skip_writing: bool = True,
-) -> pd.DataFrame:
+) -> Union[pd.DataFrame, RunStream]:
+    if layout == "long" and df_filter:
+        raise click.UsageError(
+            LONG_QUERY_ERROR.format(option="--df_filter")
+        )
+
+    if (
+        layout == "wide"
+        and not lazy_summary
+        and not (output_file or fields or index or df_filter)
+    ):
+        # Let the next command decide whether to consume the runs
+        # one at a time or as a DataFrame.
+
+        return stream_all_data(api, entity, project, sweep, filters)
+
     return get_all_data(
         api,
         entity,
@@ -89,4 +125,6 @@ def all_data_command(
         filters,
         skip_writing,
         df,
+        layout,
+        lazy_summary,
     )
@@ -16,6 +16,7 @@ from .wandb_utils import (
 )
 from .all_data import get_all_data
 from wandb_utils.misc import write_df
+from wandb_utils.layout import select_fields, densify
 import logging
 
 logger = logging.getLogger(__name__)
@@ -108,8 +109,9 @@ def find_best_model(
             skip_writing=True,
         )
         if df is None
-        else df[fields]
+        else select_fields(df, fields)
     )
+    df_local = densify(df_local, [metric.name])
     # find best
 
     if metric.maximum:
@@ -20,6 +20,8 @@ from wandb_utils.config import (
     GLOBAL_CONFIG_FILENAME,
     load_commands_config,
 )
+from wandb_utils.file_filter import FileFilter, GlobBasedFileFilter
+from wandb_utils.governor import govern_api
 
 F = TypeVar("F", bound=Callable[..., Any])
 
@@ -84,7 +86,7 @@ class WandbAPIWrapper(object):
     def __init__(
         self, entity: str = None, project: str = None, sweep: str = None
     ):
-        self.api = wandb.Api()  # type:ignore
+        self.api = govern_api(wandb.Api())  # type:ignore
         self.entity = entity
         self.project = project
         self.sweep = sweep
@@ -168,79 +170,40 @@ def processor(f: Callable):
         def processor(df):
             return f(df, *args, **kwargs)
 
+        accepts_stream = getattr(f, "accepts_stream", None)
+        processor.accepts_stream = bool(
+            accepts_stream is not None and accepts_stream(**kwargs)
+        )
+
         return processor
 
     return update_wrapper(new_func, f)
 
 
-def apply_decorators(decorators):
-    def decorator(f):
-        for d in reversed(decorators):
-            f = d(f)
-
-        return f
-
-    return decorator
-
+def accepts_stream(predicate: Callable[..., bool]) -> Callable[[F], F]:
+    """Mark a processor as able to consume a `wandb_utils.misc.RunStream`.
 
-class FileFilter(object):
-    def __call__(
-        self,
-        run: Union[wandb.apis.public.File, pathlib.Path, pathlib.PurePath],
-    ) -> bool:
-        """Whether to take the file or not"""
+    `predicate` is called with the parameters of the command and decides
+    whether this invocation consumes the stream. If it does not, the stream
+    is turned into a DataFrame before calling the processor.
+    """
 
-        return True
+    def decorator(f: F) -> F:
+        f.accepts_stream = predicate  # type: ignore
 
+        return f
 
-class GlobBasedFileFilter(FileFilter):
-    def __init__(
-        self,
-        include_filter: Optional[List[str]] = None,
-        exclude_filter: Optional[List[str]] = None,
-    ):
-        self.allowed_globs = set(include_filter or [])
-        self.not_allowed_globs = set(exclude_filter or [])
+    return decorator
 
-    def match(
-        self,
-        path: Union[pathlib.Path, pathlib.PurePath],
-        globs: List[str],
-    ) -> bool:
 
-        for glob in globs:
-            if path.match(glob):
-                return True
+def apply_decorators(decorators):
+    def decorator(f):
+        for d in reversed(decorators):
+            f = d(f)
 
-        return False
+        return f
 
-    def __call__(
-        self,
-        file_: Union[
-            str, wandb.apis.public.File, pathlib.Path, pathlib.PurePath
-        ],
-    ) -> bool:
-        include_match = True
-        exclude_match = False
-        match = None
-
-        if isinstance(file_, str):
-            file_ = pathlib.PurePath(file_)
-        elif isinstance(file_, wandb.apis.public.File):
-            file_ = pathlib.PurePath(file_.name)
-
-        if self.allowed_globs:
-            include_match = self.match(file_, list(self.allowed_globs))
-
-        if self.not_allowed_globs:
-            exclude_match = self.match(file_, list(self.not_allowed_globs))
-        # 1, 0 => True
-        # 1, 1 => False
-        # 0, 1 => False
-        # 0, 0 => False
-        match = include_match and (not exclude_match)
-
-        return match
+    return decorator
 
 
 class RunFilter(object):
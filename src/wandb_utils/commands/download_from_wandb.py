@@ -13,6 +13,16 @@ from .wandb_utils import (
 )
 from .common import processor
 from wandb_utils.file_filter import FileFilter, GlobBasedFileFilter
+from wandb_utils.transfer import (
+    download_files,
+    download_runs,
+    TransferReport,
+    ContentStore,
+    DEFAULT_JOBS,
+    listing_cache,
+    run_files,
+)
+from wandb_utils.misc import fetch_runs
 import logging
 import tqdm
 import pandas as pd
@@ -31,21 +41,59 @@ def download_run_from_wandb(
     exclude_filter: Optional[List[str]] = None,
     overwrite: bool = False,
     move: bool = False,
-) -> None:
+    jobs: int = DEFAULT_JOBS,
+    sync: bool = False,
+    store: Optional[ContentStore] = None,
+    verify: bool = False,
+) -> TransferReport:
     run_ = api.run(f"{entity}/{project}/{run}")
-    # pbar = tqdm.tqdm(run_.files(), desc="Downloading files")
-    output_dir.mkdir(parents=True, exist_ok=overwrite)
+    output_dir.mkdir(parents=True, exist_ok=overwrite or sync)
 
     ff = GlobBasedFileFilter(
         include_filter=include_filter, exclude_filter=exclude_filter
     )
 
-    for file_ in run_.files():
+    # with sync or verify, the md5s are compared with the local files
+    files_ = run_files(run_, listing_cache(), refresh=sync or verify)
+
+    return download_files(
+        (file_ for file_ in files_ if ff(file_)),
+        output_dir,
+        overwrite=overwrite,
+        jobs=jobs,
+        desc=f"Downloading files of {run}",
+        sync=sync,
+        store=store,
+        verify=verify,
+    )
+
+
+def run_paths(
+    df: pd.DataFrame, entity: Optional[str], project: Optional[str]
+) -> List[str]:
+    """
+    The "entity/project/run_id" path of every row of a run DataFrame.
+    Uses the `path` column (or index), and falls back to the `run` column.
+    """
+
+    if "path" in df.columns:
+        return list(df["path"])
+
+    if df.index.name == "path":
+        return list(df.index)
+
+    if "run" not in df.columns:
+        raise ValueError("The df should have a 'path' or a 'run' column.")
 
-        if ff(file_):
-            # pbar.set_description(f"Downloading: {file_.name}")
-            logger.debug(f"Downloading: {file_.name}")
-            file_.download(output_dir, replace=overwrite)
+    if "entity" in df.columns and "project" in df.columns:
+        return [
+            f"{e}/{p}/{r}"
+            for e, p, r in zip(df["entity"], df["project"], df["run"])
+        ]
+    assert entity is not None
+    assert project is not None
+
+    return [f"{entity}/{project}/{r}" for r in df["run"]]
 
 
 def download_runs_from_wandb(
@@ -54,21 +102,156 @@ def download_runs_from_wandb(
     entity: Optional[str],
     project: Optional[str],
     sweep: Optional[str],
-    output_dir_field: str,
+    output_dir_field: Optional[str],
     include_filter: Optional[List[str]] = None,
     exclude_filter: Optional[List[str]] = None,
+    overwrite: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    output_dir: Optional[pathlib.Path] = None,
+    sync: bool = False,
+    store: Optional[ContentStore] = None,
+    verify: bool = False,
+) -> TransferReport:
+    """
+    Download the files of all the runs in `df`.
+
+    The files of a run are saved in the directory given by its `output_dir_field`
+    column (relative to `output_dir` if given), or in `output_dir/<run id>`.
+    """
+
+    if output_dir_field is None and output_dir is None:
+        raise ValueError("One of output_dir_field or output_dir is needed.")
+    paths = run_paths(df, entity, project)
+
+    if output_dir_field is not None:
+        dirs = [pathlib.Path(d) for d in df[output_dir_field]]
+
+        if output_dir is not None:
+            dirs = [output_dir / d for d in dirs]
+    else:
+        assert output_dir is not None
+        dirs = [output_dir / path.rsplit("/", 1)[-1] for path in paths]
+    logger.info(f"Resolving {len(paths)} runs")
+    runs = fetch_runs(api, paths)
+    report = TransferReport()
+
+    for path in paths:
+        if path not in runs:
+            report.fail(path, ValueError(f"Run {path} not found"))
+    ff = GlobBasedFileFilter(
+        include_filter=include_filter, exclude_filter=exclude_filter
+    )
+
+    return download_runs(
+        [(runs[p], d) for p, d in zip(paths, dirs) if p in runs],
+        ff,
+        overwrite=overwrite,
+        jobs=jobs,
+        report=report,
+        sync=sync,
+        store=store,
+        verify=verify,
+        cache=listing_cache(),
+    )
+
+
+@click.command(name="download-runs")
+@click.option(
+    "-o",
+    "--output_dir",
+    type=click.Path(path_type=pathlib.Path),  # type: ignore
+    help="Directory in which to save the runs. The files of each run are saved in output_dir/runid "
+    "unless --output_dir_field is given.",
+)
+@click.option(
+    "--output_dir_field",
+    type=str,
+    help="Column of the df with the directory for each run (relative to --output_dir if given).",
+)
+@click.option(
+    "--include_filter",
+    multiple=True,
+    type=str,
+    help="Glob string for files to include (can pass multiple). See `glob_filter.py` for details.",
+)
+@click.option(
+    "--exclude_filter",
+    multiple=True,
+    type=str,
+    help="Glob string for Files to exclude (can pass multiple). See `glob_filter.py` for details.",
+)
+@click.option("--overwrite", is_flag=True)
+@click.option(
+    "--sync",
+    is_flag=True,
+    help="Only download the files that are missing locally or whose size or md5 differ from the server.",
+)
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),  # type: ignore
+    help="Directory of a content addressed store. Files with the same md5 are downloaded once "
+    "and hardlinked from the store.",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="Check the md5 of the downloaded and of the existing local files against the server.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    help=f"Number of files to download in parallel across all the runs (default: {DEFAULT_JOBS})",
+)
+@pass_api_and_info
+@processor
+@config_file_decorator()
+def download_runs_command(
+    df: pd.DataFrame,
+    api: wandb.PublicApi,
+    entity: Optional[str],
+    project: Optional[str],
+    sweep: Optional[str],
+    output_dir: Optional[pathlib.Path],
+    output_dir_field: Optional[str],
+    include_filter: Optional[List[str]] = None,
+    exclude_filter: Optional[List[str]] = None,
+    overwrite: bool = False,
+    sync: bool = False,
+    store: Optional[pathlib.Path] = None,
+    verify: bool = False,
+    jobs: int = DEFAULT_JOBS,
 ) -> pd.DataFrame:
-    for row in tqdm.tqdm(df.iterrows(), desc="Downloading runs' files"):
-        download_run_from_wandb(
-            api,
-            entity,
-            project,
-            sweep,
-            row["run"],
-            pathlib.Path(row[output_dir_field]),
-            include_filter,
-            exclude_filter,
+    """
+    Download the files of all the runs in the DataFrame produced by the previous
+    command (for instance, `all-data` or `best-model`).
+    """
+
+    if df is None:
+        raise ValueError(
+            "download-runs should be chained after a command that produces a dataframe of runs"
         )
+    report = download_runs_from_wandb(
+        df,
+        api,
+        entity,
+        project,
+        sweep,
+        output_dir_field,
+        include_filter,
+        exclude_filter,
+        overwrite=overwrite,
+        jobs=jobs,
+        output_dir=output_dir,
+        sync=sync,
+        store=ContentStore(store) if store is not None else None,
+        verify=verify,
+    )
+    report.log_summary()
+    report.raise_for_failures()
+
+    return df
 
 
 @click.command(name="download-run-from-wandb")
@@ -93,6 +276,29 @@ def download_runs_from_wandb(
     help="Glob string for Files to exclude (can pass multiple). See `glob_filter.py` for details.",
 )
 @click.option("--overwrite", is_flag=True)
+@click.option(
+    "--sync",
+    is_flag=True,
+    help="Only download the files that are missing locally or whose size or md5 differ from the server.",
+)
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),  # type: ignore
+    help="Directory of a content addressed store. Files with the same md5 are downloaded once "
+    "and hardlinked from the store.",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="Check the md5 of the downloaded and of the existing local files against the server.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    help=f"Number of files to download in parallel (default: {DEFAULT_JOBS})",
+)
 @pass_api_and_info
 @processor
 @config_file_decorator()
@@ -107,6 +313,10 @@ def download_run_from_wandb_command(
     include_filter: Optional[List[str]] = None,
     exclude_filter: Optional[List[str]] = None,
     overwrite: bool = False,
+    sync: bool = False,
+    store: Optional[pathlib.Path] = None,
+    verify: bool = False,
+    jobs: int = DEFAULT_JOBS,
 ) -> pd.DataFrame:
     """
     Download single run from wandb server.
@@ -114,7 +324,7 @@ def download_run_from_wandb_command(
     RUN is the unique run id.
     """
 
-    return download_run_from_wandb(
+    report = download_run_from_wandb(
         api,
         entity,
         project,
@@ -124,4 +334,12 @@ def download_run_from_wandb_command(
         include_filter,
         exclude_filter,
         overwrite,
+        jobs=jobs,
+        sync=sync,
+        store=ContentStore(store) if store is not None else None,
+        verify=verify,
     )
+    report.log_summary()
+    report.raise_for_failures()
+
+    return df
@@ -17,8 +17,27 @@ from .wandb_utils import (
 )
 import logging
 from wandb_utils.commands.common import GlobBasedFileFilter
-import glob
-import itertools
+from wandb_utils.file_filter import discover_files
+from wandb_utils.misc import fetch_runs
+from wandb_utils.transfer import (
+    download_all,
+    TransferReport,
+    ContentStore,
+    DEFAULT_JOBS,
+    listing_cache,
+    run_files,
+    upload_all,
+    delete_all,
+    move_all,
+    remote_name,
+    split_unchanged,
+    upload_hashes,
+    UploadItem,
+    DownloadItem,
+    ArchiveItem,
+    export_all,
+    rclone_all,
+)
 
 logger = logging.getLogger(__name__)
 from click_option_group import OptionGroup, RequiredAnyOptionGroup
@@ -34,46 +53,96 @@ def files_on_wandb(
     exclude_filter: Optional[List[str]] = None,
     overwrite: bool = False,
     action: Literal["copy", "move", "delete"] = "copy",
-) -> None:
+    jobs: int = DEFAULT_JOBS,
+    sync: bool = False,
+    store: Optional[ContentStore] = None,
+    verify: bool = False,
+    moves: Optional[List[DownloadItem]] = None,
+    exports: Optional[List[ArchiveItem]] = None,
+) -> TransferReport:
+    """
+    Copy, move or delete the files of one run on wandb. Moves are appended to
+    `moves` if it is given (and an empty report is returned), to be done
+    later together with the ones of other runs (see `move_all`), and done
+    right away otherwise. Copies (and moves) are appended to `exports` if it
+    is given, to be written to an archive or streamed to an rclone remote
+    instead of `output_dir` (see `export_all` and `rclone_all`). The files
+    are recorded in the report as `<run id>/<name>`, so that the reports of
+    several runs can be merged.
+    """
     run_ = api.run(f"{entity}/{project}/{run}")
+    export = action in ["copy", "move"] and exports is not None
 
-    if action in ["copy", "move"] and output_dir is None:
+    if action in ["copy", "move"] and output_dir is None and not export:
         raise ValueError("For 'copy' or 'move' output_dir cannot be None")
 
-    if output_dir is not None:
-        output_dir.mkdir(parents=True, exist_ok=overwrite)
+    if output_dir is not None and not export:
+        output_dir.mkdir(parents=True, exist_ok=overwrite or sync)
 
     ff = GlobBasedFileFilter(
         include_filter=include_filter, exclude_filter=exclude_filter
     )
 
-    if action in ["move", "delete"]:
+    cache = listing_cache()
+    # the files to move or delete, and the files whose md5 is compared with
+    # the local files, are listed from the server
+    files_ = (
+        file_
+        for file_ in run_files(
+            run_, cache, refresh=action != "copy" or sync or verify
+        )
+        if ff(file_)
+    )
 
-        def delete(f: wandb.apis.public.File) -> None:
-            logger.debug(f"Deleting {f.name} from wandb server.")
-            f.delete()
+    if export:
+        assert exports is not None
 
-    else:
+        if action == "move" and cache is not None:
+            cache.invalidate(run_)
+        exports.extend((f"{run}/{f.name}", f) for f in files_)
 
-        def delete(f: wandb.apis.public.File) -> None:
-            return None
+        return TransferReport(action="Archived")
 
-    if action in ["move", "copy"]:
+    if action == "move":
+        assert output_dir is not None
 
-        def download(f: wandb.apis.public.File) -> None:
-            logger.debug(f"Downloading: {f.name} to {output_dir}")
-            f.download(output_dir, replace=overwrite)
+        if cache is not None:
+            cache.invalidate(run_)
 
-    else:
+        if moves is not None:
+            moves.extend((f"{run}/{f.name}", f, output_dir) for f in files_)
 
-        def download(f: wandb.apis.public.File) -> None:
-            return None
+            return TransferReport(action="Moved")
 
-    for file_ in run_.files():
+        return move_all(
+            ((f"{run}/{f.name}", f, output_dir) for f in files_),
+            overwrite=overwrite,
+            jobs=jobs,
+            desc=f"Moving files of {run}",
+            store=store,
+        )
 
-        if ff(file_):
-            download(file_)
-            delete(file_)
+    if action == "copy":
+        assert output_dir is not None
+
+        return download_all(
+            ((f"{run}/{f.name}", f, output_dir) for f in files_),
+            overwrite=overwrite,
+            jobs=jobs,
+            desc=f"Downloading files of {run}",
+            sync=sync,
+            store=store,
+            verify=verify,
+        )
+
+    if cache is not None:
+        cache.invalidate(run_)
+
+    return delete_all(
+        ((f"{run}/{f.name}", f) for f in files_),
+        jobs=jobs,
+        desc=f"Deleting files of {run}",
+    )
 
 
 files_input = OptionGroup(
@@ -100,6 +169,7 @@ files_input = OptionGroup(
             1. There should be exactly one space space between +/- and the glob. If neither + nor - are given,
                 we assume it to be +.
             2. There should be no space around the seperator '|'.
+            3. '{run}' in a glob is replaced by the id of the run. With run=df, this selects different files for each run.
         """
     ),
 )
@@ -135,13 +205,60 @@ files_input = OptionGroup(
     "--overwrite",
     default=False,
     is_flag=True,
-    help="What to do when file/folder already exists.",
+    help="What to do when file/folder already exists. "
+    "When uploading, also upload the files that are identical (same md5) on wandb.",
+)
+@click.option(
+    "--sync",
+    default=False,
+    is_flag=True,
+    help="When downloading, skip the files whose local copy has the same size and md5 as the one on wandb.",
+)
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    help="When downloading, directory of a content addressed store. "
+    "Files with the same md5 are downloaded once and hardlinked from the store.",
+)
+@click.option(
+    "--verify",
+    default=False,
+    is_flag=True,
+    help="When downloading, check the md5 of the downloaded and of the existing local files against wandb.",
+)
+@click.option(
+    "--archive",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="When copying from wandb, write the files of all the runs into this .tar or .zip archive "
+    "(as <run id>/<name>) instead of a directory, with an index of the members next to it.",
+)
+@click.option(
+    "--shard-size",
+    type=int,
+    default=None,
+    help="With --archive, split the archive into shards <name>-00000.tar, ... of at most this many MB.",
+)
+@click.option(
+    "--remote",
+    type=str,
+    default=None,
+    help="When copying or moving from wandb, stream the files of all the runs to this rclone destination "
+    "(remote:path, or a local path) as <run id>/<name> with `rclone rcat`, without writing them locally. "
+    "When moving, a file is deleted from wandb once it is streamed and its md5 checked.",
 )
 @click.option(
     "--action",
     type=click.Choice(["move", "copy", "delete"]),
     default="copy",
-    help="Whether to move the file, delete it or copy. Default is copy.",
+    help="Whether to move the file, delete it or copy. Default is copy. "
+    "When moving from wandb, a file is deleted from wandb only after the size and md5 of its local copy are checked.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    help=f"Number of files to download or upload, or of deletion requests, in parallel (default: {DEFAULT_JOBS})",
 )
 @pass_api_and_info
 @processor
@@ -158,7 +275,14 @@ def files_command(
     base_path: Optional[pathlib.Path],
     destination: Literal["wandb", "local"],
     overwrite: bool = False,
+    sync: bool = False,
+    store: Optional[pathlib.Path] = None,
+    verify: bool = False,
+    archive: Optional[pathlib.Path] = None,
+    shard_size: Optional[int] = None,
+    remote: Optional[str] = None,
     action: Literal["move", "copy", "delete"] = "copy",
+    jobs: int = DEFAULT_JOBS,
 ) -> None:
     """
     Add new files to an existing run `run` on wandb or copy files from an existing run to local.
@@ -169,19 +293,49 @@ def files_command(
         a column named 'run'.
     """
 
+    if archive is not None and (destination, action) != ("local", "copy"):
+        raise ValueError(
+            "--archive is only supported with --destination local --action copy"
+        )
+
+    if remote is not None and (
+        destination != "local" or action == "delete" or archive is not None
+    ):
+        raise ValueError(
+            "--remote is only supported with --destination local --action copy or move, "
+            "and without --archive"
+        )
+
+    if action == "delete":
+        report_action = "Deleted"
+    elif destination == "wandb":
+        report_action = "Uploaded"
+    elif action == "move":
+        report_action = "Moved"
+    elif archive is not None:
+        report_action = "Archived"
+    elif remote is not None:
+        report_action = "Streamed"
+    else:
+        report_action = "Downloaded"
+    report = TransferReport(action=report_action)
+    # the uploads, the moves and the exports of all the runs are done
+    # together, see add_files, move_all, export_all and rclone_all
+    uploads: List[UploadItem] = []
+    moves: List[DownloadItem] = []
+    exports: Optional[List[ArchiveItem]] = (
+        [] if archive is not None or remote is not None else None
+    )
+    content_store = ContentStore(store) if store is not None else None
+
     if run == "df":
         if df is None:
             raise ValueError(
                 "If run=df, the previous command should produce a dataframe with column 'run'"
             )
-
-        if destination == "wandb" and action in ["move", "copy"]:
-            raise ValueError(
-                "Options run=df, destination=wandb and action=move or copy are not supported together"
-            )
         try:
-            
-            for idx, row in tqdm.tqdm(df.iterrows(),total=len(df)):
+
+            for idx, row in tqdm.tqdm(df.iterrows(), total=len(df)):
                 process_run(
                     api,
                     entity,
@@ -194,7 +348,15 @@ def files_command(
                     else None,
                     destination=destination,
                     overwrite=overwrite,
+                    sync=sync,
+                    store=content_store,
+                    verify=verify,
                     action=action,
+                    jobs=jobs,
+                    report=report,
+                    uploads=uploads,
+                    moves=moves,
+                    exports=exports,
                 )
         except KeyError as ke:
             if "run" in str(ke):
@@ -211,9 +373,61 @@ def files_command(
             base_path=base_path,
             destination=destination,
             overwrite=overwrite,
+            sync=sync,
+            store=content_store,
+            verify=verify,
             action=action,
+            jobs=jobs,
+            report=report,
+            uploads=uploads,
+            moves=moves,
+            exports=exports,
+        )
+
+    if uploads:
+        add_files(
+            uploads,
+            move=action == "move",
+            jobs=jobs,
+            report=report,
+            api=api,
+            overwrite=overwrite,
         )
 
+    if exports is not None and remote is not None:
+        # "remote:" is the root of the remote
+        prefix = remote if remote.endswith((":", "/")) else f"{remote}/"
+        rclone_all(
+            ((name, file_, f"{prefix}{name}") for name, file_ in exports),
+            delete=action == "move",
+            jobs=jobs,
+            report=report,
+            verify=verify,
+        )
+
+    if exports is not None and archive is not None:
+        export_all(
+            exports,
+            archive,
+            shard_size=shard_size * 1024 * 1024 if shard_size else None,
+            jobs=jobs,
+            report=report,
+            verify=verify,
+        )
+
+    if moves:
+        move_all(
+            moves,
+            overwrite=overwrite,
+            jobs=jobs,
+            report=report,
+            store=content_store,
+        )
+
+    if report.num_files:
+        report.log_summary()
+        report.raise_for_failures()
+
 
 def process_run(
     api: wandb.PublicApi,
@@ -225,8 +439,23 @@ def process_run(
     base_path: Optional[pathlib.Path],
     destination: Literal["wandb", "local"],
     overwrite: bool = False,
+    sync: bool = False,
+    store: Optional[ContentStore] = None,
+    verify: bool = False,
     action: Literal["move", "copy", "delete"] = "copy",
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+    uploads: Optional[List[UploadItem]] = None,
+    moves: Optional[List[DownloadItem]] = None,
+    exports: Optional[List[ArchiveItem]] = None,
 ) -> None:
+    """
+    Transfer the files of one run. Uploads (moves from wandb) are appended to
+    `uploads` (`moves`) if it is given, to be done later together with the
+    ones of other runs (see `add_files` and `move_all`), and done right away
+    otherwise. Copies (and moves) from wandb are appended to `exports` if it
+    is given (see `export_all` and `rclone_all`).
+    """
     logger.debug(f"Processing run {entity}/{project}/{run}")
     glob_wrappers: List[str] = []
 
@@ -238,6 +467,7 @@ def process_run(
             for line in f.readlines():
                 glob_wrappers.append(line.strip())
     assert glob_wrappers, "No globs provided."
+    glob_wrappers = [g.replace("{run}", run) for g in glob_wrappers]
     include_globs, exclude_globs = get_globs(glob_wrappers)
     logger.debug(f"Include Glob: {include_globs}")
     logger.debug(f"Exclude Glob: {exclude_globs}")
@@ -248,7 +478,7 @@ def process_run(
         assert entity
         assert project
 
-        files_on_wandb(
+        run_report = files_on_wandb(
             api,
             entity,
             project,
@@ -258,8 +488,17 @@ def process_run(
             exclude_filter=exclude_globs,
             overwrite=overwrite,
             action=action,
+            jobs=jobs,
+            sync=sync,
+            store=store,
+            verify=verify,
+            moves=moves,
+            exports=exports,
         )
 
+        if report is not None:
+            report.merge(run_report)
+
     elif (destination == "wandb" and action in ["copy", "move"]) or (
         destination == "local" and action in ["delete"]
     ):  # upload
@@ -269,13 +508,31 @@ def process_run(
         if len(files_) == 0:
             logger.debug("No file matched the globs")
 
-        if action not in ["delete"]:
-            add_files(api, entity, project, run, files_, base_path)
-
-        if action in ["move", "delete"]:
+        if action in ["delete"]:
             for file_ in files_:
                 pathlib.Path(file_).unlink()
 
+            return
+        entity = entity or api.default_entity
+        assert entity
+        assert project
+        items = [
+            (f"{entity}/{project}/{run}", remote_name(file_, base_path), file_)
+            for file_ in files_
+        ]
+
+        if uploads is not None:
+            uploads.extend(items)
+        else:
+            add_files(
+                items,
+                move=action == "move",
+                jobs=jobs,
+                report=report,
+                api=api,
+                overwrite=overwrite,
+            )
+
 
 def get_globs(
     globs: List[str],
@@ -301,30 +558,61 @@ def get_globs(
 def get_files(
     include_filter: List[str], exclude_filter: List[str]
 ) -> List[pathlib.Path]:
-    filter_ = GlobBasedFileFilter(
-        include_filter=include_filter, exclude_filter=exclude_filter
-    )
-    files = [
-        pathlib.Path(file_)
-        for file_ in itertools.chain(
-            *map(lambda x: glob.iglob(x, recursive=True), include_filter)
+    return discover_files(include_filter, exclude_filter)
+
+
+def add_files(
+    items: List[UploadItem],
+    move: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+    api: Optional[wandb.PublicApi] = None,
+    overwrite: bool = False,
+) -> TransferReport:
+    """
+    Upload `items` to their (existing) runs, in parallel across the files and
+    the runs, without resuming the runs (see `upload_all`). With `move`, the
+    local files that were uploaded are deleted.
+
+    Given the `api`, the files that are identical to a file of the run on the
+    server (see `split_unchanged`) are skipped unless `overwrite` is set, so
+    uploading a directory again only uploads the new and changed files. With
+    `move`, the skipped local files are deleted as well.
+    """
+
+    def delete(path: pathlib.Path) -> None:
+        logger.debug(f"Deleting local {path}")
+        path.unlink()
+
+    report = report if report is not None else TransferReport("Uploaded")
+    cache = listing_cache()
+
+    if api is not None and not overwrite:
+        runs = fetch_runs(api, sorted({run_path for run_path, _, _ in items}))
+        items, unchanged = split_unchanged(
+            items, runs, jobs=jobs, cache=cache, hashes=upload_hashes()
         )
-        if filter_(file_)
-    ]
 
-    return files
+        for run_path, name, path in unchanged:
+            report.skip(
+                f"{run_path.split('/')[-1]}/{name}",
+                "identical file on the server",
+            )
 
+            if move:
+                delete(path)
 
-def add_files(
-    api: wandb.PublicApi,
-    entity: Optional[str],
-    project: Optional[str],
-    run: str,
-    files: List[pathlib.Path],
-    base_path: Optional[pathlib.Path],
-) -> None:
-    wandb.init(id=run, resume="must", entity=entity, project=project)
+    if not items:
+        return report
+    report = upload_all(
+        items,
+        jobs=jobs,
+        after_upload=delete if move else None,
+        report=report,
+    )
+
+    if cache is not None:
+        for run_path in {run_path for run_path, _, _ in items}:
+            cache.invalidate(run_path)
 
-    for file_ in files:
-        logger.debug(f"Saving {file_}")
-        wandb.save(str(file_), base_path)  # type: ignore
+    return report
@@ -13,7 +13,11 @@ from .wandb_utils import (
     DICT,
     config_file_decorator,
 )
+from .common import LIST
 from wandb_utils.misc import read_df, to_csv
+from wandb_utils.tag_index import select_by_tags
+from wandb_utils.layout import index_and_select, is_long, LONG_QUERY_ERROR
+from wandb_utils.summary_store import load_summary as _load_summary
 import logging
 
 logger = logging.getLogger(__name__)
@@ -69,6 +73,28 @@ def __query(df: pd.DataFrame, q: str, engine: str = "python") -> pd.DataFrame:
     type=str,
     help="Field that is unique and can be used as index.",
 )
+@click.option(
+    "--tag",
+    multiple=True,
+    type=str,
+    help="Keep only the runs that have this tag (can pass multiple, all of them are required).",
+)
+@click.option(
+    "--any-tag",
+    type=LIST,
+    help="Tags separated using '|'. Keep only the runs that have at least one of these tags.",
+)
+@click.option(
+    "--all-tags",
+    type=LIST,
+    help="Tags separated using '|'. Keep only the runs that have all of these tags.",
+)
+@click.option(
+    "--load-summary",
+    multiple=True,
+    type=str,
+    help="Summary key to fetch from the server when the data was obtained using `all-data --lazy-summary` (can pass multiple).",
+)
 @click.option(
     "--query",
     type=str,
@@ -97,6 +123,10 @@ def filter_df(
         df: pd.DataFrame,
         fields: Tuple[str, ...],
         index: str,
+        tag: Tuple[str, ...],
+        any_tag: Optional[List[str]],
+        all_tags: Optional[List[str]],
+        load_summary: Tuple[str, ...],
         query: str,
         pd_eval: str,
         python_eval: str,
@@ -105,6 +135,7 @@ def filter_df(
     """Apply a processor using `pandas.query`, `pandas.eval`, `python eval` or `python exec`.
 
     No more than one of the processors should be provided at a time.
+    The tag filters (--tag, --any-tag and --all-tags) and --load-summary are applied before the processor.
     """
     f = list(fields)  # type:ignore
     processors = [(query, __query, "query"), (pd_eval, __pd_eval, "pd-eval"),
@@ -119,16 +150,17 @@ def filter_df(
                     raise ValueError("Only one of the processors should be set."
                                      f"You provided {s[-1]} and {processors[j][-1]}.")
             break
+    df = select_by_tags(df, any_tags=any_tag,
+                        all_tags=list(tag) + list(all_tags or []))
+    if load_summary:
+        df = _load_summary(df, list(load_summary))
     if selected_processor is not None:
+        if selected_processor[-1] in ("query", "pd-eval") and is_long(df):
+            raise click.UsageError(
+                LONG_QUERY_ERROR.format(option=f"--{selected_processor[-1]}"))
         df = selected_processor[1](df, selected_processor[0])
         logger.debug(f"Filtered contents:\n{df}")
 
-    if index:
-        df = df.set_index(index)
-
-        if f and index in f:
-            f.remove(index)
-    if f:
-        df = df[list(f)]
+    df = index_and_select(df, index, f)
 
     return df
@@ -23,7 +23,7 @@ logger = logging.getLogger(__name__)
 @click.argument(
     "input-file",
     required=True,
-    type=click.Path(path_type=pathlib.Path),  # type: ignore
+    type=click.Path(path_type=pathlib.Path, allow_dash=True),  # type: ignore
 )
 @click.option(
     "-f",
@@ -44,7 +44,7 @@ logger = logging.getLogger(__name__)
     "--delimiter",
     type=str,
     default="\t",
-    help="Column delimiter (default: TAB)",
+    help="Column delimiter (default: TAB). Ignored for arrow input.",
 )
 @processor
 @config_file_decorator()
@@ -57,7 +57,8 @@ def from_file_command(
 ) -> pd.DataFrame:
     """Read the data of runs from a `input-file` created using any wandb-utils command.
 
-    `input-file` is the path to a .csv file.
+    `input-file` is the path to a .csv file or an arrow file written using `print --format arrow`.
+    Pass '-' to read from stdin, for instance, when piping the output of another wandb-utils invocation.
     """
     df = from_file(input_file, list(fields), index, delimiter)
     logger.debug(f"Filtered contents of {input_file}:\n{df}")
@@ -75,7 +76,11 @@ def from_file(
     df = read_df(input_file, sep=delimiter)
 
     if index:
-        df = df.set_index(index)
+        # arrow input comes with its index already set
+        if df.index.name != index:
+            if df.index.name is not None:
+                df = df.reset_index()
+            df = df.set_index(index)
 
         if fields and index in fields:
             fields.remove(index)
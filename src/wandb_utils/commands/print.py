@@ -9,11 +9,12 @@ from .wandb_utils import (
     pass_api_wrapper,
     pass_api_and_info,
     processor,
+    accepts_stream,
     apply_decorators,
     DICT,
     config_file_decorator,
 )
-from wandb_utils.misc import write_df
+from wandb_utils.misc import write_df, write_jsonl, RunStream
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,13 +27,31 @@ logger = logging.getLogger(__name__)
     type=click.Path(path_type=pathlib.Path),
     help="If given the output is written to the file.",
 )
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["tsv", "arrow", "jsonl"]),
+    default="tsv",
+    help="Output format. 'arrow' writes a binary Arrow IPC stream that "
+    "can be piped into `from-file -` without losing column types. "
+    "'jsonl' writes one JSON object per run. When chained directly after `all-data`, "
+    "the runs are written as they arrive from the server with nested config and summary. (default: tsv)",
+)
 @processor
+@accepts_stream(lambda output_format="tsv", **kwargs: output_format == "jsonl")
 @config_file_decorator()
 def print_command(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, RunStream],
     output_file: Optional[pathlib.Path],
-) -> pd.DataFrame:
+    output_format: str = "tsv",
+) -> Union[pd.DataFrame, RunStream]:
     """Print the contents of a df and optionally write to a file."""
-    write_df(df, output_file, skip_writing=False)
+
+    if isinstance(df, RunStream):
+        write_jsonl(df, output_file)
+    else:
+        write_df(
+            df, output_file, skip_writing=False, output_format=output_format
+        )
 
     return df
@@ -3,8 +3,18 @@ import pandas as pd
 import argparse
 from pathlib import Path
 import sys, os
+import itertools
 from wandb_utils.run_filter import NameBasedRunFilter, RunFilter
 from wandb_utils.file_filter import GlobBasedFileFilter, FileFilter
+from wandb_utils.transfer import (
+    listing_cache,
+    delete_all,
+    runs_files_to_delete,
+    TransferReport,
+    DEFAULT_JOBS,
+)
+from wandb_utils.transfer.delete import BATCH_SIZE
+from wandb_utils.misc import query_runs, RUNS_QUERY_CHUNK_SIZE
 import tqdm
 import logging
 
@@ -77,6 +87,19 @@ def get_args():
         type=readlines,
         help="Path to a file containing not allowed globs with each glob on a separate line.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Number of runs listed and of deletion requests in parallel (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Number of files deleted with one request (default: {BATCH_SIZE})",
+    )
 
     return parser.parse_args()
 
@@ -95,8 +118,8 @@ def main(args):
 
     file_filter = (
         GlobBasedFileFilter(
-            not_allowed_globs=args.not_allowed_files_globs,
-            allowed_globs=args.allowed_files_globs,
+            include_filter=args.allowed_files_globs,
+            exclude_filter=args.not_allowed_files_globs,
         )
         if (
             bool(args.allowed_files_globs)
@@ -105,23 +128,34 @@ def main(args):
         else FileFilter()
     )
 
-    if args.sweep:
-        all_runs = api.sweep(f"{args.project}/{args.sweep}").runs
-    else:
-        all_runs = api.runs(f"{args.project}")
-
-    logger.info(f"{len(all_runs)} total runs found.")
-    runs = [r for r in tqdm.tqdm(all_runs) if run_filter(r)]
-    logger.info(f"{len(runs)} left after filtering")
-
-    for run in tqdm.tqdm(runs, desc="Runs processed"):
-        files_to_delete = [f for f in run.files() if file_filter(f.name)]
-
-        for file_ in files_to_delete:
-            logger.debug(
-                f"Deleting {args.entity}/{args.project}/{run.id}/{file_}"
-            )
-            file_.delete()
+    # the allowed runs are selected by the server, the not allowed ones are
+    # filtered out while the pages of runs are fetched
+    query_filters = (
+        run_filter.query_filters(RUNS_QUERY_CHUNK_SIZE)
+        if isinstance(run_filter, NameBasedRunFilter)
+        else None
+    )
+    runs = itertools.chain.from_iterable(
+        query_runs(args.entity, args.project, args.sweep, api, filters=f)
+        for f in (query_filters if query_filters is not None else [None])
+    )
+    runs = (r for r in runs if run_filter(r))
+
+    report = TransferReport("Deleted")
+    delete_all(
+        runs_files_to_delete(
+            tqdm.tqdm(runs, desc="Runs processed"),
+            file_filter,
+            cache=listing_cache(),
+            jobs=args.jobs,
+            report=report,
+        ),
+        jobs=args.jobs,
+        batch_size=args.batch_size,
+        report=report,
+    )
+    report.log_summary()
+    report.raise_for_failures()
 
 
 def run():
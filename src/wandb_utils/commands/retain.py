@@ -0,0 +1,268 @@
+from typing import List, Tuple, Union, Dict, Any, Optional
+import click
+import wandb
+import pandas as pd
+import pathlib
+from .wandb_utils import (
+    pass_api_and_info,
+    METRIC,
+    Metric,
+    config_file_decorator,
+)
+from .common import processor
+from .download_from_wandb import run_paths
+from .files import get_globs
+from wandb_utils.file_filter import GlobBasedFileFilter
+from wandb_utils.transfer import (
+    DEFAULT_JOBS,
+    ListingCache,
+    TransferReport,
+    delete_all,
+    filtered_runs_files,
+    listing_cache,
+)
+from wandb_utils.transfer.delete import BATCH_SIZE
+from wandb_utils.layout import select_fields, densify
+from wandb_utils.misc import fetch_runs, write_df
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def runs_to_retain(
+    df: pd.DataFrame,
+    metric: Metric,
+    k: int,
+    group: str = "sweep",
+    prune_missing: bool = False,
+) -> pd.Series:
+    """
+    Whether each run of `df` is one of the `k` best runs of its `group` by
+    `metric`, computed with one ranking of the whole table. The runs without
+    a value of the metric (for instance, runs that are still running) are
+    retained, unless `prune_missing` is True. A run without a value of
+    `group` (missing or "", like the runs that are not in a sweep) is a group
+    of its own, so it is retained.
+    """
+    values = pd.to_numeric(df[metric.name], errors="coerce")
+    groups = df[group]
+    ungrouped = groups.isna() | (groups.astype(str) == "")
+    ranks = (
+        values[~ungrouped]
+        .groupby(groups[~ungrouped])
+        .rank(method="first", ascending=not metric.maximum)
+    )
+    retain = (ranks <= k).reindex(df.index, fill_value=False)
+    retain |= ungrouped & values.notna()
+
+    if not prune_missing:
+        retain |= values.isna()
+
+    return retain
+
+
+def retain_runs(
+    api: wandb.PublicApi,
+    df: pd.DataFrame,
+    entity: Optional[str],
+    project: Optional[str],
+    metric: Metric,
+    k: int,
+    group: str = "sweep",
+    globs: Optional[List[str]] = None,
+    dry_run: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    batch_size: int = BATCH_SIZE,
+    cache: Optional[ListingCache] = None,
+    prune_missing: bool = False,
+) -> Tuple[pd.DataFrame, TransferReport]:
+    """
+    Delete the files matching `globs` (syntax of the `files` command, see
+    `get_globs`) from all the runs of `df` except the `k` best ones of each
+    `group` by `metric` (see `runs_to_retain` for `prune_missing`).
+
+    The files of the pruned runs are listed with a pool of `jobs` threads
+    and deleted with `delete_all` while the other runs are still being
+    listed. With `dry_run`, nothing is deleted.
+
+    Returns a table with the path, group, metric and "retain" of every run,
+    and the number of "files" and "bytes" to delete from it, and the report
+    of the deletions (of the failures to list runs, with `dry_run`).
+    """
+    table = densify(
+        select_fields(df, [group, metric.name]), [group, metric.name]
+    )
+
+    # the long layout is turned into a wide table with a path column
+    if "path" not in table.columns:
+        table = table.reset_index(drop=True)
+        table.insert(0, "path", run_paths(df, entity, project))
+    table = table.drop_duplicates("path").reset_index(drop=True)
+    table["retain"] = runs_to_retain(table, metric, k, group, prune_missing)
+    pruned = list(table.loc[~table["retain"], "path"])
+    logger.info(
+        f"Retaining {int(table['retain'].sum())} runs, "
+        f"pruning files of {len(pruned)} runs"
+    )
+    report = TransferReport("Deleted")
+    runs = fetch_runs(api, pruned)
+
+    for path in pruned:
+        if path not in runs:
+            report.fail(path, ValueError(f"Run {path} not found"))
+    include_globs, exclude_globs = get_globs(globs or [])
+    file_filter = GlobBasedFileFilter(
+        include_filter=include_globs, exclude_filter=exclude_globs
+    )
+    counts: Dict[str, List[int]] = {}
+    paths = {id(run): path for path, run in runs.items()}
+
+    def items():
+        listings = filtered_runs_files(
+            runs.values(), file_filter, cache, jobs=jobs, report=report
+        )
+
+        for run, files in listings:
+            counts[paths[id(run)]] = [
+                len(files),
+                sum(f.size or 0 for f in files),
+            ]
+
+            if files and cache is not None and not dry_run:
+                cache.invalidate(run)
+
+            for file_ in files:
+                yield f"{run.id}/{file_.name}", file_
+
+    if dry_run:
+        for _ in items():
+            pass
+    else:
+        delete_all(items(), jobs=jobs, batch_size=batch_size, report=report)
+    table["files"] = [counts.get(p, [0, 0])[0] for p in table["path"]]
+    table["bytes"] = [counts.get(p, [0, 0])[1] for p in table["path"]]
+
+    return table, report
+
+
+@click.command(name="retain")
+@click.option(
+    "-m",
+    "--metric",
+    required=True,
+    type=METRIC,
+    help="Name of the metric to rank the runs by. "
+    "Prepend + or - for maximum or minimum, respectively. ",
+)
+@click.option(
+    "-k",
+    "--top-k",
+    "k",
+    type=int,
+    default=1,
+    help="Number of best runs to retain in each group (default: 1)",
+)
+@click.option(
+    "-g",
+    "--group",
+    type=str,
+    default="sweep",
+    help="Field of the runs to group by (default: sweep)",
+)
+@click.option(
+    "-f",
+    "--files",
+    required=True,
+    type=str,
+    help="File globs to include (+) and exclude (-) split using '|', as in the `files` command. "
+    "The matching files are deleted from the runs that are not retained.",
+)
+@click.option(
+    "--prune-missing",
+    is_flag=True,
+    default=False,
+    help="Also delete the files of the runs without a value of the metric. "
+    "By default they are retained, since they may still be running.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Only report the files and bytes that would be deleted.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    help=f"Number of runs listed and of deletion requests in parallel (default: {DEFAULT_JOBS})",
+)
+@click.option(
+    "-o",
+    "--output_file",
+    required=False,
+    type=click.Path(path_type=pathlib.Path),  # type: ignore
+    help="File to which the table of runs will be written."
+    " If not provided, it is printed on the console. (default:None)",
+)
+@click.option(
+    "--skip-writing",
+    is_flag=True,
+    help="Skip writing or printing.",
+    default=False,
+)
+@pass_api_and_info
+@processor
+@config_file_decorator()
+def retain_command(
+    df: Optional[pd.DataFrame],
+    api: wandb.PublicApi,
+    entity: Optional[str],
+    project: Optional[str],
+    sweep: Optional[str],
+    metric: Metric,
+    k: int,
+    group: str,
+    files: str,
+    prune_missing: bool = False,
+    dry_run: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    output_file: Optional[pathlib.Path] = None,
+    skip_writing: bool = False,
+) -> pd.DataFrame:
+    """
+    Delete files (for instance, checkpoints) from all the runs in the DataFrame
+    produced by the previous command except the k best runs of each group.
+    """
+
+    if df is None:
+        raise ValueError(
+            "retain should be chained after a command that produces a dataframe of runs"
+        )
+    table, report = retain_runs(
+        api,
+        df,
+        entity,
+        project,
+        metric,
+        k,
+        group=group,
+        globs=files.split("|"),
+        dry_run=dry_run,
+        jobs=jobs,
+        cache=listing_cache(),
+        prune_missing=prune_missing,
+    )
+
+    if dry_run:
+        logger.info(
+            f"Dry run: would delete {int(table['files'].sum())} files "
+            f"({int(table['bytes'].sum())} bytes)"
+        )
+
+    if report.num_files:
+        report.log_summary()
+    write_df(table, output_file, skip_writing)
+    report.raise_for_failures()
+
+    return table
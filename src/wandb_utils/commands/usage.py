@@ -0,0 +1,230 @@
+from typing import List, Tuple, Union, Dict, Any, Optional
+import click
+import wandb
+import pandas as pd
+import pathlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import tqdm
+from .wandb_utils import pass_api_and_info, config_file_decorator
+from .common import processor
+from .download_from_wandb import run_paths
+from .files import get_globs
+from wandb_utils.file_filter import GlobBasedFileFilter
+from wandb_utils.transfer import (
+    DEFAULT_JOBS,
+    ListingCache,
+    listing_cache,
+    run_files,
+)
+from wandb_utils.misc import fetch_runs, write_df
+import logging
+
+logger = logging.getLogger(__name__)
+
+USAGE_KEYS = ["run", "sweep", "glob"]
+# bucket of the files that match none of the include globs
+OTHER = "other"
+
+
+class GlobBuckets(object):
+    """
+    Assigns a file to the first include glob that matches it (`OTHER` if none
+    does, or "*" if there are no include globs), or to no bucket (None) if it
+    matches an exclude glob.
+    """
+
+    def __init__(self, include_globs: List[str], exclude_globs: List[str]):
+        self.buckets = [
+            (glob, GlobBasedFileFilter(include_filter=[glob]))
+            for glob in include_globs
+        ]
+        self.exclude = GlobBasedFileFilter(exclude_filter=exclude_globs)
+        self.default = OTHER if include_globs else "*"
+
+    def __call__(self, file_: wandb.apis.public.File) -> Optional[str]:
+        if not self.exclude(file_):
+            return None
+
+        for glob, file_filter in self.buckets:
+            if file_filter(file_):
+                return glob
+
+        return self.default
+
+
+def run_usage(
+    run: wandb.apis.public.Run,
+    buckets: GlobBuckets,
+    cache: Optional[ListingCache] = None,
+) -> Dict[str, List[int]]:
+    """Number of files and bytes of `run` in every glob bucket."""
+    usage: Dict[str, List[int]] = {}
+
+    for file_ in run_files(run, cache):
+        bucket = buckets(file_)
+
+        if bucket is None:
+            continue
+        counts = usage.setdefault(bucket, [0, 0])
+        counts[0] += 1
+        counts[1] += file_.size or 0
+
+    return usage
+
+
+def files_usage(
+    api: wandb.PublicApi,
+    df: pd.DataFrame,
+    entity: Optional[str],
+    project: Optional[str],
+    globs: Optional[List[str]] = None,
+    by: Optional[List[str]] = None,
+    jobs: int = DEFAULT_JOBS,
+    cache: Optional[ListingCache] = None,
+) -> pd.DataFrame:
+    """
+    Storage used by the files of the runs of `df`, summed per `by` (a subset
+    of "run", "sweep" and "glob", by default "run").
+
+    `globs` use the syntax of the `files` command ("+ glob" or "- glob", see
+    `get_globs`). Every include glob is a bucket, and the files are counted
+    in the bucket of the first include glob that they match (see
+    `GlobBuckets`). Files that match an exclude glob are not counted.
+
+    The files of the runs are listed concurrently by a pool of `jobs` threads.
+    The returned table has the `by` columns, "files" and "bytes", and is
+    sorted by decreasing bytes.
+    """
+    by = list(by or ["run"])
+    unknown = set(by) - set(USAGE_KEYS)
+
+    if unknown:
+        raise ValueError(f"Cannot group usage by {sorted(unknown)}")
+    buckets = GlobBuckets(*get_globs(globs or []))
+    all_paths = run_paths(df, entity, project)
+    sweeps = dict(zip(all_paths, df["sweep"])) if "sweep" in df.columns else {}
+    # unique paths, the long layout has one row per key
+    paths = list(dict.fromkeys(all_paths))
+    logger.info(f"Resolving {len(paths)} runs")
+    runs = fetch_runs(api, paths)
+
+    for path in paths:
+        if path not in runs:
+            logger.warning(f"Run {path} not found")
+    rows = []
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {
+            pool.submit(run_usage, run, buckets, cache): path
+            for path, run in runs.items()
+        }
+
+        for future in tqdm.tqdm(
+            as_completed(futures), total=len(futures), desc="Runs listed"
+        ):
+            path = futures[future]
+            error = future.exception()
+
+            if error is not None:
+                logger.warning(f"Cannot list the files of {path}: {error!r}")
+
+                continue
+            sweep = sweeps.get(path)
+
+            if sweep is None or pd.isna(sweep):
+                run_sweep = runs[path].sweep
+                sweep = run_sweep.id if run_sweep is not None else ""
+
+            for bucket, (num_files, num_bytes) in future.result().items():
+                rows.append(
+                    {
+                        "run": path.rsplit("/", 1)[-1],
+                        "sweep": sweep,
+                        "glob": bucket,
+                        "files": num_files,
+                        "bytes": num_bytes,
+                    }
+                )
+    usage = pd.DataFrame(rows, columns=USAGE_KEYS + ["files", "bytes"])
+
+    return (
+        usage.groupby(by, as_index=False, sort=False)[["files", "bytes"]]
+        .sum()
+        .sort_values(["bytes"] + by, ascending=[False] + [True] * len(by))
+        .reset_index(drop=True)
+    )
+
+
+@click.command(name="usage")
+@click.option(
+    "-f",
+    "--files",
+    default=None,
+    type=str,
+    help="File globs to include (+) and exclude (-) split using '|', as in the `files` command. "
+    "The usage is reported per include glob, excluded files are not counted.",
+)
+@click.option(
+    "--by",
+    multiple=True,
+    type=click.Choice(USAGE_KEYS),
+    help="Sum the usage per run, sweep and/or glob (can pass multiple). Default: run.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOBS,
+    help=f"Number of runs whose files are listed in parallel (default: {DEFAULT_JOBS})",
+)
+@click.option(
+    "-o",
+    "--output_file",
+    required=False,
+    type=click.Path(path_type=pathlib.Path),  # type: ignore
+    help="File to which the usage table will be written."
+    " If not provided, it is printed on the console. (default:None)",
+)
+@click.option(
+    "--skip-writing",
+    is_flag=True,
+    help="Skip writing or printing.",
+    default=False,
+)
+@pass_api_and_info
+@processor
+@config_file_decorator()
+def usage_command(
+    df: Optional[pd.DataFrame],
+    api: wandb.PublicApi,
+    entity: Optional[str],
+    project: Optional[str],
+    sweep: Optional[str],
+    files: Optional[str],
+    by: List[str],
+    jobs: int = DEFAULT_JOBS,
+    output_file: Optional[pathlib.Path] = None,
+    skip_writing: bool = False,
+) -> pd.DataFrame:
+    """
+    Report the storage used by the files of the runs in the DataFrame produced
+    by the previous command (for instance, `all-data`), sorted by decreasing size.
+    """
+
+    if df is None:
+        raise ValueError(
+            "usage should be chained after a command that produces a dataframe of runs"
+        )
+    usage = files_usage(
+        api,
+        df,
+        entity,
+        project,
+        globs=files.split("|") if files else None,
+        by=list(by),
+        jobs=jobs,
+        cache=listing_cache(),
+    )
+    write_df(usage, output_file, skip_writing)
+
+    return usage
@@ -26,8 +26,11 @@ from .common import (
     pass_api_wrapper,
     pass_api_and_info,
     processor,
+    accepts_stream,
     apply_decorators,
 )
+from wandb_utils.misc import RunStream
+from wandb_utils import governor
 
 logger = logging.getLogger(__name__)
 
@@ -71,5 +74,12 @@ def process_commands(processors: List[Callable], **extra):
     # entity, project, and sweep as args again. We need to swallow them here.
     df = None
 
-    for processor in processors:
+    for i, processor in enumerate(processors):
+        if isinstance(df, RunStream):
+            if not getattr(processor, "accepts_stream", False):
+                df = df.to_df()
+            else:
+                # the next commands read the stream again
+                df.keep_records = i < len(processors) - 1
         df = processor(df)
+    governor.log_summary()
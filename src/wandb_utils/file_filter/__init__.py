@@ -1,2 +1,3 @@
 from .file_filter import FileFilter
 from .glob_filter import GlobBasedFileFilter
+from .discovery import discover_files
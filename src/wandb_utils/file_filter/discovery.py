@@ -0,0 +1,198 @@
+from typing import List, Tuple, Union, Dict, Any, Optional, Pattern
+import logging
+import os
+import pathlib
+import re
+from .glob_filter import GlobBasedFileFilter, _translate_part
+
+logger = logging.getLogger(__name__)
+
+MAGIC = re.compile("[*?[]")
+
+
+def _part_regex(part: str) -> Pattern:
+    # like glob.glob, wildcards do not match hidden names unless the part
+    # itself starts with a "."
+    regex = _translate_part(part)
+
+    if not part.startswith("."):
+        regex = f"(?!\\.){regex}"
+
+    return re.compile(regex, re.S)
+
+
+class _IncludeGlob(object):
+    """An include glob with the semantics of glob.glob(glob, recursive=True)."""
+
+    def __init__(self, glob: str):
+        self.glob = glob
+        parts = glob.split("/")
+        self.absolute = glob.startswith("/")
+        parts = [p for p in parts if p not in ("", ".")]
+        literal = 0
+
+        while literal < len(parts) and not MAGIC.search(parts[literal]):
+            literal += 1
+        self.root = os.path.join(
+            *(["/"] if self.absolute else ["."]), *parts[:literal]
+        )
+        self.literal = literal == len(parts)
+        # parts of the glob below the root; None stands for "**"
+        self.parts: List[Optional[Pattern]] = [
+            None if p == "**" else _part_regex(p) for p in parts[literal:]
+        ]
+        self.regex = _below_root_regex(parts[literal:])
+
+    def _match(self, i: int, names: List[str], j: int, prefix: bool) -> bool:
+        if j == len(names):
+            return prefix or all(p is None for p in self.parts[i:])
+
+        if i == len(self.parts):
+            return False
+        part = self.parts[i]
+
+        if part is None:
+            if names[j].startswith("."):
+                return self._match(i + 1, names, j, prefix)
+
+            return self._match(i + 1, names, j, prefix) or self._match(
+                i, names, j + 1, prefix
+            )
+
+        return bool(part.match(names[j])) and self._match(
+            i + 1, names, j + 1, prefix
+        )
+
+    def may_contain(self, names: List[str]) -> bool:
+        """Whether the directory `names` below the root can contain matches."""
+
+        return self._match(0, names, 0, prefix=True)
+
+
+def _below_root_regex(parts: List[str]) -> str:
+    """Regex for the paths of the files below the root matched by `parts`."""
+    name = "(?!\\.)[^/]+"
+    regexes = []
+
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+
+        if part == "**":
+            # any number of non-hidden directories (and files, if last)
+            regexes.append(f"{name}(?:/{name})*" if last else f"(?:{name}/)*")
+        else:
+            regex = _part_regex(part).pattern
+            regexes.append(regex if last else regex + "/")
+
+    return "".join(regexes)
+
+
+def _under(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip("/") + "/")
+
+
+def discover_files(
+    include_globs: List[str], exclude_globs: Optional[List[str]] = None
+) -> List[pathlib.Path]:
+    """
+    Files matched by `include_globs` (as glob.glob with recursive=True) that
+    pass `GlobBasedFileFilter(include_globs, exclude_globs)`.
+
+    Every directory is read at most once, with os.scandir, however many globs
+    there are. Directories that no include glob can reach are not entered.
+    The exclude globs never rule out a directory: they match the last parts
+    of a path, as `PurePath.match`, so "ckpt/**" excludes "ckpt/model.th" but
+    not "ckpt/deep/model.th". The files are returned once each, in the order
+    in which they are found.
+    """
+    exclude_globs = exclude_globs or []
+    file_filter = GlobBasedFileFilter(
+        include_filter=include_globs, exclude_filter=exclude_globs
+    )
+    globs = [_IncludeGlob(g) for g in include_globs]
+    found: Dict[str, None] = {}
+
+    for glob in globs:
+        if glob.literal and os.path.isfile(glob.root):
+            rel = os.path.normpath(glob.root)
+
+            if file_filter(rel):
+                found.setdefault(rel, None)
+
+    walkable = [g for g in globs if not g.literal]
+    # one regex for the globs below each root
+    by_root: Dict[str, List[_IncludeGlob]] = {}
+
+    for g in walkable:
+        by_root.setdefault(g.root, []).append(g)
+    root_regexes = [
+        (
+            root,
+            len(root.rstrip("/")) + 1,
+            re.compile("|".join(f"(?:{g.regex})" for g in members), re.S),
+        )
+        for root, members in by_root.items()
+    ]
+    # walk only the outermost roots, the globs of the nested ones are matched
+    # while walking their ancestor
+    outer: List[str] = []
+
+    for root in sorted(by_root, key=len):
+        if not any(_under(root, o) for o in outer):
+            outer.append(root)
+
+    for top in outer:
+        if not os.path.isdir(top):
+            continue
+        members = [g for g in walkable if _under(g.root, top)]
+        regexes = [r for r in root_regexes if _under(r[0], top)]
+        stack = [top]
+
+        while stack:
+            directory = stack.pop()
+
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                logger.debug(f"Cannot read {directory}: {e}")
+
+                continue
+            subdirs = []
+            active = [
+                (start, regex)
+                for root, start, regex in regexes
+                if _under(directory, root)
+            ]
+
+            for entry in entries:
+                path = entry.path
+                rel = path[2:] if path.startswith("./") else path
+
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if any(
+                        g.may_contain(_names_below(path, g.root))
+                        for g in members
+                        if _under(path, g.root)
+                    ) or any(_under(g.root, path) for g in members):
+                        subdirs.append(path)
+                else:
+                    for start, regex in active:
+                        if regex.fullmatch(path, start) is not None:
+                            if file_filter(rel):
+                                found.setdefault(rel, None)
+
+                            break
+            stack.extend(reversed(subdirs))
+
+    return [pathlib.Path(p) for p in found]
+
+
+def _names_below(path: str, root: str) -> List[str]:
+    rest = path[len(root) :].lstrip("/")
+
+    return rest.split("/") if rest else []
@@ -1,16 +1,22 @@
-from typing import Union
+from typing import Union, Iterable, List, TypeVar
 import wandb
 import logging
 import pathlib
 
 logger = logging.getLogger(__name__)
 
+FileLike = Union[str, wandb.apis.public.File, pathlib.Path, pathlib.PurePath]
+# the type of the files passed to `filter_many`, which returns the same type
+F = TypeVar("F", bound=FileLike)
+
 
 class FileFilter(object):
-    def __call__(
-        self,
-        run: Union[wandb.apis.public.File, pathlib.Path, pathlib.PurePath],
-    ) -> bool:
+    def __call__(self, run: FileLike) -> bool:
         """Whether to take the file or not"""
 
         return True
+
+    def filter_many(self, files: Iterable[F]) -> List[F]:
+        """The items of `files` that pass the filter."""
+
+        return [f for f in files if self(f)]
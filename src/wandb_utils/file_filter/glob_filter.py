@@ -1,11 +1,148 @@
-from typing import List, Tuple, Union, Dict, Any, Optional
-from .file_filter import FileFilter
+from typing import List, Tuple, Union, Dict, Any, Optional, Iterable
+from .file_filter import FileFilter, FileLike, F
 import pathlib
+import re
 
 import wandb
 
 
+def _translate_part(pattern: str) -> str:
+    """
+    Regex for one part (between slashes) of a glob, with the semantics of
+    `fnmatch` restricted to a single part, like `PurePath.match`.
+    """
+    i, n = 0, len(pattern)
+    res = []
+
+    while i < n:
+        c = pattern[i]
+        i += 1
+
+        if c == "*":
+            # "**" is not recursive in PurePath.match
+            while i < n and pattern[i] == "*":
+                i += 1
+            res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "[":
+            j = i
+
+            if j < n and pattern[j] == "!":
+                j += 1
+
+            if j < n and pattern[j] == "]":
+                j += 1
+
+            while j < n and pattern[j] != "]":
+                j += 1
+
+            if j >= n:
+                res.append("\\[")
+            else:
+                chars = pattern[i:j].replace("\\", "\\\\")
+                chars = re.sub(r"([&~|])", r"\\\1", chars)
+                i = j + 1
+
+                if chars[0] == "!":
+                    chars = "^" + chars[1:]
+                elif chars[0] in ("^", "["):
+                    chars = "\\" + chars
+                res.append(f"(?!/)[{chars}]")
+        else:
+            res.append(re.escape(c))
+
+    return "".join(res)
+
+
+def translate(glob: str) -> Tuple[Optional[int], str]:
+    """
+    Translate `glob` into a regex with the semantics of `PurePath.match`.
+
+    A relative glob with k parts matches the last k parts of a path. It is
+    returned as (k, regex for the last k parts). An absolute glob matches the
+    whole path and is returned as (None, regex for the path).
+    """
+    parts = pathlib.PurePath(glob).parts
+
+    if not parts:
+        raise ValueError("empty pattern")
+
+    if parts[0] == "/":
+        return None, "/" + "/".join(_translate_part(p) for p in parts[1:])
+
+    return len(parts), "/".join(_translate_part(p) for p in parts)
+
+
+def _last_parts(name: str, k: int) -> Optional[str]:
+    """The last `k` parts of `name` (or None if it has fewer parts)."""
+    end = len(name)
+
+    for i in range(k):
+        end = name.rfind("/", 0, end)
+
+        if end < 0:
+            return name if i == k - 1 else None
+
+    return name[end + 1 :]
+
+
+class CompiledGlobs(object):
+    """
+    A set of globs compiled into one regex per number of parts, so a path is
+    matched against all of them with at most one regex match per distinct
+    number of parts, on the string itself.
+    """
+
+    def __init__(self, globs: Iterable[str]):
+        grouped: Dict[Optional[int], List[str]] = {}
+
+        for glob in sorted(set(globs)):
+            k, regex = translate(glob)
+            grouped.setdefault(k, []).append(regex)
+        self.groups = [
+            (k, re.compile("|".join(f"(?:{r})" for r in regexes), re.S))
+            for k, regexes in sorted(
+                grouped.items(), key=lambda kv: (kv[0] is None, kv[0] or 0)
+            )
+        ]
+
+    def __bool__(self) -> bool:
+        return bool(self.groups)
+
+    def search(self, name: str) -> bool:
+        for k, regex in self.groups:
+            part = name if k is None else _last_parts(name, k)
+
+            if part is not None and regex.fullmatch(part) is not None:
+                return True
+
+        return False
+
+
+def _as_str(file_: FileLike) -> str:
+    if isinstance(file_, wandb.apis.public.File):
+        name = file_.name
+    else:
+        name = str(file_)
+
+    # normalize the rare names that are not already in the form of str(PurePath)
+    if "//" in name or "./" in name or (name.endswith("/") and name != "/"):
+        name = str(pathlib.PurePath(name))
+
+    return name
+
+
 class GlobBasedFileFilter(FileFilter):
+    """
+    Keep the files that match any of the include globs (all files if there are
+    none) and none of the exclude globs. The globs have the semantics of
+    `PurePath.match`.
+
+    The globs are compiled when the filter is created (see `CompiledGlobs`)
+    and file names are matched as strings.
+    """
+
     def __init__(
         self,
         include_filter: Optional[List[str]] = None,
@@ -13,43 +150,34 @@ class GlobBasedFileFilter(FileFilter):
     ):
         self.allowed_globs = set(include_filter or [])
         self.not_allowed_globs = set(exclude_filter or [])
+        self._include = CompiledGlobs(self.allowed_globs)
+        self._exclude = CompiledGlobs(self.not_allowed_globs)
 
     def match(
         self,
         path: Union[pathlib.Path, pathlib.PurePath],
         globs: List[str],
     ) -> bool:
+        """Whether `path` matches any of `globs` (see `CompiledGlobs`)."""
 
-        for glob in globs:
-            if path.match(glob):
-                return True
+        return CompiledGlobs(globs).search(_as_str(path))
 
-        return False
+    def _match_name(self, name: str) -> bool:
+        if name in ("", "."):  # no parts, matches no glob
+            return not self._include
 
-    def __call__(
-        self,
-        file_: Union[
-            str, wandb.apis.public.File, pathlib.Path, pathlib.PurePath
-        ],
-    ) -> bool:
-        include_match = True
-        exclude_match = False
-        match = None
-
-        if isinstance(file_, str):
-            file_ = pathlib.PurePath(file_)
-        elif isinstance(file_, wandb.apis.public.File):
-            file_ = pathlib.PurePath(file_.name)
-
-        if self.allowed_globs:
-            include_match = self.match(file_, list(self.allowed_globs))
-
-        if self.not_allowed_globs:
-            exclude_match = self.match(file_, list(self.not_allowed_globs))
-        # 1, 0 => True
-        # 1, 1 => False
-        # 0, 1 => False
-        # 0, 0 => False
-        match = include_match and (not exclude_match)
-
-        return match
+        if self._include and not self._include.search(name):
+            return False
+
+        return not (self._exclude and self._exclude.search(name))
+
+    def __call__(self, file_: FileLike) -> bool:
+        return self._match_name(_as_str(file_))
+
+    def filter_many(self, files: Iterable[F]) -> List[F]:
+        """The items of `files` that pass the filter."""
+
+        if not self._include and not self._exclude:
+            return list(files)
+
+        return [f for f in files if self._match_name(_as_str(f))]
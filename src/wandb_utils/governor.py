@@ -0,0 +1,400 @@
+from typing import List, Tuple, Union, Dict, Any, Optional, Callable
+import functools
+import logging
+import os
+import random
+import threading
+import time
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+from wandb.apis.public import RetryingClient
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.environ.get("WANDB_UTILS_MAX_CONCURRENCY", 32))
+# requests per second, 0 for no limit
+RATE_LIMIT = float(os.environ.get("WANDB_UTILS_RATE_LIMIT", 0))
+MAX_RETRIES = int(os.environ.get("WANDB_UTILS_MAX_RETRIES", 5))
+# seconds, 0 to not adapt the concurrency to the latency
+LATENCY_TARGET = float(os.environ.get("WANDB_UTILS_LATENCY_TARGET", 0))
+
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+# key of the governor of the graphql api, the file transfers are governed per
+# host (see `governor`)
+GRAPHQL = "graphql"
+
+
+class TokenBucket(object):
+    """
+    Allows `rate` requests per second on average, and bursts of up to
+    `burst` requests (by default, one second worth of requests).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, waiting for it if needed. Returns the time waited."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            # the token is reserved now, and waited for outside of the lock
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            self.sleep(wait)
+
+        return wait
+
+
+def _status(
+    response: Optional[requests.Response], error: Optional[BaseException]
+) -> Optional[int]:
+    if response is not None and isinstance(response, requests.Response):
+        return response.status_code
+    # errors raised by raise_for_status, possibly wrapped by wandb in a
+    # CommError with the original error in `exc`
+    error = getattr(error, "exc", None) or error
+    error_response = getattr(error, "response", None)
+
+    if isinstance(error_response, requests.Response):
+        return error_response.status_code
+
+    return None
+
+
+def _retry_after(
+    response: Optional[requests.Response], error: Optional[BaseException]
+) -> Optional[float]:
+    if response is None:
+        response = getattr(
+            getattr(error, "exc", None) or error, "response", None
+        )
+
+    if not isinstance(response, requests.Response):
+        return None
+
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+class Governor(object):
+    """
+    Process wide limit on the requests sent to one wandb server.
+
+    The number of requests in flight is adapted with AIMD (additive
+    increase, multiplicative decrease): it grows by about one per round of
+    successful requests, up to `max_concurrency`, and is multiplied by
+    `decrease` (at most once per `cooldown` seconds) when the server
+    throttles (429) or fails (5xx), or when requests take longer than
+    `latency_target` (if given). A token bucket additionally caps the
+    request rate to `rate` requests per second (if given).
+
+    Throttled and failed requests, and dropped connections, are retried up to
+    `max_retries` times after a random delay (full jitter exponential backoff,
+    or the Retry-After of the response). The requests, retries and the
+    achieved throughput are counted (see `summary`).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        min_concurrency: int = 1,
+        initial_concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        latency_target: Optional[float] = None,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(initial_concurrency or max_concurrency)
+        self.bucket = TokenBucket(rate, burst, sleep=sleep) if rate else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.sleep = sleep
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.latency = 0.0
+        self._started = time.monotonic()
+        self._last_decrease = -float("inf")
+        self._cond = threading.Condition()
+
+    def _acquire(self) -> None:
+        if self.bucket is not None:
+            self.bucket.acquire()
+        with self._cond:
+            while self.active >= int(self.limit):
+                self._cond.wait()
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _release(self, latency: float, congested: bool) -> None:
+        with self._cond:
+            self.active -= 1
+            self.requests += 1
+            self.latency += latency
+
+            if congested or (
+                self.latency_target and latency > self.latency_target
+            ):
+                now = time.monotonic()
+
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.limit = max(
+                        float(self.min_concurrency),
+                        self.limit * self.decrease,
+                    )
+                    logger.debug(f"Concurrency decreased to {self.limit:.1f}")
+            else:
+                self.limit = min(
+                    float(self.max_concurrency), self.limit + 1 / self.limit
+                )
+            self._cond.notify_all()
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        retry: bool = True,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Call `fn` (which sends one request) within the limits, retrying it
+        (unless `retry` is False) when the server throttles or fails. `fn`
+        can return a response or raise an error for the status of the
+        response (as `raise_for_status`).
+        """
+        attempt = 0
+
+        while True:
+            self._acquire()
+            start = time.monotonic()
+            response, error = None, None
+            try:
+                response = fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+            status = _status(response, error)
+            congested = status in THROTTLE_STATUSES or isinstance(
+                getattr(error, "exc", None) or error,
+                (requests.ConnectionError, requests.Timeout),
+            )
+            self._release(time.monotonic() - start, congested)
+
+            if not congested or not retry or attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+
+                return response
+            with self._cond:
+                self.throttled += 1
+                self.retries += 1
+            delay = _retry_after(response, error)
+
+            if delay is None:
+                delay = random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2**attempt)
+                )
+            logger.debug(
+                f"Request throttled ({status or repr(error)}), retry {attempt + 1} in {delay:.2f}s"
+            )
+
+            if isinstance(response, requests.Response):
+                response.close()
+            self.sleep(delay)
+            attempt += 1
+
+    def wrap(self, fn: Callable[..., Any], retry: bool = True) -> Callable:
+        """`fn` with its calls going through `call`."""
+
+        @functools.wraps(fn)
+        def governed(*args: Any, **kwargs: Any) -> Any:
+            return self.call(fn, *args, retry=retry, **kwargs)
+
+        governed.governor = self  # type: ignore
+
+        return governed
+
+    def throughput(self) -> float:
+        """Requests per second since the governor was created."""
+
+        return self.requests / max(time.monotonic() - self._started, 1e-9)
+
+    def summary(self) -> str:
+        mean = self.latency / self.requests if self.requests else 0.0
+
+        return (
+            f"{self.requests} requests ({self.throughput():.1f}/s, "
+            f"mean latency {mean:.2f}s), {self.retries} retried, "
+            f"concurrency {self.limit:.1f} (peak {self.peak})"
+        )
+
+
+class GovernedAdapter(HTTPAdapter):
+    """
+    HTTP adapter that sends the requests of a session through the governor of
+    their host (see `governor`), or through `governor` if given. A request
+    with a file as body is sent again from the same position of the file
+    when it is retried. Requests with another streamed body (for instance, a
+    generator) are not retried since their body cannot be sent again.
+    """
+
+    def __init__(self, governor: Optional[Governor] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.governor = governor
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore
+        governor_ = self.governor or governor(
+            urllib.parse.urlsplit(str(request.url)).netloc
+        )
+        body = request.body
+
+        if body is None or isinstance(body, (bytes, str)):
+            return governor_.call(super().send, request, **kwargs)
+        try:
+            start = body.tell()  # type: ignore
+        except (AttributeError, OSError):
+            return governor_.call(super().send, request, retry=False, **kwargs)
+
+        def send_from_start() -> requests.Response:
+            body.seek(start)  # type: ignore
+
+            return HTTPAdapter.send(self, request, **kwargs)
+
+        return governor_.call(send_from_start)
+
+
+_governors: Dict[str, Governor] = {}
+_governor_lock = threading.Lock()
+
+
+def _new_governor() -> Governor:
+    return Governor(
+        rate=RATE_LIMIT or None,
+        latency_target=LATENCY_TARGET or None,
+    )
+
+
+def governor(key: str = GRAPHQL) -> Governor:
+    """
+    The governor of the process for `key`: `GRAPHQL` for the api, or the host
+    of the file urls, so that a throttled file storage does not slow down the
+    queries (and the other way around). The governors are configured with
+    the environment variables WANDB_UTILS_MAX_CONCURRENCY,
+    WANDB_UTILS_RATE_LIMIT (requests per second), WANDB_UTILS_MAX_RETRIES
+    and WANDB_UTILS_LATENCY_TARGET (seconds).
+    """
+
+    with _governor_lock:
+        if key not in _governors:
+            _governors[key] = _new_governor()
+
+        return _governors[key]
+
+
+class GovernedClient(RetryingClient):
+    """
+    The graphql client of `wandb.Api` without its retries, since the
+    governor of its transport already retries the throttled queries.
+    """
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return self._client.execute(*args, **kwargs)
+
+
+def _graphql_client(api: Any) -> Any:
+    """The graphql client of a `wandb.Api`, of its client or of the internal api."""
+
+    for client in (api, getattr(api, "_base_client", None)):
+        while client is not None and not hasattr(client, "transport"):
+            client = getattr(client, "_client", None) or getattr(
+                client, "client", None
+            )
+
+        if client is not None:
+            return client
+
+    return None
+
+
+def is_governed(api: Any) -> bool:
+    """
+    Whether the graphql requests of `api` (see `govern_api`) already go through
+    a governor, in which case the callers should not retry them again.
+    """
+    transport = getattr(_graphql_client(api), "transport", None)
+
+    return (
+        getattr(getattr(transport, "execute", None), "governor", None)
+        is not None
+    )
+
+
+def govern_api(api: Any, governor_: Optional[Governor] = None) -> Any:
+    """
+    Send the graphql requests of a `wandb.Api` (or of the internal api) through
+    `governor_` (by default, the governor of the api). The retries of wandb
+    are turned off, so that the throttled queries are only retried by the
+    governor. Returns `api`.
+    """
+    governor_ = governor_ or governor()
+    transport = getattr(_graphql_client(api), "transport", None)
+
+    if transport is None:
+        logger.debug(f"Cannot find the graphql transport of {api!r}")
+
+        return api
+
+    if getattr(transport.execute, "governor", None) is not governor_:
+        transport.execute = governor_.wrap(transport.execute)
+
+    if type(getattr(api, "_client", None)) is RetryingClient:
+        # wandb.Api
+        api._client = GovernedClient(api._client._client)
+
+    if callable(getattr(api, "gql", None)) and hasattr(api, "execute"):
+        # the internal api
+        api.gql = api.execute
+
+    return api
+
+
+def log_summary() -> None:
+    """Log the traffic of the process, per governor that sent any request."""
+
+    for key, governor_ in sorted(_governors.items()):
+        if governor_.requests:
+            logger.info(f"Server traffic ({key}): {governor_.summary()}")
@@ -0,0 +1,204 @@
+"""
+Layouts for the run table produced by `all_data_df`.
+
+wide: one row per run and one column per config/summary key (default).
+long: one (path, key, value) row per key present in a run.
+sparse: wide, but config/summary columns are pandas sparse arrays.
+"""
+
+from typing import List, Tuple, Union, Dict, Any, Optional, Iterable
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+LAYOUTS = ["wide", "long", "sparse"]
+LONG_COLUMNS = ["path", "key", "value"]
+META_COLUMNS = [
+    "run",
+    "run_name",
+    "entity",
+    "project",
+    "path",
+    "tags",
+    "sweep",
+    "sweep_name",
+]
+
+
+def flatten_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flatten a nested run record (see `wandb_utils.misc.run_record`) into the
+    columns used by the wide layout.
+    """
+    flat = {k: record[k] for k in META_COLUMNS}
+    flat["tags"] = "|".join(flat["tags"])
+    flat.update(record["config"])
+    flat.update(record["summary"])
+
+    return flat
+
+
+def long_from_records(records: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    paths: List[str] = []
+    keys: List[str] = []
+    values: List[Any] = []
+
+    for record in records:
+        flat = flatten_record(record)
+        path = flat["path"]
+
+        for k, v in flat.items():
+            if k == "path":
+                continue
+            paths.append(path)
+            keys.append(k)
+            values.append(v)
+
+    return pd.DataFrame(
+        {
+            "path": pd.Categorical(paths),
+            "key": pd.Categorical(keys),
+            "value": pd.Series(values, dtype=object),
+        },
+        columns=LONG_COLUMNS,
+    )
+
+
+def sparse_from_records(records: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the sparse layout one column at a time, without ever creating the
+    dense wide table.
+    """
+    meta: Dict[str, List[Any]] = {k: [] for k in META_COLUMNS}
+    columns: Dict[str, Tuple[List[int], List[Any]]] = {}
+    num_rows = 0
+
+    for row, record in enumerate(records):
+        flat = flatten_record(record)
+
+        for k, v in flat.items():
+            if k in meta:
+                meta[k].append(v)
+            else:
+                rows, values = columns.setdefault(k, ([], []))
+                rows.append(row)
+                values.append(v)
+        num_rows += 1
+    df = pd.DataFrame(meta, columns=META_COLUMNS)
+
+    for k, (rows, values) in columns.items():
+        column = pd.Series(values, index=rows).infer_objects()
+        column = column.reindex(pd.RangeIndex(num_rows))
+        df[k] = column.astype(pd.SparseDtype(column.dtype, np.nan))
+
+    return df
+
+
+def to_sparse(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the non meta columns of a wide df to sparse columns."""
+    columns = [c for c in df.columns if c not in META_COLUMNS]
+
+    return df.astype({c: pd.SparseDtype(df[c].dtype, np.nan) for c in columns})
+
+
+# the keys of the long layout are values of the "key" column, which a pandas
+# query cannot refer to
+LONG_QUERY_ERROR = (
+    "{option} cannot be used with the long layout, whose keys are values of "
+    "the 'key' column. Use --layout wide or sparse."
+)
+
+
+def is_long(df: pd.DataFrame) -> bool:
+    return list(df.columns) == LONG_COLUMNS
+
+
+def to_long(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a wide or sparse df to the long layout."""
+    df = densify(df)
+    long_df = df.melt(id_vars=["path"], var_name="key", value_name="value")
+
+    return long_df[long_df["value"].notna()].reset_index(drop=True)
+
+
+def to_wide(
+    df: pd.DataFrame, keys: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Pivot a long df back to the wide layout. Only `keys` are pivoted if given,
+    which is much cheaper than pivoting everything when only a few columns
+    are needed. `path` is always kept.
+    """
+
+    if keys is not None:
+        df = df[df["key"].isin(keys)]
+    wide = (
+        df.drop_duplicates(["path", "key"])
+        .pivot(index="path", columns="key", values="value")
+        .infer_objects()
+    )
+    wide.columns = wide.columns.astype(str)
+    wide.columns.name = None
+    wide = wide.reset_index()
+    wide["path"] = wide["path"].astype(str)
+
+    if keys is not None:
+        wide = wide.reindex(
+            columns=["path"] + [k for k in keys if k != "path"]
+        )
+
+    return wide
+
+
+def densify(
+    df: pd.DataFrame, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Convert sparse `columns` (all if None) of a df to dense ones."""
+    sparse = [
+        c
+        for c in (columns if columns is not None else df.columns)
+        if isinstance(df[c].dtype, pd.SparseDtype)
+    ]
+
+    if not sparse:
+        return df
+    df = df.copy()
+
+    for c in sparse:
+        df[c] = df[c].sparse.to_dense()
+
+    return df
+
+
+def select_fields(df: pd.DataFrame, fields: List[str]) -> pd.DataFrame:
+    """`df[fields]` that also works for the long layout."""
+
+    if is_long(df):
+        return to_wide(df, list(fields))
+
+    return df[list(fields)]
+
+
+def index_and_select(
+    df: pd.DataFrame, index: Optional[str], fields: Optional[List[str]]
+) -> pd.DataFrame:
+    """
+    `df.set_index(index)[fields]` (each step only if given) that also works
+    for the long layout, which is pivoted to the wide one (only the `fields`,
+    if given) before the index is set.
+    """
+    fields = [f for f in fields or [] if f != index]
+
+    if index and is_long(df):
+        df = to_wide(df, [index] + fields if fields else None)
+
+    if index:
+        df = df.set_index(index)
+
+    if fields:
+        df = select_fields(df, fields)
+
+    return df
+
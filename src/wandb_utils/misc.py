@@ -1,10 +1,22 @@
-from typing import List, Tuple, Union, Dict, Any, Optional
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Iterator,
+    Iterable,
+    Callable,
+    TYPE_CHECKING,
+)
 import wandb
 import pandas as pd
 import logging
 from pathlib import Path
 import pathlib
 import sys
+import io
 from jinja2 import Template
 import tempfile
 import shutil
@@ -12,35 +24,202 @@ import subprocess
 import json
 import re
 import copy
+from wandb_utils.layout import (
+    LAYOUTS,
+    long_from_records,
+    flatten_record,
+    sparse_from_records,
+)
+from wandb_utils.summary_store import (
+    SummaryStore,
+    SUMMARY_STORE_ATTR,
+    split_summary,
+)
 
 logger = logging.getLogger(__name__)
 
 
+if TYPE_CHECKING:
+    import pyarrow
+
+# An Arrow IPC stream starts with the continuation marker of its first
+# message and an Arrow IPC file starts with the magic bytes "ARROW1".
+ARROW_STREAM_MARKER = b"\xff\xff\xff\xff"
+ARROW_FILE_MAGIC = b"ARROW1"
+ARROW_BATCH_SIZE = 64 * 1024
+
+
+def _import_pyarrow():  # type: ignore
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa
+    except ImportError as e:
+        raise ImportError(
+            "Arrow format needs pyarrow. Install it using `pip install pyarrow`."
+        ) from e
+
+    return pa
+
+
+def _to_json_str(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
 def to_csv(df: pd.DataFrame) -> str:
     return df.to_csv(sep="\t")
 
 
+def to_arrow(df: pd.DataFrame) -> "pyarrow.Table":
+    """Convert `df` to an arrow table.
+
+    Object columns holding values that arrow cannot type (for instance, a
+    mix of dicts and numbers in a summary column) are sent as JSON strings.
+    """
+    pa = _import_pyarrow()
+    arrow_errors = (
+        pa.ArrowInvalid,
+        pa.ArrowTypeError,
+        pa.ArrowNotImplementedError,
+    )
+    try:
+        return pa.Table.from_pandas(df)
+    except arrow_errors:
+        df = df.copy()
+
+        for col in df.columns[df.dtypes == object]:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except arrow_errors:
+                logger.debug(f"Sending column {col} as JSON strings.")
+                df[col] = df[col].map(_to_json_str, na_action="ignore")
+
+        return pa.Table.from_pandas(df)
+
+
+def write_arrow(df: pd.DataFrame, sink: Any) -> None:
+    """Write `df` to `sink` as a stream of arrow IPC record batches."""
+    pa = _import_pyarrow()
+    table = to_arrow(df)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=ARROW_BATCH_SIZE):
+            writer.write_batch(batch)
+
+
+def is_arrow(head: bytes) -> bool:
+    return head.startswith(ARROW_STREAM_MARKER) or head.startswith(
+        ARROW_FILE_MAGIC
+    )
+
+
+def read_arrow(source: Any) -> pd.DataFrame:
+    """Read an arrow IPC stream or file from `source` (path or binary stream)."""
+    pa = _import_pyarrow()
+
+    if isinstance(source, (str, pathlib.Path)):
+        source = pa.memory_map(str(source), "r")
+        head = source.read(len(ARROW_FILE_MAGIC))
+        source.seek(0)
+
+        if head == ARROW_FILE_MAGIC:
+            return pa.ipc.open_file(source).read_pandas()
+
+    return pa.ipc.open_stream(source).read_pandas()
+
+
+def to_jsonl(df: pd.DataFrame) -> str:
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+
+    return df.to_json(orient="records", lines=True, default_handler=str)
+
+
+def write_jsonl(
+    records: Iterable[Dict[str, Any]], output_file: Optional[pathlib.Path]
+) -> None:
+    """Write one JSON object per line as the records arrive."""
+
+    def write(f: Any) -> None:
+        for record in records:
+            f.write(json.dumps(record, default=str))
+            f.write("\n")
+            f.flush()
+
+    if output_file:
+        logger.debug(f"Writing JSON lines to {output_file}.")
+        with open(output_file, "w") as f:
+            write(f)
+    else:
+        logger.debug(f"No output file, printing JSON lines on stdout.")
+        write(sys.stdout)
+
+
 def write_df(
-    df: pd.DataFrame, output_file: Optional[pathlib.Path], skip_writing: bool
+    df: pd.DataFrame,
+    output_file: Optional[pathlib.Path],
+    skip_writing: bool,
+    output_format: str = "tsv",
 ) -> None:
-    if output_file and not skip_writing:
+    if skip_writing:
+        logger.debug("Not writing/printing because skip_writing=True")
+
+        return
+
+    if output_format == "arrow":
+        if output_file:
+            logger.debug(f"Writing arrow stream to {output_file}.")
+            with open(output_file, "wb") as f:
+                write_arrow(df, f)
+        else:
+            logger.debug(f"No output file, writing arrow stream on stdout.")
+            write_arrow(df, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+    elif output_format == "jsonl":
+        if output_file:
+            logger.debug(f"Writing JSON lines to {output_file}.")
+            with open(output_file, "w") as f:
+                f.write(to_jsonl(df))
+        else:
+            logger.debug(f"No output file, printing JSON lines on stdout.")
+            sys.stdout.write(to_jsonl(df))
+    elif output_file:
         with open(output_file, "w") as f:
             logger.debug(f"Writing to {output_file}.")
             output = to_csv(df)
             f.write(output)
-    elif not skip_writing:
+    else:
         logger.debug(f"No output file, printing on stdout.")
         output = to_csv(df)
         sys.stdout.write(output)
-    else:
-        logger.debug("Not writing/printing because skip_writing=True")
 
 
 def read_df(path: pathlib.Path, sep: str = "\t") -> pd.DataFrame:
+    """Read a DataFrame written by `write_df`.
+
+    `path` can be "-" to read from stdin. The format (TSV or arrow) is
+    detected from the first bytes of the input.
+    """
+
+    if str(path) == "-":
+        source = sys.stdin.buffer
+
+        if not hasattr(source, "peek"):
+            source = io.BufferedReader(source)
+
+        if is_arrow(source.peek(len(ARROW_FILE_MAGIC))):
+            return read_arrow(source)
+
+        return pd.read_csv(source, sep=sep)
+
+    with open(path, "rb") as f:
+        head = f.read(len(ARROW_FILE_MAGIC))
+
+    if is_arrow(head):
+        return read_arrow(path)
+
     return pd.read_csv(path, sep=sep)
 
 
-def all_data_df(
+def query_runs(
     entity: str,
     project: str,
     sweep: Optional[str] = None,
@@ -48,9 +227,9 @@ def all_data_df(
     filters: Optional[
         Dict
     ] = None,  # see: https://github.com/wandb/client/blob/5a65037a435cbc8a885ab78fe5f23b8d7e10f5d2/wandb/apis/public.py#L428
-) -> pd.DataFrame:
+) -> wandb.apis.public.Runs:
     """
-    Get the data for all the runs.
+    Query the runs of the project (and sweep). The runs are fetched page by page while iterating.
     """
 
     if api is None:
@@ -67,14 +246,197 @@ def all_data_df(
             f_list.append(filters)
         f = {"$and": f_list}
         runs = api.runs(f"{entity}/{project}", filters=f)  # type:ignore
+
+    return runs
+
+
+# Number of run ids put in one {"name": {"$in": [...]}} query
+RUNS_QUERY_CHUNK_SIZE = 200
+
+
+def fetch_runs(
+    api: wandb.apis.public.Api,
+    paths: Iterable[str],
+    chunk_size: int = RUNS_QUERY_CHUNK_SIZE,
+) -> Dict[str, wandb.apis.public.Run]:
+    """
+    Fetch the runs with the given "entity/project/run_id" paths using one
+    query per project (per `chunk_size` runs) instead of one query per run.
+    """
+    by_project: Dict[str, List[str]] = {}
+
+    for path in paths:
+        entity_project, run_id = path.rsplit("/", 1)
+        by_project.setdefault(entity_project, []).append(run_id)
+    runs = {}
+
+    for entity_project, run_ids in by_project.items():
+        for start in range(0, len(run_ids), chunk_size):
+            chunk = run_ids[start : start + chunk_size]
+            logger.debug(f"Fetching {len(chunk)} runs from {entity_project}")
+
+            for run in api.runs(
+                entity_project, filters={"name": {"$in": chunk}}
+            ):
+                runs[f"{entity_project}/{run.id}"] = run
+
+    return runs
+
+
+def run_summary(
+    run: wandb.apis.public.Run, store: Optional[SummaryStore] = None
+) -> Dict[str, Any]:
+    """
+    Summary of the run. If `store` is given, only the scalar values are returned
+    and the keys of the other values are recorded in the store.
+    """
+    # We call ._json_dict to omit large files
+    summary = run.summary._json_dict
+
+    if store is None:
+        return dict(summary)
+    scalars, nested = split_summary(summary)
+    store.add(f"{run.entity}/{run.project}/{run.id}", nested)
+
+    return scalars
+
+
+def run_record(
+    run: wandb.apis.public.Run, store: Optional[SummaryStore] = None
+) -> Dict[str, Any]:
+    """
+    Nested record for a run with the config and summary kept as dicts.
+    """
+
+    return {
+        "run": run.id,
+        "run_name": run.name,
+        "entity": run.entity,
+        "project": run.project,
+        "path": f"{run.entity}/{run.project}/{run.id}",
+        "tags": list(run.tags),
+        "sweep": run.sweep.id if run.sweep else "",
+        "sweep_name": run.sweep.config.get("name", "") if run.sweep else "",
+        "config": {
+            k: v for k, v in run.config.items() if not k.startswith("_")
+        },
+        "summary": run_summary(run, store),
+    }
+
+
+def iter_run_records(
+    entity: str,
+    project: str,
+    sweep: Optional[str] = None,
+    api: Optional[wandb.apis.public.Api] = None,
+    filters: Optional[Dict] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one nested record (see `run_record`) per run as the runs arrive from the server.
+    """
+
+    for run in query_runs(entity, project, sweep, api, filters):
+        yield run_record(run)
+
+
+class RunStream(object):
+    """
+    Lazy stream of run records passed between chained commands.
+
+    Commands that can consume the records one by one (like `print --format jsonl`)
+    iterate over it. For every other command, the stream is turned into a DataFrame
+    using `to_df` first. With `keep_records` (set when another command reads
+    the stream afterwards), the records are kept as the stream is consumed, so
+    that command does not query the server again. Otherwise they are not
+    kept, and the stream is consumed in constant memory.
+    """
+
+    def __init__(
+        self,
+        records: Callable[[], Iterator[Dict[str, Any]]],
+        to_df: Callable[[], pd.DataFrame],
+        keep_records: bool = False,
+    ):
+        self._records = records
+        self._to_df = to_df
+        self.keep_records = keep_records
+        self._cached: Optional[List[Dict[str, Any]]] = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._cached is not None:
+            return iter(self._cached)
+
+        if not self.keep_records:
+            return self._records()
+
+        return self._cache_records()
+
+    def _cache_records(self) -> Iterator[Dict[str, Any]]:
+        records = []
+
+        for record in self._records():
+            records.append(record)
+            yield record
+        self._cached = records
+
+    def to_df(self) -> pd.DataFrame:
+        if self._cached is not None:
+            return pd.DataFrame.from_records(
+                [flatten_record(r) for r in self._cached]
+            )
+
+        return self._to_df()
+
+
+def all_data_df(
+    entity: str,
+    project: str,
+    sweep: Optional[str] = None,
+    api: Optional[wandb.apis.public.Api] = None,
+    filters: Optional[
+        Dict
+    ] = None,  # see: https://github.com/wandb/client/blob/5a65037a435cbc8a885ab78fe5f23b8d7e10f5d2/wandb/apis/public.py#L428
+    layout: str = "wide",
+    lazy_summary: bool = False,
+) -> pd.DataFrame:
+    """
+    Get the data for all the runs.
+
+    `layout` is one of "wide", "long" or "sparse". See `wandb_utils.layout`.
+
+    If `lazy_summary` is True, only the scalar summary values are put in the
+    table. The others (histograms, tables, media, etc.) are fetched when asked
+    for using `wandb_utils.summary_store.load_summary`.
+    """
+    runs = query_runs(entity, project, sweep, api, filters)
+    store = SummaryStore(api) if lazy_summary else None
+
+    if layout == "long":
+        all_df = long_from_records(run_record(run, store) for run in runs)
+    elif layout == "sparse":
+        all_df = sparse_from_records(run_record(run, store) for run in runs)
+    elif layout == "wide":
+        all_df = _wide_df(runs, store)
+    else:
+        raise ValueError(f"Unknown layout {layout}. Use one of {LAYOUTS}")
+
+    if store is not None:
+        all_df.attrs[SUMMARY_STORE_ATTR] = store
+
+    return all_df
+
+
+def _wide_df(
+    runs: Iterable[wandb.apis.public.Run], store: Optional[SummaryStore]
+) -> pd.DataFrame:
     summary_list = []
     config_list = []
     name_list = []
     sweep_list = []
 
     for run in runs:
-        # run.summary are the output key/values like accuracy.  We call ._json_dict to omit large files
-        summary_list.append({k: v for k, v in run.summary._json_dict.items()})
+        # run.summary are the output key/values like accuracy.
+        summary_list.append(run_summary(run, store))
 
         # run.config is the input metrics.  We remove special values that start with _.
         config_list.append(
@@ -22,6 +22,22 @@ class NameBasedRunFilter(RunFilter):
         self.not_allowed_names = set(not_allowed_names or [])
         self.allowed_branch = bool(allowed_names)
 
+    def query_filters(self, chunk_size: int) -> Optional[List[Dict]]:
+        """
+        Filters for `api.runs` that select the allowed runs on the server, one
+        per `chunk_size` names. None for a filter of not allowed names, which
+        has to be applied to the runs as they are fetched.
+        """
+
+        if not self.allowed_branch:
+            return None
+        names = sorted(self.allowed_names)
+
+        return [
+            {"name": {"$in": names[i : i + chunk_size]}}
+            for i in range(0, len(names), chunk_size)
+        ]
+
     def __call__(self, run: wandb.apis.public.Run) -> bool:
         if self.allowed_branch:
             return run.id in self.allowed_names
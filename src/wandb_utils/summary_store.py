@@ -0,0 +1,131 @@
+from typing import List, Tuple, Union, Dict, Any, Optional, Iterable
+import logging
+from collections import defaultdict
+import pandas as pd
+import wandb
+from wandb_utils.layout import is_long
+
+logger = logging.getLogger(__name__)
+
+# key of DataFrame.attrs under which all_data_df keeps the store
+SUMMARY_STORE_ATTR = "summary_store"
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def split_summary(summary: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Split a run summary into the scalar values and the keys of the non-scalar
+    ones (histograms, table references, media metadata, etc.).
+    """
+    scalars = {}
+    nested = []
+
+    for k, v in summary.items():
+        if isinstance(v, SCALAR_TYPES):
+            scalars[k] = v
+        else:
+            nested.append(k)
+
+    return scalars, nested
+
+
+class SummaryStore(object):
+    """
+    Side store for the non-scalar summary values of the runs in a DataFrame.
+
+    Only the keys of the values are kept. The values are fetched from the server,
+    one query per project, the first time a command asks for them.
+    """
+
+    def __init__(self, api: Optional[wandb.apis.public.Api] = None):
+        self._api = api
+        self.keys: Dict[str, List[str]] = {}
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def api(self) -> wandb.apis.public.Api:
+        if self._api is None:
+            self._api = wandb.Api()
+
+        return self._api
+
+    def add(self, path: str, keys: List[str]) -> None:
+        if keys:
+            self.keys[path] = keys
+
+    def has(self, path: str, key: str) -> bool:
+        return key in self.keys.get(path, [])
+
+    def fetch(self, paths: Iterable[str]) -> None:
+        """Fetch the summaries of `paths` that are not fetched yet."""
+        by_project: Dict[str, List[str]] = defaultdict(list)
+
+        for path in paths:
+            if path in self.keys and path not in self._summaries:
+                entity_project, run_id = path.rsplit("/", 1)
+                by_project[entity_project].append(run_id)
+
+        for entity_project, run_ids in by_project.items():
+            logger.info(
+                f"Fetching summaries of {len(run_ids)} runs from {entity_project}"
+            )
+            runs = self.api.runs(
+                entity_project, filters={"name": {"$in": run_ids}}
+            )
+
+            for run in runs:
+                self._summaries[f"{entity_project}/{run.id}"] = {
+                    k: v
+                    for k, v in run.summary._json_dict.items()
+                    if k in self.keys.get(f"{entity_project}/{run.id}", [])
+                }
+
+    def get(self, path: str, key: str) -> Any:
+        if not self.has(path, key):
+            return None
+        self.fetch([path])
+
+        return self._summaries.get(path, {}).get(key)
+
+    def load(self, df: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        """Add the columns `keys` to `df` using the `path` column (or index)."""
+        paths = list(df["path"] if "path" in df.columns else df.index)
+        self.fetch(p for p in paths if any(self.has(p, k) for k in keys))
+        df = df.copy()
+
+        for key in keys:
+            existing = df[key] if key in df.columns else [None] * len(df)
+            df[key] = [
+                self._summaries.get(p, {}).get(key) if self.has(p, key) else v
+                for p, v in zip(paths, existing)
+            ]
+
+        return df
+
+    def __deepcopy__(self, memo: Dict) -> "SummaryStore":
+        # pandas deep copies DataFrame.attrs on most operations.
+        # The store is shared instead of being copied with every derived DataFrame.
+
+        return self
+
+
+def load_summary(df: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    Materialize the lazily stored summary values `keys` as columns of `df`,
+    which should have one row per run (the wide or sparse layout).
+    """
+    store = df.attrs.get(SUMMARY_STORE_ATTR)
+
+    if store is None:
+        raise ValueError(
+            "The dataframe has no lazily stored summary values. "
+            "Use `all-data --lazy-summary` to create one."
+        )
+
+    if is_long(df):
+        raise ValueError(
+            "The summary values can only be loaded into a dataframe with one "
+            "row per run. Use `all-data --layout wide` or `--layout sparse`."
+        )
+
+    return store.load(df, keys)
@@ -0,0 +1,136 @@
+from typing import List, Tuple, Union, Dict, Any, Optional, Iterable
+import logging
+import numpy as np
+import pandas as pd
+from wandb_utils.layout import is_long, to_wide
+
+logger = logging.getLogger(__name__)
+
+TAG_SEP = "|"
+
+
+def _split_tags(tags: Any) -> List[str]:
+    if isinstance(tags, str):
+        return [t for t in tags.split(TAG_SEP) if t]
+    elif isinstance(tags, (list, tuple, set, np.ndarray)):
+        return list(tags)
+    else:  # NaN when the run has no tags and the df was read from a file
+        return []
+
+
+class TagIndex(object):
+    """
+    Inverted index from a tag to the positions of the rows (runs) that have it.
+
+    The tag filters are answered using boolean masks over the rows, so selecting
+    runs by tags does not scan the tag strings and a tag never matches another
+    tag that merely contains it.
+    """
+
+    def __init__(self, postings: Dict[str, np.ndarray], num_rows: int):
+        self.postings = postings
+        self.num_rows = num_rows
+
+    @classmethod
+    def from_tags(
+        cls, tags: Iterable[Union[str, Iterable[str]]]
+    ) -> "TagIndex":
+        """
+        Build the index from the tags of each row.
+
+        The tags for a row can either be the '|' joined string stored in the
+        `tags` column by `all_data_df` or a list of tags.
+        """
+        tag_lists = [_split_tags(t) for t in tags]
+        num_rows = len(tag_lists)
+        lengths = np.fromiter(
+            (len(t) for t in tag_lists), dtype=np.int64, count=num_rows
+        )
+        positions = np.repeat(np.arange(num_rows), lengths)
+        codes, uniques = pd.factorize(
+            np.array([t for ts in tag_lists for t in ts], dtype=object)
+        )
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        sorted_positions = positions[order]
+        postings = {
+            tag: sorted_positions[bounds[i] : bounds[i + 1]]
+            for i, tag in enumerate(uniques)
+        }
+
+        return cls(postings, num_rows)
+
+    @property
+    def tags(self) -> List[str]:
+        return list(self.postings.keys())
+
+    def positions(self, tag: str) -> np.ndarray:
+        return self.postings.get(tag, np.empty(0, dtype=np.int64))
+
+    def mask(self, tag: str) -> np.ndarray:
+        """Boolean mask of the rows that have `tag`."""
+        mask = np.zeros(self.num_rows, dtype=bool)
+        mask[self.positions(tag)] = True
+
+        return mask
+
+    def any(self, tags: Iterable[str]) -> np.ndarray:
+        """Boolean mask of the rows that have at least one of `tags`."""
+        mask = np.zeros(self.num_rows, dtype=bool)
+
+        for tag in tags:
+            mask[self.positions(tag)] = True
+
+        return mask
+
+    def all(self, tags: Iterable[str]) -> np.ndarray:
+        """Boolean mask of the rows that have every one of `tags`."""
+        mask = np.ones(self.num_rows, dtype=bool)
+
+        for tag in tags:
+            mask &= self.mask(tag)
+
+        return mask
+
+    def to_multi_hot(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """Boolean DataFrame with one column per tag."""
+
+        return pd.DataFrame(
+            {tag: self.mask(tag) for tag in self.postings}, index=index
+        )
+
+
+def select_by_tags(
+    df: pd.DataFrame,
+    any_tags: Optional[List[str]] = None,
+    all_tags: Optional[List[str]] = None,
+    column: str = "tags",
+) -> pd.DataFrame:
+    """Keep the rows of `df` that have any of `any_tags` and all of `all_tags`."""
+
+    if not any_tags and not all_tags:
+        return df
+
+    if is_long(df):
+        # select on the pivoted tags and keep all the rows of the selected runs
+        runs = select_by_tags(
+            to_wide(df, [column]), any_tags, all_tags, column
+        )
+
+        return df[df["path"].isin(runs["path"])]
+
+    if column not in df.columns:
+        raise ValueError(
+            f"Tag filters need a '{column}' column in the dataframe."
+        )
+    index = TagIndex.from_tags(df[column])
+    mask = np.ones(len(df), dtype=bool)
+
+    if any_tags:
+        mask &= index.any(any_tags)
+
+    if all_tags:
+        mask &= index.all(all_tags)
+    logger.debug(f"{mask.sum()} of {len(df)} runs selected using tags.")
+
+    return df[mask]
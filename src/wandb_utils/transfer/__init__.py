@@ -0,0 +1,48 @@
+from .report import TransferReport
+from .download import (
+    download_file,
+    fetch_file,
+    fetch_to,
+    check_local,
+    download_all,
+    download_files,
+    download_runs,
+    list_runs_files,
+    DEFAULT_JOBS,
+    DownloadItem,
+)
+from .manifest import Manifest, md5_file, MANIFEST_FILENAME
+from .stream import (
+    stream_download,
+    stream_to,
+    IncompleteDownload,
+    RangeNotSupported,
+    PARTIAL_SUFFIX,
+)
+from .store import ContentStore
+from .session import PooledSession, shared_session
+from .listing import ListingCache, listing_cache, run_files
+from .upload import (
+    upload_all,
+    upload_urls,
+    put_file,
+    remote_name,
+    split_unchanged,
+    upload_hashes,
+    UploadItem,
+)
+from .delete import (
+    delete_all,
+    delete_batch,
+    filtered_runs_files,
+    runs_files_to_delete,
+)
+from .move import move_all
+from .archive import (
+    ArchiveWriter,
+    ArchiveItem,
+    export_all,
+    read_member,
+    INDEX_SUFFIX,
+)
+from .rclone import rcat, rclone_all, RcloneItem, RcloneError
@@ -0,0 +1,339 @@
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Iterable,
+    IO,
+)
+import io
+import json
+import logging
+import os
+import pathlib
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+import tqdm
+import wandb
+from .download import DEFAULT_JOBS, fetch_to
+from .report import TransferReport
+from .session import shared_session
+from .stream import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# (name of the member in the archive, file)
+ArchiveItem = Tuple[str, wandb.apis.public.File]
+
+ARCHIVE_SUFFIXES = (".tar", ".zip")
+# the index of all the shards is written next to the archive
+INDEX_SUFFIX = ".index.jsonl"
+# the index of the members of a shard is its last member
+INDEX_MEMBER = ".wandb_utils_index.jsonl"
+# downloaded files are kept in memory up to this size, in a temporary file
+# beyond, until they are written to the archive
+SPOOL_SIZE = int(os.environ.get("WANDB_UTILS_SPOOL_SIZE", 16 * 1024 * 1024))
+# total size of the downloaded files kept in memory at once, the others wait
+# in temporary files
+SPOOL_MEMORY = int(
+    os.environ.get("WANDB_UTILS_SPOOL_MEMORY", 128 * 1024 * 1024)
+)
+# number of downloaded files waiting to be written to the archive
+QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+class ArchiveWriter(object):
+    """
+    Writes members to the tar or zip archive `path` (by its suffix) or, with
+    a `shard_size` (bytes), to the shards `<stem>-00000<suffix>`,
+    `<stem>-00001<suffix>`, ... of at most `shard_size` bytes of data each
+    (a larger member gets a shard of its own).
+
+    The members are stored uncompressed, so the data of a member can be read
+    at the offset recorded in the index: the shard, offset, size and md5 of
+    every member, as json lines. The index of each shard is its last member
+    (`INDEX_MEMBER`), and the index of all the shards is written next to the
+    archive (`path` + `INDEX_SUFFIX`) when the writer is closed.
+    """
+
+    def __init__(
+        self, path: Union[str, pathlib.Path], shard_size: Optional[int] = None
+    ):
+        self.path = pathlib.Path(path)
+
+        if self.path.suffix not in ARCHIVE_SUFFIXES:
+            raise ValueError(
+                f"The archive {self.path} should end with one of {ARCHIVE_SUFFIXES}"
+            )
+        self.shard_size = shard_size
+        self.index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        self.index: List[Dict[str, Any]] = []
+        self.shards: List[pathlib.Path] = []
+        self._archive: Union[tarfile.TarFile, zipfile.ZipFile, None] = None
+        self._shard_index: List[Dict[str, Any]] = []
+        self._shard_bytes = 0
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _open_shard(self) -> None:
+        if self.shard_size:
+            path = self.path.with_name(
+                f"{self.path.stem}-{len(self.shards):05d}{self.path.suffix}"
+            )
+        else:
+            path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        logger.debug(f"Writing archive {path}")
+        self.shards.append(path)
+        self._shard_index = []
+        self._shard_bytes = 0
+
+        if path.suffix == ".zip":
+            self._archive = zipfile.ZipFile(
+                path, "w", zipfile.ZIP_STORED, allowZip64=True
+            )
+        else:
+            self._archive = tarfile.open(path, "w", format=tarfile.PAX_FORMAT)
+
+    def _write(self, name: str, fileobj: IO[bytes], size: int) -> int:
+        """Write a member, returns the offset of its data in the shard."""
+
+        if isinstance(self._archive, zipfile.ZipFile):
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.file_size = size
+            with self._archive.open(
+                info, "w", force_zip64=size >= zipfile.ZIP64_LIMIT
+            ) as member:
+                shutil.copyfileobj(fileobj, member, CHUNK_SIZE)
+
+            # the data ends where the next member starts
+            return self._archive.fp.tell() - info.compress_size  # type: ignore
+        assert self._archive is not None
+        tar_info = tarfile.TarInfo(name)
+        tar_info.size = size
+        tar_info.mtime = int(time.time())
+        tar_info.mode = 0o644
+        self._archive.addfile(tar_info, fileobj)
+        # the data is padded to a whole number of blocks
+        padded = -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+        return self._archive.offset - padded
+
+    def add(
+        self,
+        name: str,
+        fileobj: IO[bytes],
+        size: int,
+        md5: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Append `size` bytes of `fileobj` as the member `name`, starting a new
+        shard if needed. Returns the entry of the member in the index.
+        """
+
+        if self._archive is None or (
+            self.shard_size
+            and self._shard_index
+            and self._shard_bytes + size > self.shard_size
+        ):
+            self._close_shard()
+            self._open_shard()
+        offset = self._write(name, fileobj, size)
+        entry = {
+            "member": name,
+            "shard": self.shards[-1].name,
+            "offset": offset,
+            "size": size,
+            "md5": md5,
+        }
+        self._shard_index.append(entry)
+        self.index.append(entry)
+        self._shard_bytes += size
+
+        return entry
+
+    def _close_shard(self) -> None:
+        if self._archive is None:
+            return
+        data = "".join(json.dumps(e) + "\n" for e in self._shard_index)
+        self._write(INDEX_MEMBER, io.BytesIO(data.encode()), len(data))
+        self._archive.close()
+        self._archive = None
+
+    def close(self) -> None:
+        if not self.shards:
+            # an empty archive
+            self._open_shard()
+        self._close_shard()
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            for entry in self.index:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.index_path)
+
+
+class SpoolBudget(object):
+    """
+    Bounds the bytes of the downloaded files kept in memory until they are
+    written to the archive: a file of at most `SPOOL_SIZE` bytes is spooled
+    in memory if it fits in the `size` bytes left, and in a temporary file on
+    disk otherwise.
+    """
+
+    def __init__(self, size: int = SPOOL_MEMORY):
+        self.size = size
+        self.used = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def spool(self, size: int) -> Tuple[IO[bytes], int]:
+        """
+        A temporary file for `size` bytes of data. Returns the file and the
+        bytes reserved in memory for it, to `release` once it is closed.
+        """
+        with self._lock:
+            if size <= SPOOL_SIZE and self.used + size <= self.size:
+                self.used += size
+                self.peak = max(self.peak, self.used)
+                # rolls over to disk if the data is larger than announced
+                spool = tempfile.SpooledTemporaryFile(max_size=max(size, 1))
+
+                return spool, size  # type: ignore
+
+        return tempfile.TemporaryFile(), 0
+
+    def release(self, reserved: int) -> None:
+        with self._lock:
+            self.used -= reserved
+
+
+def read_member(index_path: Union[str, pathlib.Path], member: str) -> bytes:
+    """The data of `member`, read directly at its offset using the index."""
+    index_path = pathlib.Path(index_path)
+
+    with open(index_path) as f:
+        for line in f:
+            entry = json.loads(line)
+
+            if entry["member"] == member:
+                with open(index_path.parent / entry["shard"], "rb") as shard:
+                    shard.seek(entry["offset"])
+
+                    return shard.read(entry["size"])
+
+    raise KeyError(member)
+
+
+def export_all(
+    items: Iterable[ArchiveItem],
+    path: Union[str, pathlib.Path],
+    shard_size: Optional[int] = None,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+    desc: str = "Archiving files",
+    verify: bool = False,
+    queue_size: int = QUEUE_SIZE,
+    spool_memory: int = SPOOL_MEMORY,
+) -> TransferReport:
+    """
+    Download `items` into the archive `path` (see `ArchiveWriter`) without
+    writing them as individual local files.
+
+    The files are downloaded by a pool of `jobs` threads, each one into a
+    temporary file, and one writer thread appends them to the archive as
+    their downloads complete. At most `queue_size` downloaded files wait for
+    the writer, and at most `spool_memory` bytes of them are kept in memory
+    (see `SpoolBudget`), the others in temporary files. With `verify`,
+    the md5 of the files is checked while they are downloaded (see
+    `fetch_to`). A file that fails is left out of the archive and recorded in
+    the returned report, under its member name.
+    """
+    report = report if report is not None else TransferReport("Archived")
+    session = shared_session(jobs)
+    done: "queue.Queue" = queue.Queue()
+    # downloads in flight and waiting for the writer
+    slots = threading.Semaphore(max(1, jobs) + max(1, queue_size))
+    pbar = tqdm.tqdm(total=0, unit="B", unit_scale=True, desc=desc)
+    pbar_lock = threading.Lock()
+    writer = ArchiveWriter(path, shard_size)
+    writer_errors: List[BaseException] = []
+    budget = SpoolBudget(spool_memory)
+
+    def work(name: str, file_: wandb.apis.public.File) -> None:
+        spool, reserved = budget.spool(file_.size or 0)
+        try:
+            fetch_to(file_, spool.write, session=session, verify=verify)
+        except Exception as e:
+            spool.close()
+            budget.release(reserved)
+            done.put((name, file_, None, 0, e))
+
+            return
+        done.put((name, file_, spool, reserved, None))
+
+    def write_all() -> None:
+        while True:
+            item = done.get()
+
+            if item is _DONE:
+                return
+            name, file_, spool, reserved, error = item
+            try:
+                if error is not None:
+                    report.fail(name, error)
+                elif writer_errors:
+                    report.fail(name, writer_errors[0])
+                else:
+                    size = spool.seek(0, os.SEEK_END)
+                    spool.seek(0)
+                    writer.add(name, spool, size, file_.md5)
+                    report.succeed(name, size)
+            except Exception as e:
+                # for instance, the disk is full
+                writer_errors.append(e)
+                report.fail(name, e)
+            finally:
+                if spool is not None:
+                    spool.close()
+                budget.release(reserved)
+                slots.release()
+                with pbar_lock:
+                    pbar.update(file_.size)
+
+    thread = threading.Thread(target=write_all, daemon=True)
+    thread.start()
+    try:
+        with pbar, ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures: List[Future] = []
+
+            for name, file_ in items:
+                slots.acquire()
+                with pbar_lock:
+                    pbar.total += file_.size
+                    pbar.refresh()
+                futures.append(pool.submit(work, name, file_))
+            wait(futures)
+    finally:
+        done.put(_DONE)
+        thread.join()
+    writer.close()
+    logger.info(
+        f"Wrote {len(writer.index)} files to {len(writer.shards)} archive(s), "
+        f"index in {writer.index_path}"
+    )
+
+    return report
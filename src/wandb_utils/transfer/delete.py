@@ -0,0 +1,216 @@
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Iterable,
+    Iterator,
+)
+import logging
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+import tqdm
+import wandb
+from wandb_gql import gql
+from wandb_utils.file_filter import FileFilter
+from wandb_utils.governor import is_governed
+from .download import DEFAULT_JOBS
+from .listing import ListingCache, list_concurrently, run_files
+from .report import TransferReport
+
+logger = logging.getLogger(__name__)
+
+# (name used in the report, file to delete)
+DeleteItem = Tuple[str, wandb.apis.public.File]
+
+DELETE_FILES = gql("""
+mutation deleteFiles($files: [ID!]!) {
+    deleteFiles(input: {
+        files: $files
+    }) {
+        success
+    }
+}
+""")
+# number of files deleted with one mutation
+BATCH_SIZE = 50
+MAX_RETRIES = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_BACKOFF = 2.0
+
+
+def is_throttled(error: BaseException) -> bool:
+    """Whether `error` is worth retrying later (throttling or server error)."""
+    # normalize_exceptions wraps the original error in a CommError
+    error = getattr(error, "exc", None) or error
+
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+
+    return response is not None and response.status_code in RETRY_STATUSES
+
+
+def delete_batch(
+    files: List[wandb.apis.public.File], max_retries: Optional[int] = None
+) -> None:
+    """
+    Delete `files` with one `deleteFiles` mutation, retrying with exponential
+    backoff (at most `max_retries` times) while the server throttles the
+    requests or fails. By default, the mutation is retried `MAX_RETRIES`
+    times, or only by the governor of the api if it has one (see
+    `wandb_utils.governor`).
+    """
+    client = files[0].client
+
+    if max_retries is None:
+        max_retries = 0 if is_governed(client) else MAX_RETRIES
+    attempt = 0
+
+    while True:
+        try:
+            client.execute(
+                DELETE_FILES, variable_values={"files": [f.id for f in files]}
+            )
+
+            return
+        except Exception as e:
+            if attempt >= max_retries or not is_throttled(e):
+                raise
+            delay = RETRY_BACKOFF * 2**attempt
+            logger.debug(
+                f"Deleting files throttled ({e!r}), retry in {delay}s"
+            )
+        time.sleep(delay)
+        attempt += 1
+
+
+def delete_all(
+    items: Iterable[DeleteItem],
+    jobs: int = DEFAULT_JOBS,
+    batch_size: Optional[int] = None,
+    report: Optional[TransferReport] = None,
+    desc: str = "Deleting files",
+) -> TransferReport:
+    """
+    Delete the files of `items` from the server, `batch_size` files (by
+    default `BATCH_SIZE`) per mutation, with at most `jobs` mutations in
+    flight.
+
+    `items` is consumed lazily, so deletions start while it is still being
+    produced (for instance, while the files of other runs are being listed).
+    Throttled mutations are retried with backoff (see `delete_batch`), and a
+    batch that is still throttled after the retries fails as a whole rather
+    than adding one mutation per file. If a batch fails otherwise, its files
+    are deleted one at a time so that only the files that cannot be deleted
+    are recorded as failures in the returned report.
+    """
+    report = report if report is not None else TransferReport("Deleted")
+    batch_size = batch_size or BATCH_SIZE
+    pbar = tqdm.tqdm(total=0, unit="files", desc=desc)
+    pbar_lock = threading.Lock()
+
+    def work(batch: List[DeleteItem]) -> None:
+        try:
+            delete_batch([f for _, f in batch])
+
+            for name, file_ in batch:
+                report.succeed(name, file_.size)
+        except Exception as e:
+            if len(batch) == 1 or is_throttled(e):
+                for name, _ in batch:
+                    report.fail(name, e)
+            else:
+                logger.debug(f"Batch deletion failed ({e!r}), one by one")
+
+                for item in batch:
+                    work([item])
+
+                return
+        with pbar_lock:
+            pbar.update(len(batch))
+
+    with pbar, ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures: List[Future] = []
+        batch: List[DeleteItem] = []
+
+        for item in items:
+            batch.append(item)
+
+            if len(batch) == batch_size:
+                with pbar_lock:
+                    pbar.total += len(batch)
+                    pbar.refresh()
+                futures.append(pool.submit(work, batch))
+                batch = []
+
+        if batch:
+            with pbar_lock:
+                pbar.total += len(batch)
+                pbar.refresh()
+            futures.append(pool.submit(work, batch))
+        wait(futures)
+
+    return report
+
+
+def filtered_runs_files(
+    runs: Iterable[wandb.apis.public.Run],
+    file_filter: Optional[FileFilter] = None,
+    cache: Optional[ListingCache] = None,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+) -> Iterator[Tuple[wandb.apis.public.Run, List[wandb.apis.public.File]]]:
+    """
+    List the files of `runs` concurrently, with a pool of `jobs` threads, and
+    yield every run with its files that pass `file_filter` as soon as its
+    listing is complete (see `list_concurrently`). The failures to list a run are recorded in `report`
+    under the run id (raised if there is no report).
+
+    Since the files are listed to be deleted, they are always listed from the
+    server, and the fresh listings are stored in `cache`.
+    """
+    file_filter = file_filter or FileFilter()
+
+    def list_run(
+        run: wandb.apis.public.Run,
+    ) -> List[wandb.apis.public.File]:
+        return file_filter.filter_many(run_files(run, cache, refresh=True))
+
+    for run, future in list_concurrently(runs, list_run, jobs):
+        error = future.exception()
+
+        if error is not None:
+            if report is None:
+                raise error
+            report.fail(run.id, error)
+
+            continue
+        yield run, future.result()
+
+
+def runs_files_to_delete(
+    runs: Iterable[wandb.apis.public.Run],
+    file_filter: Optional[FileFilter] = None,
+    cache: Optional[ListingCache] = None,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+) -> Iterator[DeleteItem]:
+    """
+    The files of `runs` that pass `file_filter`, named "<run id>/<file name>"
+    (see `filtered_runs_files`). The listing of every run with files to
+    delete is invalidated in `cache`.
+    """
+
+    for run, files in filtered_runs_files(
+        runs, file_filter, cache, jobs, report
+    ):
+        if files and cache is not None:
+            cache.invalidate(run)
+
+        for file_ in files:
+            yield f"{run.id}/{file_.name}", file_
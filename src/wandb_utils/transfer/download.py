@@ -0,0 +1,415 @@
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Callable,
+    Iterable,
+    Iterator,
+)
+import hashlib
+import logging
+import pathlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+import tqdm
+import wandb
+from wandb_utils.file_filter import FileFilter
+from .listing import ListingCache, list_concurrently, run_files
+from .manifest import Manifest, ChecksumMismatch, md5_file, b64_digest
+from .report import TransferReport
+from .store import ContentStore
+from .session import shared_session
+from .stream import stream_download, stream_to, api_auth
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = 8
+
+# (name used in the report, file, directory to download the file into)
+DownloadItem = Tuple[str, wandb.apis.public.File, pathlib.Path]
+
+
+def fetch_file(
+    file_: wandb.apis.public.File,
+    path: pathlib.Path,
+    session: Optional[requests.Session] = None,
+    verify: bool = False,
+) -> None:
+    """
+    Stream `file_` to `path` (see `stream_download`). With `verify`, the data
+    is checked against the md5 of the file listing while it is downloaded.
+
+    The signed direct url from the file listing is used when available. It
+    points to the storage bucket and needs no redirect through the wandb api.
+    The api url is used if the direct url is missing or rejected (for instance,
+    because its signature expired).
+    """
+    size = file_.size or None
+    md5 = file_.md5 if verify else None
+    direct_url = file_._attrs.get("directUrl")
+
+    if direct_url:
+        try:
+            stream_download(
+                direct_url, path, size=size, session=session, md5=md5
+            )
+
+            return
+        except requests.HTTPError as e:
+            if e.response is None or not 400 <= e.response.status_code < 500:
+                raise
+            logger.debug(f"Direct url of {file_.name} rejected: {e}")
+    stream_download(
+        file_.url, path, size=size, auth=api_auth(), session=session, md5=md5
+    )
+
+
+def fetch_to(
+    file_: wandb.apis.public.File,
+    write: Callable[[bytes], Any],
+    session: Optional[requests.Session] = None,
+    verify: bool = False,
+) -> int:
+    """
+    Stream the content of `file_` to `write` (see `stream_to`), from the
+    signed direct url when available, as `fetch_file`. With `verify`, the
+    data is hashed as it is streamed and `ChecksumMismatch` is raised (after
+    all the data was written) if it does not match the md5 of the listing.
+    Returns the number of bytes written.
+    """
+    size = file_.size or None
+    hash_md5 = hashlib.md5() if verify and file_.md5 else None
+    written = [0]
+
+    def write_chunk(chunk: bytes) -> None:
+        write(chunk)
+        written[0] += len(chunk)
+
+        if hash_md5 is not None:
+            hash_md5.update(chunk)
+
+    direct_url = file_._attrs.get("directUrl")
+    fetched = False
+
+    if direct_url:
+        try:
+            stream_to(direct_url, write_chunk, size=size, session=session)
+            fetched = True
+        except requests.HTTPError as e:
+            if e.response is None or not 400 <= e.response.status_code < 500:
+                raise
+            logger.debug(f"Direct url of {file_.name} rejected: {e}")
+
+    if not fetched:
+        # continues after the data already written from the direct url
+        stream_to(
+            file_.url,
+            write_chunk,
+            offset=written[0],
+            size=size,
+            auth=api_auth(),
+            session=session,
+        )
+
+    if hash_md5 is not None and b64_digest(hash_md5) != file_.md5:
+        raise ChecksumMismatch(
+            f"md5 of {file_.name} is {b64_digest(hash_md5)}, "
+            f"expected {file_.md5}"
+        )
+
+    return written[0]
+
+
+def check_local(file_: wandb.apis.public.File, path: pathlib.Path) -> None:
+    """
+    Raise `ChecksumMismatch` if the size or the md5 of the local copy `path`
+    of `file_` differ from the ones on the server.
+    """
+    size = path.stat().st_size
+
+    # File.size is 0 when the size is unknown
+    if file_._attrs.get("sizeBytes") is not None and size != file_.size:
+        raise ChecksumMismatch(
+            f"size of local {file_.name} is {size}, expected {file_.size}"
+        )
+
+    if not file_.md5:
+        return
+    md5 = md5_file(path)
+
+    if md5 != file_.md5:
+        raise ChecksumMismatch(
+            f"md5 of local {file_.name} is {md5}, expected {file_.md5}"
+        )
+
+
+def download_file(
+    file_: wandb.apis.public.File,
+    output_dir: pathlib.Path,
+    overwrite: bool = False,
+    store: Optional[ContentStore] = None,
+    session: Optional[requests.Session] = None,
+    verify: bool = False,
+) -> bool:
+    """
+    Download a single file. Returns False if the file exists and `overwrite` is False.
+
+    The file is streamed in chunks and resumed if the connection drops
+    (see `fetch_file`). With a `store`, a file whose md5 is already
+    in the store is linked from it instead of being downloaded, and downloaded
+    files are added to the store. Since a file in the store is linked into
+    other directories, the files added to it are always verified. See
+    `fetch_file` for `verify`.
+    """
+    path = output_dir / file_.name
+
+    if path.exists() and not overwrite:
+        return False
+
+    if store is None or not file_.md5:
+        logger.debug(f"Downloading: {file_.name} to {output_dir}")
+        fetch_file(file_, path, session, verify)
+
+        return True
+
+    with store.lock(file_.md5):
+        if store.has(file_.md5):
+            logger.debug(f"Linking: {file_.name} to {output_dir} from store")
+            store.link(file_.md5, path)
+        else:
+            logger.debug(f"Downloading: {file_.name} to {output_dir}")
+            fetch_file(file_, path, session, verify=True)
+            store.add(path, file_.md5)
+
+    return True
+
+
+def download_all(
+    items: Iterable[DownloadItem],
+    overwrite: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    after_download: Optional[Callable[[wandb.apis.public.File], None]] = None,
+    report: Optional[TransferReport] = None,
+    desc: str = "Downloading files",
+    sync: bool = False,
+    store: Optional[ContentStore] = None,
+    verify: bool = False,
+) -> TransferReport:
+    """
+    Download `items` using a pool of `jobs` threads.
+
+    `items` is consumed lazily, so downloads start while it is still being
+    produced (for instance, while the files of other runs are being listed).
+    `after_download`, if given, is called in the worker thread with every file
+    that was downloaded successfully (for instance, to delete it from the server).
+    A failure of one file does not stop the others. All the outcomes are
+    recorded in the returned report.
+
+    With `sync`, a local file is replaced only if its size or md5 differs from
+    the one on the server. The md5 of the local files are cached in a manifest
+    in each output directory (see `Manifest`).
+
+    With a `store`, identical files (same md5) are downloaded only once and
+    linked into every output directory (see `ContentStore`).
+
+    With `verify`, the downloaded files are checked against the md5 on the
+    server while they are streamed, and the local files that are kept are
+    hashed by the pool (ignoring the md5s cached in the manifest). Mismatches
+    are recorded as `ChecksumMismatch` failures. With `sync`, mismatching
+    local files are downloaded again instead.
+    """
+    report = report if report is not None else TransferReport()
+    pbar = tqdm.tqdm(total=0, unit="B", unit_scale=True, desc=desc)
+    pbar_lock = threading.Lock()
+    # one keep-alive connection per worker
+    session = shared_session(jobs)
+    manifests: Dict[pathlib.Path, Manifest] = {}
+    manifests_lock = threading.Lock()
+
+    def get_manifest(output_dir: pathlib.Path) -> Manifest:
+        with manifests_lock:
+            if output_dir not in manifests:
+                manifests[output_dir] = Manifest(output_dir)
+
+            return manifests[output_dir]
+
+    def sync_file(
+        file_: wandb.apis.public.File, output_dir: pathlib.Path
+    ) -> bool:
+        manifest = get_manifest(output_dir)
+
+        if manifest.is_current(file_, rehash=verify):
+            return False
+        download_file(
+            file_,
+            output_dir,
+            overwrite=True,
+            store=store,
+            session=session,
+            verify=verify,
+        )
+        manifest.record(file_.name, file_.md5)
+
+        return True
+
+    def work(
+        name: str, file_: wandb.apis.public.File, output_dir: pathlib.Path
+    ) -> None:
+        try:
+            if sync:
+                downloaded = sync_file(file_, output_dir)
+                skip_reason = "unchanged"
+            else:
+                downloaded = download_file(
+                    file_,
+                    output_dir,
+                    overwrite,
+                    store=store,
+                    session=session,
+                    verify=verify,
+                )
+                skip_reason = "exists"
+
+                if not downloaded and verify:
+                    check_local(file_, output_dir / file_.name)
+
+            if not downloaded:
+                report.skip(name, skip_reason)
+            else:
+                if after_download is not None:
+                    after_download(file_)
+                report.succeed(name, file_.size)
+        except Exception as e:
+            report.fail(name, e)
+        finally:
+            with pbar_lock:
+                pbar.update(file_.size)
+
+    with pbar, ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures: List[Future] = []
+
+        for name, file_, output_dir in items:
+            with pbar_lock:
+                pbar.total += file_.size
+                pbar.refresh()
+            futures.append(pool.submit(work, name, file_, output_dir))
+        wait(futures)
+
+    for manifest in manifests.values():
+        manifest.save()
+
+    if store is not None:
+        store.log_summary()
+
+    return report
+
+
+def download_files(
+    files: Iterable[wandb.apis.public.File],
+    output_dir: pathlib.Path,
+    overwrite: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    after_download: Optional[Callable[[wandb.apis.public.File], None]] = None,
+    report: Optional[TransferReport] = None,
+    desc: str = "Downloading files",
+    sync: bool = False,
+    store: Optional[ContentStore] = None,
+    verify: bool = False,
+) -> TransferReport:
+    """
+    Download `files` of a single run into `output_dir`. See `download_all`.
+    """
+
+    return download_all(
+        ((f.name, f, output_dir) for f in files),
+        overwrite=overwrite,
+        jobs=jobs,
+        after_download=after_download,
+        report=report,
+        desc=desc,
+        sync=sync,
+        store=store,
+        verify=verify,
+    )
+
+
+def list_runs_files(
+    runs: Iterable[Tuple[wandb.apis.public.Run, pathlib.Path]],
+    file_filter: Optional[FileFilter] = None,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+    cache: Optional[ListingCache] = None,
+    refresh: bool = False,
+) -> Iterator[DownloadItem]:
+    """
+    List the files of `runs` concurrently and yield the ones that pass
+    `file_filter` as soon as the listing of their run is complete.
+    The name of an item is "<run id>/<file name>".
+    The listings are read from `cache` when it is up to date, unless
+    `refresh` (see `run_files`).
+    """
+    file_filter = file_filter or FileFilter()
+
+    def list_run(
+        item: Tuple[wandb.apis.public.Run, pathlib.Path],
+    ) -> List[DownloadItem]:
+        run, output_dir = item
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        return [
+            (f"{run.id}/{f.name}", f, output_dir)
+            for f in file_filter.filter_many(run_files(run, cache, refresh))
+        ]
+
+    for (run, _), future in list_concurrently(runs, list_run, jobs):
+        error = future.exception()
+
+        if error is not None:
+            if report is None:
+                raise error
+            report.fail(run.id, error)
+
+            continue
+        yield from future.result()
+
+
+def download_runs(
+    runs: Iterable[Tuple[wandb.apis.public.Run, pathlib.Path]],
+    file_filter: Optional[FileFilter] = None,
+    overwrite: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+    sync: bool = False,
+    store: Optional[ContentStore] = None,
+    verify: bool = False,
+    cache: Optional[ListingCache] = None,
+) -> TransferReport:
+    """
+    Download the files of many runs, each into its own directory, scheduling
+    the files of all the runs on one pool of `jobs` threads. With `sync` or
+    `verify`, the md5s of the listings are compared with the local files, so
+    the runs are listed from the server rather than from `cache`.
+    """
+    report = report if report is not None else TransferReport()
+
+    return download_all(
+        list_runs_files(
+            runs,
+            file_filter,
+            jobs=jobs,
+            report=report,
+            cache=cache,
+            refresh=sync or verify,
+        ),
+        overwrite=overwrite,
+        jobs=jobs,
+        report=report,
+        desc="Downloading runs' files",
+        sync=sync,
+        store=store,
+        verify=verify,
+    )
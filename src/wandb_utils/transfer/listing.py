@@ -0,0 +1,196 @@
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Callable,
+    Iterable,
+    Iterator,
+    TypeVar,
+)
+import itertools
+import json
+import logging
+import os
+import pathlib
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    Future,
+    wait,
+    FIRST_COMPLETED,
+)
+import wandb
+from wandb_gql import gql
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CACHE_DIR = pathlib.Path(
+    os.environ.get(
+        "WANDB_UTILS_CACHE_DIR", pathlib.Path.home() / ".cache" / "wandb_utils"
+    )
+)
+
+
+RUN_FILES_VERSION = gql("""
+    query RunFilesVersion($project: String!, $entity: String!, $name: String!) {
+        project(name: $project, entityName: $entity) {
+            run(name: $name) {
+                heartbeatAt
+                fileCount
+            }
+        }
+    }
+    """)
+
+
+def run_version(run: wandb.apis.public.Run) -> Optional[str]:
+    """
+    Version of the files of `run`: its number of files and last heartbeat,
+    fetched with one small query. It changes when files are added to or
+    deleted from the run (from any machine, or the UI) and while the run is
+    running, but not when a file is replaced by one with the same name, so
+    the commands that compare or delete files list them from the server
+    (see `run_files`). None if the run is not found.
+    """
+    response = run.client.execute(
+        RUN_FILES_VERSION,
+        variable_values={
+            "project": run.project,
+            "entity": run.entity,
+            "name": run.id,
+        },
+    )
+    run_ = (response.get("project") or {}).get("run")
+
+    if run_ is None:
+        return None
+
+    return f"{run_['fileCount']}@{run_['heartbeatAt']}"
+
+
+class ListingCache(object):
+    """
+    Local cache of the file listings of runs.
+
+    The listing of a run is stored in `root/<entity>/<project>/<run id>.json`
+    together with the version of its files (see `run_version`), and is listed
+    again from the server only when the version has changed since. The
+    commands that change the files of a run invalidate its listing.
+    """
+
+    def __init__(self, root: Union[str, pathlib.Path, None] = None):
+        self.root = (
+            pathlib.Path(root) if root is not None else CACHE_DIR / "listings"
+        )
+
+    def path(self, run: Union[wandb.apis.public.Run, str]) -> pathlib.Path:
+        """Path of the listing of `run` (a run or "<entity>/<project>/<id>")."""
+        parts = run.split("/") if isinstance(run, str) else run.path
+
+        return self.root.joinpath(*parts).with_suffix(".json")
+
+    def files(
+        self, run: wandb.apis.public.Run, refresh: bool = False
+    ) -> List[wandb.apis.public.File]:
+        """
+        The files of `run`, from the cache if it is up to date. With
+        `refresh`, the files are listed from the server and the cached
+        listing is replaced.
+        """
+        path = self.path(run)
+        version = run_version(run)
+
+        if not refresh and version is not None and path.exists():
+            try:
+                with open(path) as f:
+                    cached = json.load(f)
+            except ValueError:
+                cached = {}
+
+            if cached.get("version") == version:
+                logger.debug(f"Using cached listing of {'/'.join(run.path)}")
+
+                return [
+                    wandb.apis.public.File(getattr(run, "client", None), attrs)
+                    for attrs in cached["files"]
+                ]
+        files = list(run.files())
+
+        if version is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(
+                    {"version": version, "files": [f_._attrs for f_ in files]},
+                    f,
+                )
+            os.replace(tmp, path)
+
+        return files
+
+    def invalidate(self, run: Union[wandb.apis.public.Run, str]) -> None:
+        try:
+            self.path(run).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def listing_cache() -> Optional[ListingCache]:
+    """
+    The cache used by the commands, or None if it is disabled by setting
+    the environment variable WANDB_UTILS_LISTING_CACHE=0.
+    """
+
+    if os.environ.get("WANDB_UTILS_LISTING_CACHE", "1") == "0":
+        return None
+
+    return ListingCache()
+
+
+def run_files(
+    run: wandb.apis.public.Run,
+    cache: Optional[ListingCache] = None,
+    refresh: bool = False,
+) -> List[wandb.apis.public.File]:
+    """
+    The files of `run`, using `cache` if given. With `refresh`, the files are
+    listed from the server (and stored in `cache`), which the commands that
+    delete files or compare them with local files use.
+    """
+
+    if cache is None:
+        return list(run.files())
+
+    return cache.files(run, refresh)
+
+
+def list_concurrently(
+    runs: Iterable[T], list_run: Callable[[T], Any], jobs: int
+) -> Iterator[Tuple[T, Future]]:
+    """
+    Call `list_run` on every item of `runs` with a pool of `jobs` threads, and
+    yield each item with the future of its listing as soon as it is done.
+
+    `runs` is consumed lazily: at most `2 * jobs` listings are in flight or
+    waiting to be consumed, so the first listings are yielded before all the
+    runs are paged through, and the memory does not grow with their number.
+    """
+    window = 2 * max(1, jobs)
+    items = iter(runs)
+    pending: Dict[Future, T] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while True:
+            for item in itertools.islice(items, window - len(pending)):
+                pending[pool.submit(list_run, item)] = item
+
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                yield pending.pop(future), future
@@ -0,0 +1,131 @@
+from typing import List, Tuple, Union, Dict, Any, Optional
+import base64
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+import wandb
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = ".wandb_utils_manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ChecksumMismatch(IOError):
+    """The md5 of a local file differs from the one reported by wandb."""
+
+
+def update_from_file(hash_md5: Any, path: Union[str, pathlib.Path]) -> None:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hash_md5.update(chunk)
+
+
+def b64_digest(hash_md5: Any) -> str:
+    """Digest in the format used by wandb (base64 encoded)."""
+
+    return base64.b64encode(hash_md5.digest()).decode("ascii")
+
+
+def md5_file(path: Union[str, pathlib.Path]) -> str:
+    """
+    md5 of a file in the format used by wandb (base64 encoded digest).
+    """
+    hash_md5 = hashlib.md5()
+    update_from_file(hash_md5, path)
+
+    return b64_digest(hash_md5)
+
+
+class Manifest(object):
+    """
+    Size, modification time and md5 of the files downloaded into `root`.
+
+    The md5 of a local file is recomputed only if its size or modification
+    time differs from the recorded one, so large unchanged files are not
+    re-hashed on every sync. The manifest is stored in `path` (by default,
+    `root / MANIFEST_FILENAME`).
+    """
+
+    def __init__(
+        self, root: pathlib.Path, path: Optional[pathlib.Path] = None
+    ):
+        self.root = root
+        self.path = path if path is not None else root / MANIFEST_FILENAME
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                logger.warning(f"Ignoring corrupt manifest {self.path}")
+
+    def local_md5(self, name: str, rehash: bool = False) -> Optional[str]:
+        """
+        md5 of the local file `name` or None if it does not exist.
+        With `rehash`, the recorded md5 is not trusted and the file is hashed.
+        """
+        try:
+            stat = os.stat(self.root / name)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            entry = self.entries.get(name)
+
+        if (
+            not rehash
+            and entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return entry["md5"]
+        md5 = md5_file(self.root / name)
+        self._set(name, stat, md5)
+
+        return md5
+
+    def is_current(
+        self, file_: wandb.apis.public.File, rehash: bool = False
+    ) -> bool:
+        """
+        Whether the local copy of `file_` is identical to the one on the server.
+        Only the size is compared if the server does not report an md5.
+        """
+        local = self.root / file_.name
+
+        if not local.exists() or local.stat().st_size != file_.size:
+            return False
+
+        if not file_.md5:
+            return True
+
+        return self.local_md5(file_.name, rehash) == file_.md5
+
+    def record(self, name: str, md5: Optional[str] = None) -> None:
+        """
+        Record the local file `name` after downloading it. `md5` is the md5
+        reported by the server. It is computed from the file if not given.
+        """
+        stat = os.stat(self.root / name)
+        self._set(name, stat, md5 or md5_file(self.root / name))
+
+    def _set(self, name: str, stat: os.stat_result, md5: str) -> None:
+        with self._lock:
+            self.entries[name] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "md5": md5,
+            }
+
+    def save(self) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
@@ -0,0 +1,132 @@
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Iterable,
+    Iterator,
+)
+import logging
+import pathlib
+import queue
+import threading
+import wandb
+from .delete import delete_all
+from .download import DEFAULT_JOBS, DownloadItem, download_all, check_local
+from .report import TransferReport
+from .store import ContentStore
+
+logger = logging.getLogger(__name__)
+
+# number of files waiting between two stages of the pipeline
+QUEUE_SIZE = 256
+VERIFY_JOBS = 2
+
+_DONE = object()
+
+
+def _drain(q: "queue.Queue") -> Iterator[Any]:
+    while True:
+        item = q.get()
+
+        if item is _DONE:
+            return
+        yield item
+
+
+def move_all(
+    items: Iterable[DownloadItem],
+    overwrite: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+    desc: str = "Moving files",
+    store: Optional[ContentStore] = None,
+    verify_jobs: int = VERIFY_JOBS,
+    queue_size: int = QUEUE_SIZE,
+) -> TransferReport:
+    """
+    Move `items` from the server to local directories with a pipeline of
+    three stages, connected by queues of at most `queue_size` files:
+
+        1. download the files (see `download_all`, `jobs` threads),
+        2. check the size and md5 of the local copies (`verify_jobs` threads,
+           see `check_local`),
+        3. delete the files whose local copy is intact from the server, in
+           batches (see `delete_all`, `jobs` requests in flight).
+
+    The stages run concurrently, so files are deleted while others are
+    still being downloaded, and a full queue slows down the stages before it.
+    A file is deleted from the server only after its local copy is verified;
+    failures of any stage are recorded in the returned report and the file is
+    kept on the server. Files that are not downloaded (because they exist
+    locally and `overwrite` is False) are skipped and kept on the server.
+    """
+    report = report if report is not None else TransferReport("Moved")
+    downloads = TransferReport()
+    downloaded: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    verified: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    # name and output directory of the files being downloaded
+    pending: Dict[int, Tuple[str, wandb.apis.public.File, pathlib.Path]] = {}
+    pending_lock = threading.Lock()
+
+    def track(items: Iterable[DownloadItem]) -> Iterator[DownloadItem]:
+        for name, file_, output_dir in items:
+            with pending_lock:
+                pending[id(file_)] = (name, file_, output_dir)
+            yield name, file_, output_dir
+
+    def after_download(file_: wandb.apis.public.File) -> None:
+        with pending_lock:
+            item = pending.pop(id(file_))
+        # blocks while the verification is behind
+        downloaded.put(item)
+
+    def verify() -> None:
+        for name, file_, output_dir in _drain(downloaded):
+            try:
+                check_local(file_, output_dir / file_.name)
+            except Exception as e:
+                report.fail(name, e)
+
+                continue
+            verified.put((name, file_))
+
+    def delete() -> None:
+        delete_all(_drain(verified), jobs=jobs, report=report, desc=desc)
+
+    verifiers = [
+        threading.Thread(target=verify, daemon=True)
+        for _ in range(max(1, verify_jobs))
+    ]
+    deleter = threading.Thread(target=delete, daemon=True)
+
+    for thread in verifiers + [deleter]:
+        thread.start()
+    try:
+        download_all(
+            track(items),
+            overwrite=overwrite,
+            jobs=jobs,
+            after_download=after_download,
+            report=downloads,
+            desc="Downloading files",
+            store=store,
+        )
+    finally:
+        for _ in verifiers:
+            downloaded.put(_DONE)
+
+        for thread in verifiers:
+            thread.join()
+        verified.put(_DONE)
+        deleter.join()
+
+    for name, reason in downloads.skipped.items():
+        report.skip(name, reason)
+
+    for name, error in downloads.failed.items():
+        report.fail(name, error)
+
+    return report
@@ -0,0 +1,232 @@
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Iterable,
+)
+import logging
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+import requests
+import tqdm
+import wandb
+from .delete import delete_all
+from .download import DEFAULT_JOBS, fetch_to
+from .move import QUEUE_SIZE, _DONE, _drain
+from .report import TransferReport
+from .session import shared_session
+from .stream import PARTIAL_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+# rclone executable
+RCLONE = os.environ.get("WANDB_UTILS_RCLONE", "rclone")
+
+# (name used in the report, file, rclone destination "remote:path" of the file)
+RcloneItem = Tuple[str, wandb.apis.public.File, str]
+
+
+class RcloneError(RuntimeError):
+    """rclone exited with an error."""
+
+
+def _run(
+    args: List[str], rclone: str = RCLONE, flags: Optional[List[str]] = None
+) -> None:
+    """Run the rclone command `args`, raises `RcloneError` if it fails."""
+    command = [rclone] + list(flags or []) + args
+    logger.debug(f"Running {' '.join(command)}")
+    process = subprocess.run(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+    if process.returncode:
+        message = process.stderr.decode(errors="replace").strip()
+
+        raise RcloneError(
+            f"rclone {args[0]} exited with {process.returncode}: {message}"
+        )
+
+
+def rcat(
+    file_: wandb.apis.public.File,
+    target: str,
+    session: Optional[requests.Session] = None,
+    verify: bool = False,
+    rclone: str = RCLONE,
+    flags: Optional[List[str]] = None,
+) -> int:
+    """
+    Stream `file_` from wandb to the rclone destination `target` (for
+    instance "coldstore:bucket/run/model.th", or a local path) by piping its
+    content into `rclone rcat`, without a local copy. The size of the file is
+    passed to rclone, so that remotes that need it up front do not buffer the
+    stream. `flags` are passed to rclone before the command.
+
+    With `verify`, the md5 of the data is checked while it is streamed (see
+    `fetch_to`). It is only known once all the data was passed to rclone,
+    which may have stored it already, so the data is streamed to
+    `target` + `PARTIAL_SUFFIX`, moved to `target` with `rclone moveto` if
+    the md5 matches, and deleted with `rclone deletefile` otherwise. Returns
+    the number of bytes streamed.
+    """
+    upload = target + PARTIAL_SUFFIX if verify else target
+    command = [rclone] + list(flags or []) + ["rcat"]
+
+    if file_.size:
+        command += ["--size", str(file_.size)]
+    command.append(upload)
+    logger.debug(f"Running {' '.join(command)}")
+
+    # stderr goes to a file so that a chatty rclone cannot block on a pipe
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        assert process.stdin is not None
+        broken: Optional[BrokenPipeError] = None
+        try:
+            size = fetch_to(
+                file_, process.stdin.write, session=session, verify=verify
+            )
+            process.stdin.close()
+        except BrokenPipeError as e:
+            # rclone exited before reading the whole file, its error says why
+            broken = e
+        except BaseException:
+            process.kill()
+            process.wait()
+
+            if verify:
+                _delete_partial(upload, rclone, flags)
+
+            raise
+        returncode = process.wait()
+
+        if returncode:
+            stderr.seek(0)
+            message = stderr.read().decode(errors="replace").strip()
+
+            if verify:
+                _delete_partial(upload, rclone, flags)
+
+            raise RcloneError(
+                f"rclone rcat {upload} exited with {returncode}: {message}"
+            )
+
+        if broken is not None:
+            if verify:
+                _delete_partial(upload, rclone, flags)
+
+            raise broken
+
+    if verify:
+        try:
+            _run(["moveto", upload, target], rclone, flags)
+        except RcloneError:
+            _delete_partial(upload, rclone, flags)
+
+            raise
+
+    return size
+
+
+def _delete_partial(
+    path: str, rclone: str, flags: Optional[List[str]]
+) -> None:
+    # rclone may or may not have stored the partial data
+    try:
+        _run(["deletefile", path], rclone, flags)
+    except RcloneError as e:
+        logger.debug(f"Cannot delete {path}: {e}")
+
+
+def rclone_all(
+    items: Iterable[RcloneItem],
+    delete: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    report: Optional[TransferReport] = None,
+    desc: str = "Streaming files",
+    verify: bool = False,
+    rclone: str = RCLONE,
+    flags: Optional[List[str]] = None,
+    queue_size: int = QUEUE_SIZE,
+) -> TransferReport:
+    """
+    Stream `items` from wandb to their rclone destinations (see `rcat`) with
+    a pool of `jobs` threads, each one running its own `rclone rcat`.
+
+    With `delete` (to move the files), the md5 of every file is verified
+    while it is streamed, and the files that reached their destination are
+    deleted from the server in batches (see `delete_all`) while the others
+    are still being streamed. A file that fails is kept on the server and
+    recorded in the returned report.
+    """
+    report = (
+        report
+        if report is not None
+        else TransferReport("Moved" if delete else "Streamed")
+    )
+    streamed = TransferReport()
+    session = shared_session(jobs)
+    done: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    pbar = tqdm.tqdm(total=0, unit="B", unit_scale=True, desc=desc)
+    pbar_lock = threading.Lock()
+
+    def work(name: str, file_: wandb.apis.public.File, target: str) -> None:
+        try:
+            size = rcat(
+                file_,
+                target,
+                session=session,
+                verify=verify or delete,
+                rclone=rclone,
+                flags=flags,
+            )
+
+            if delete:
+                # blocks while the deletions are behind
+                done.put((name, file_))
+            else:
+                streamed.succeed(name, size)
+        except Exception as e:
+            streamed.fail(name, e)
+        finally:
+            with pbar_lock:
+                pbar.update(file_.size)
+
+    def delete_streamed() -> None:
+        delete_all(
+            _drain(done), jobs=jobs, report=report, desc="Deleting files"
+        )
+
+    deleter = threading.Thread(target=delete_streamed, daemon=True)
+
+    if delete:
+        deleter.start()
+    try:
+        with pbar, ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures: List[Future] = []
+
+            for name, file_, target in items:
+                with pbar_lock:
+                    pbar.total += file_.size
+                    pbar.refresh()
+                futures.append(pool.submit(work, name, file_, target))
+            wait(futures)
+    finally:
+        if delete:
+            done.put(_DONE)
+            deleter.join()
+
+    return report.merge(streamed)
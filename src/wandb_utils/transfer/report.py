@@ -0,0 +1,93 @@
+from typing import List, Tuple, Union, Dict, Any, Optional
+import logging
+import threading
+from .manifest import ChecksumMismatch
+
+logger = logging.getLogger(__name__)
+
+
+class TransferReport(object):
+    """
+    Thread safe record of the outcome of every file in a transfer.
+
+    Failures are collected instead of stopping the transfer so that a summary
+    can be reported at the end.
+    """
+
+    def __init__(self, action: str = "Downloaded"):
+        self.action = action
+        self.done: List[str] = []
+        self.skipped: Dict[str, str] = {}
+        self.failed: Dict[str, BaseException] = {}
+        self.num_bytes = 0
+        self._lock = threading.Lock()
+
+    def succeed(self, name: str, size: int = 0) -> None:
+        with self._lock:
+            self.done.append(name)
+            self.num_bytes += size
+
+    def skip(self, name: str, reason: str) -> None:
+        with self._lock:
+            self.skipped[name] = reason
+
+    def fail(self, name: str, error: BaseException) -> None:
+        logger.debug(f"{name} failed with {error!r}")
+        with self._lock:
+            self.failed[name] = error
+
+    def merge(self, other: "TransferReport") -> "TransferReport":
+        with self._lock:
+            self.done += other.done
+            self.skipped.update(other.skipped)
+            self.failed.update(other.failed)
+            self.num_bytes += other.num_bytes
+
+        return self
+
+    @property
+    def num_files(self) -> int:
+        return len(self.done) + len(self.skipped) + len(self.failed)
+
+    @property
+    def mismatched(self) -> List[str]:
+        """Names of the files whose md5 did not match the one on the server."""
+
+        return [
+            name
+            for name, error in self.failed.items()
+            if isinstance(error, ChecksumMismatch)
+        ]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.action} {len(self.done)} files ({self.num_bytes} bytes), "
+            f"skipped {len(self.skipped)}, failed {len(self.failed)}."
+        ]
+        mismatched = self.mismatched
+
+        if mismatched:
+            lines.append(
+                f"{len(mismatched)} files do not match the md5 on the server."
+            )
+
+        for name, error in self.failed.items():
+            lines.append(f"  {name}: {error!r}")
+
+        return "\n".join(lines)
+
+    def log_summary(self) -> None:
+        if self.failed:
+            logger.error(self.summary())
+        else:
+            logger.info(self.summary())
+
+    def raise_for_failures(self) -> None:
+        if self.failed:
+            raise RuntimeError(
+                f"{len(self.failed)} files failed. See the summary above."
+            )
@@ -0,0 +1,58 @@
+from typing import List, Tuple, Union, Dict, Any, Optional
+import logging
+import os
+import threading
+import requests
+from wandb_utils.governor import GovernedAdapter
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.environ.get("WANDB_UTILS_HTTP_POOL_SIZE", 16))
+CONNECT_TIMEOUT = float(os.environ.get("WANDB_UTILS_CONNECT_TIMEOUT", 10))
+READ_TIMEOUT = float(os.environ.get("WANDB_UTILS_READ_TIMEOUT", 60))
+
+_sessions: Dict[int, "PooledSession"] = {}
+_sessions_lock = threading.Lock()
+
+
+class PooledSession(requests.Session):
+    """
+    Session that keeps up to `pool_size` connections per host alive, so the
+    files of a transfer reuse connections instead of doing a TCP and TLS
+    handshake per file. Requests use (`connect_timeout`, `read_timeout`)
+    unless they pass their own timeout. The requests go through the governor
+    of the process (see `wandb_utils.governor`).
+    """
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+    ):
+        super().__init__()
+        self.timeout = (connect_timeout, read_timeout)
+        adapter = GovernedAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:  # type: ignore
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+
+        return super().request(method, url, **kwargs)
+
+
+def shared_session(pool_size: int = POOL_SIZE) -> PooledSession:
+    """
+    Session shared by all the transfers of the process.
+    The pool holds at least `pool_size` connections per host.
+    """
+    pool_size = max(pool_size, POOL_SIZE)
+
+    with _sessions_lock:
+        if pool_size not in _sessions:
+            logger.debug(f"Creating http session with pool size {pool_size}")
+            _sessions[pool_size] = PooledSession(pool_size)
+
+        return _sessions[pool_size]
@@ -0,0 +1,87 @@
+from typing import List, Tuple, Union, Dict, Any, Optional, Iterator
+import base64
+import contextlib
+import logging
+import os
+import pathlib
+import shutil
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ContentStore(object):
+    """
+    Local store of downloaded files keyed by their md5.
+
+    A file is kept once in `root/<md5[:2]>/<md5>` (hex digest) and hardlinked
+    into every directory it is downloaded to, so identical files of many runs
+    (configs, vocabularies, etc.) are transferred and stored only once.
+    If `root` is on a different file system than the destination, the file is
+    copied instead, which still saves the transfer.
+
+    Since the copies are hardlinks, modifying one of them in place modifies
+    all of them.
+    """
+
+    def __init__(self, root: Union[str, pathlib.Path]):
+        self.root = pathlib.Path(root)
+        self.num_linked = 0
+        self.bytes_saved = 0
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def path(self, md5: str) -> pathlib.Path:
+        """Path of the stored file with the (base64 encoded) `md5`."""
+        digest = base64.b64decode(md5).hex()
+
+        return self.root / digest[:2] / digest
+
+    def has(self, md5: str) -> bool:
+        return self.path(md5).exists()
+
+    @contextlib.contextmanager
+    def lock(self, md5: str) -> Iterator[None]:
+        """Serialize the downloads of the same content by concurrent threads."""
+        with self._lock:
+            lock = self._locks.setdefault(md5, threading.Lock())
+        with lock:
+            yield
+
+    def add(self, path: pathlib.Path, md5: str) -> None:
+        """Add the downloaded file `path` with content hash `md5` to the store."""
+        stored = self.path(md5)
+
+        if stored.exists():
+            return
+        stored.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(path, stored)
+
+    def link(self, md5: str, dest: pathlib.Path) -> None:
+        """Create `dest` as a link to (or copy of) the stored file."""
+        stored = self.path(md5)
+        _link_or_copy(stored, dest)
+
+        with self._lock:
+            self.num_linked += 1
+            self.bytes_saved += stored.stat().st_size
+
+    def log_summary(self) -> None:
+        if self.num_linked:
+            logger.info(
+                f"Reused {self.num_linked} files ({self.bytes_saved} bytes) "
+                f"from the store at {self.root}"
+            )
+
+
+def _link_or_copy(src: pathlib.Path, dest: pathlib.Path) -> None:
+    # link (or copy) to a temporary name and rename it so that an existing
+    # `dest` is replaced atomically
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
@@ -0,0 +1,294 @@
+from typing import List, Tuple, Union, Dict, Any, Optional, Callable
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+import requests
+from wandb.apis.internal import Api as InternalApi
+from .manifest import ChecksumMismatch, update_from_file, b64_digest
+from .session import shared_session
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = ".partial"
+# the validator of the file a partial file was downloaded from
+VALIDATOR_SUFFIX = ".validator"
+# the data received since the last complete chunk is lost when a connection drops
+CHUNK_SIZE = 1024 * 1024
+MAX_RESUMES = 5
+
+
+class IncompleteDownload(IOError):
+    """The server closed the connection before sending the whole file."""
+
+
+class RangeNotSupported(IOError):
+    """The server ignored the Range request to resume a stream."""
+
+
+RESUMABLE_ERRORS = (
+    IncompleteDownload,
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def api_auth() -> Optional[Tuple[str, str]]:
+    """Basic auth used by wandb for the file urls."""
+    api_key = InternalApi().api_key
+
+    return ("api", api_key) if api_key else None
+
+
+def partial_path(path: pathlib.Path) -> pathlib.Path:
+    return path.with_name(path.name + PARTIAL_SUFFIX)
+
+
+def validator_path(path: pathlib.Path) -> pathlib.Path:
+    return path.with_name(path.name + PARTIAL_SUFFIX + VALIDATOR_SUFFIX)
+
+
+def response_validator(response: requests.Response) -> Optional[str]:
+    """
+    The strong validator (ETag, or else Last-Modified) of `response`, sent
+    back in an If-Range header so that a range is only served from the same
+    version of the file.
+    """
+    etag = response.headers.get("ETag")
+
+    if etag and not etag.startswith("W/"):
+        return etag
+
+    return response.headers.get("Last-Modified")
+
+
+def stream_download(
+    url: str,
+    path: pathlib.Path,
+    size: Optional[int] = None,
+    auth: Optional[Tuple[str, str]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_resumes: int = MAX_RESUMES,
+    session: Optional[requests.Session] = None,
+    md5: Optional[str] = None,
+) -> int:
+    """
+    Download `url` to `path` in chunks of `chunk_size` bytes.
+
+    The data is written to `path.partial`, which is renamed to `path` only once
+    the download is complete. If the connection drops, the download is resumed
+    from the end of the partial file using an HTTP Range request, at most
+    `max_resumes` times. A partial file left by an earlier interrupted download
+    is resumed as well. Returns the number of bytes of the file.
+
+    The validator of the file (see `response_validator`) is kept next to the
+    partial file and sent in an If-Range header when resuming, so the server
+    sends the whole file again if it changed since the partial file was
+    started. A partial file without a validator is resumed only if `md5` is
+    given, and downloaded again from the start if the result does not match.
+
+    The requests go through `session` (by default, the shared `PooledSession`).
+
+    If `md5` (base64 encoded, as reported by wandb) is given, the file is hashed
+    incrementally as the chunks arrive and `ChecksumMismatch` is raised (and
+    the partial file removed) if the downloaded data does not match it.
+    """
+    session = session if session is not None else shared_session()
+    partial = partial_path(path)
+    partial.parent.mkdir(parents=True, exist_ok=True)
+    validator_file = validator_path(path)
+    validator = (
+        validator_file.read_text()
+        if partial.exists() and validator_file.exists()
+        else None
+    )
+    resumes = 0
+    hash_md5 = hashlib.md5()
+    hashed = 0  # number of bytes of the partial file in hash_md5
+    # resumed without a validator, only the md5 can tell a spliced file
+    unvalidated = False
+
+    def restart() -> None:
+        nonlocal validator
+
+        partial.unlink(missing_ok=True)
+        validator_file.unlink(missing_ok=True)
+        validator = None
+
+    while True:
+        offset = partial.stat().st_size if partial.exists() else 0
+
+        if offset and validator is None and md5 is None:
+            logger.debug(f"Cannot validate {partial.name}, restarting")
+            restart()
+            offset = 0
+
+        if size is not None and (
+            offset > size or (offset == size and md5 is None)
+        ):
+            # stale partial file of a different version of the file, or a
+            # complete one that cannot be checked
+            restart()
+            offset = 0
+        headers: Dict[str, str] = {}
+
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+            if validator is not None:
+                headers["If-Range"] = validator
+            else:
+                unvalidated = True
+
+        try:
+            if size is None or offset < size:
+                with session.get(
+                    url, auth=auth, headers=headers, stream=True
+                ) as response:
+                    if offset and response.status_code == 416:
+                        # the partial file is not a prefix of the file
+                        logger.debug(f"Range rejected for {url}, restarting")
+                        restart()
+
+                        continue
+                    response.raise_for_status()
+
+                    if offset and response.status_code != 206:
+                        logger.debug(f"Range not served for {url}, restarting")
+                        offset = 0
+
+                    if not offset:
+                        unvalidated = False
+                        validator = response_validator(response)
+
+                        if validator is not None:
+                            validator_file.write_text(validator)
+                        else:
+                            validator_file.unlink(missing_ok=True)
+
+                    if md5 is not None and hashed != offset:
+                        # restarted, or resuming a partial file of an earlier call
+                        hash_md5 = hashlib.md5()
+
+                        if offset:
+                            update_from_file(hash_md5, partial)
+                        hashed = offset
+
+                    with open(partial, "ab" if offset else "wb") as f:
+                        for chunk in response.iter_content(chunk_size):
+                            f.write(chunk)
+
+                            if md5 is not None:
+                                hash_md5.update(chunk)
+                                hashed += len(chunk)
+            received = partial.stat().st_size
+
+            if size is not None and received < size:
+                raise IncompleteDownload(
+                    f"Received {received} of {size} bytes of {path.name}"
+                )
+        except RESUMABLE_ERRORS as e:
+            resumes += 1
+
+            if resumes > max_resumes:
+                raise
+            logger.info(f"Resuming download of {path.name} after {e!r}")
+
+            continue
+
+        if md5 is not None:
+            if hashed != partial.stat().st_size:
+                hash_md5 = hashlib.md5()
+                update_from_file(hash_md5, partial)
+                hashed = partial.stat().st_size
+
+            if b64_digest(hash_md5) != md5:
+                digest = b64_digest(hash_md5)
+                restart()
+                hash_md5 = hashlib.md5()
+                hashed = 0
+
+                if unvalidated:
+                    logger.info(
+                        f"Partial file of {path.name} was stale, restarting"
+                    )
+                    unvalidated = False
+
+                    continue
+
+                raise ChecksumMismatch(
+                    f"md5 of {path.name} is {digest}, expected {md5}"
+                )
+
+        break
+    os.replace(partial, path)
+    validator_file.unlink(missing_ok=True)
+
+    return path.stat().st_size
+
+
+def stream_to(
+    url: str,
+    write: Callable[[bytes], Any],
+    offset: int = 0,
+    size: Optional[int] = None,
+    auth: Optional[Tuple[str, str]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_resumes: int = MAX_RESUMES,
+    session: Optional[requests.Session] = None,
+) -> int:
+    """
+    Stream `url` from byte `offset` to `write` (for instance, the `write` of
+    an archive member or of a pipe), in chunks of `chunk_size` bytes, without
+    a local file.
+
+    If the connection drops, the download is resumed from the last byte
+    written using an HTTP Range request, at most `max_resumes` times. Since
+    the data that was written cannot be taken back, `RangeNotSupported` is
+    raised if the server does not support ranges, or if the file changed
+    since the stream started (see `response_validator`). Returns the offset
+    after the last byte written.
+    """
+    session = session if session is not None else shared_session()
+    resumes = 0
+    validator: Optional[str] = None
+
+    while True:
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        if offset and validator is not None:
+            headers["If-Range"] = validator
+
+        try:
+            with session.get(
+                url, auth=auth, headers=headers, stream=True
+            ) as response:
+                response.raise_for_status()
+
+                if offset and response.status_code != 206:
+                    raise RangeNotSupported(
+                        f"Cannot resume {url} from byte {offset}"
+                    )
+
+                if validator is None:
+                    validator = response_validator(response)
+
+                for chunk in response.iter_content(chunk_size):
+                    write(chunk)
+                    offset += len(chunk)
+
+            if size is not None and offset < size:
+                raise IncompleteDownload(
+                    f"Received {offset} of {size} bytes of {url}"
+                )
+
+            return offset
+        except RESUMABLE_ERRORS as e:
+            resumes += 1
+
+            if resumes > max_resumes:
+                raise
+            logger.info(f"Resuming stream of {url} after {e!r}")
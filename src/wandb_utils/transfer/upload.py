@@ -0,0 +1,340 @@
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Dict,
+    Any,
+    Optional,
+    Callable,
+    Iterable,
+    Set,
+)
+import logging
+import os
+import pathlib
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait
+import tqdm
+import wandb
+from wandb.sdk.internal.internal_api import Api as InternalApi
+from wandb_utils.governor import GovernedAdapter, govern_api
+from .download import DEFAULT_JOBS
+from .listing import CACHE_DIR, ListingCache, list_concurrently, run_files
+from .manifest import Manifest, md5_file
+from .report import TransferReport
+from .session import shared_session
+
+logger = logging.getLogger(__name__)
+
+# (path of the run "<entity>/<project>/<run id>", name of the file in the run,
+# local path of the file)
+UploadItem = Tuple[str, str, pathlib.Path]
+
+# number of file names sent in one request for upload urls
+URLS_BATCH_SIZE = 500
+MAX_RETRIES = 5
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_BACKOFF = 1.0
+
+_local = threading.local()
+
+
+def _internal_api() -> InternalApi:
+    # the internal api keeps per instance retry state, so use one per thread
+    if getattr(_local, "api", None) is None:
+        _local.api = govern_api(InternalApi())
+
+    return _local.api
+
+
+def remote_name(
+    path: Union[str, pathlib.Path],
+    base_path: Union[str, pathlib.Path, None] = None,
+) -> str:
+    """
+    Name of the local file `path` in the run, as `wandb.save(path, base_path)`
+    would save it: relative to `base_path`, or to the current directory if
+    no `base_path` is given (to the directory of `path` if it is absolute).
+    """
+    path = pathlib.Path(path)
+
+    if base_path is None:
+        base_path = path.parent if path.is_absolute() else pathlib.Path(".")
+
+    return pathlib.Path(os.path.relpath(path, base_path)).as_posix()
+
+
+def upload_urls(
+    run_path: str, names: List[str], api: Optional[Any] = None
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Signed upload urls for the files `names` of the run `run_path`, with one
+    request to the api. Returns (extra headers of the uploads, name -> url).
+    """
+    api = api if api is not None else _internal_api()
+    entity, project, run = run_path.split("/")
+    _, upload_headers, result = api.upload_urls(
+        project, names, run=run, entity=entity
+    )
+    headers: Dict[str, str] = {}
+
+    for header in upload_headers or []:
+        key, value = header.split(":", 1)
+        headers[key] = value
+    urls: Dict[str, str] = {}
+
+    for name, info in result.items():
+        url = info["url"]
+
+        # relative urls point to a file store proxied by the api (local server)
+        if url.startswith("/"):
+            url = f"{api.api_url}{url}"
+        urls[name] = url
+
+    return headers, urls
+
+
+def put_file(
+    url: str,
+    path: pathlib.Path,
+    headers: Optional[Dict[str, str]] = None,
+    session: Optional[requests.Session] = None,
+    max_retries: Optional[int] = None,
+) -> int:
+    """
+    Upload the content of `path` to `url` with a PUT request. Throttled
+    (429), timed out and failed (5xx) requests, and dropped connections are
+    retried with exponential backoff, at most `max_retries` times. By
+    default, the request is retried `MAX_RETRIES` times, or only by the
+    governor of the storage if `session` has one (see `GovernedAdapter`).
+    Returns the number of bytes uploaded.
+    """
+    session = session if session is not None else requests.Session()
+
+    if max_retries is None:
+        governed = isinstance(session.get_adapter(url), GovernedAdapter)
+        max_retries = 0 if governed else MAX_RETRIES
+    size = path.stat().st_size
+    attempt = 0
+
+    while True:
+        try:
+            with open(path, "rb") as f:
+                # an empty file object would be sent with chunked encoding
+                response = session.put(
+                    url, data=f if size else b"", headers=headers
+                )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= max_retries:
+                raise
+            logger.debug(f"Upload of {path} failed with {e!r}, retrying")
+        else:
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt >= max_retries
+            ):
+                response.raise_for_status()
+
+                return size
+            logger.debug(
+                f"Upload of {path} got {response.status_code}, retrying"
+            )
+        time.sleep(RETRY_BACKOFF * 2**attempt)
+        attempt += 1
+
+
+def upload_hashes() -> Manifest:
+    """
+    Cache of the md5 of the uploaded local files, by their absolute path
+    (stored in `CACHE_DIR`, see `Manifest`).
+    """
+
+    # absolute names are joined to the root as they are
+    return Manifest(pathlib.Path("/"), CACHE_DIR / "upload_hashes.json")
+
+
+def split_unchanged(
+    items: List[UploadItem],
+    runs: Dict[str, wandb.apis.public.Run],
+    jobs: int = DEFAULT_JOBS,
+    cache: Optional[ListingCache] = None,
+    hashes: Optional[Manifest] = None,
+) -> Tuple[List[UploadItem], List[UploadItem]]:
+    """
+    Split `items` into the files to upload and the files that are identical
+    (same size and md5) to a file of the run on the server.
+
+    The files of every run in `runs` (by path "<entity>/<project>/<id>") are
+    listed once from the server (a cached listing may miss files deleted or
+    replaced since, see `run_files`), and only the local files with the size of
+    their remote counterpart are hashed, with a pool of `jobs` threads. The
+    md5s are cached in `hashes` (see `upload_hashes`) by size and
+    modification time. Files of runs that are not in `runs` or cannot be
+    listed, and remote files without an md5, are always uploaded.
+    """
+    names: Dict[str, Set[str]] = {}
+
+    for run_path, name, _ in items:
+        names.setdefault(run_path, set()).add(name)
+
+    def list_run(run_path: str) -> Dict[str, wandb.apis.public.File]:
+        return {
+            f.name: f
+            for f in run_files(runs[run_path], cache, refresh=True)
+            if f.name in names[run_path]
+        }
+
+    def local_md5(path: pathlib.Path) -> Optional[str]:
+        if hashes is None:
+            return md5_file(path)
+
+        return hashes.local_md5(str(path.resolve()))
+
+    remote: Dict[str, Dict[str, wandb.apis.public.File]] = {}
+
+    listings = list_concurrently(
+        (run_path for run_path in names if run_path in runs), list_run, jobs
+    )
+
+    for run_path, future in listings:
+        error = future.exception()
+
+        if error is not None:
+            logger.warning(f"Cannot list the files of {run_path}: {error!r}")
+
+            continue
+        remote[run_path] = future.result()
+    candidates = []
+
+    for item in items:
+        file_ = remote.get(item[0], {}).get(item[1])
+
+        if (
+            file_ is not None
+            and file_.md5
+            and file_.size == item[2].stat().st_size
+        ):
+            candidates.append((item, file_))
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        md5s = pool.map(local_md5, [item[2] for item, _ in candidates])
+        unchanged = [
+            item
+            for (item, file_), md5 in zip(candidates, md5s)
+            if md5 == file_.md5
+        ]
+
+    if hashes is not None:
+        hashes.save()
+    unchanged_ids = {id(item) for item in unchanged}
+
+    return [i for i in items if id(i) not in unchanged_ids], unchanged
+
+
+def _batches(names: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(names), size):
+        yield names[i : i + size]
+
+
+def upload_all(
+    items: Iterable[UploadItem],
+    jobs: int = DEFAULT_JOBS,
+    after_upload: Optional[Callable[[pathlib.Path], None]] = None,
+    report: Optional[TransferReport] = None,
+    desc: str = "Uploading files",
+    api: Optional[Any] = None,
+) -> TransferReport:
+    """
+    Upload `items` to existing runs using a pool of `jobs` threads, without
+    starting (resuming) the runs.
+
+    The upload urls of the files of each run are requested in batches of
+    `URLS_BATCH_SIZE` names, concurrently for all the runs, and the files
+    are uploaded as soon as their urls are known, sharing one pool across
+    the files of all the runs. `after_upload`, if given, is called in the
+    worker thread with the local path of every file that was uploaded
+    successfully (for instance, to delete it). A failure of one file (or of
+    the upload urls of a run) does not stop the others. All the outcomes are
+    recorded in the returned report, under "<run id>/<name>".
+
+    `api` is the internal wandb api used for the upload urls (by default, one
+    per thread, see `wandb.sdk.internal.internal_api.Api`).
+    """
+    report = report if report is not None else TransferReport("Uploaded")
+    session = shared_session(jobs)
+    by_run: Dict[str, Dict[str, pathlib.Path]] = {}
+    sizes: Dict[pathlib.Path, int] = {}
+
+    for run_path, name, path in items:
+        by_run.setdefault(run_path, {})[name] = path
+        sizes[path] = path.stat().st_size
+    pbar = tqdm.tqdm(
+        total=sum(sizes.values()), unit="B", unit_scale=True, desc=desc
+    )
+    pbar_lock = threading.Lock()
+
+    def report_name(run_path: str, name: str) -> str:
+        return f"{run_path.split('/')[-1]}/{name}"
+
+    def work(
+        run_path: str, name: str, path: pathlib.Path, url: str, headers: dict
+    ) -> None:
+        try:
+            size = put_file(url, path, headers, session=session)
+
+            if after_upload is not None:
+                after_upload(path)
+            report.succeed(report_name(run_path, name), size)
+        except Exception as e:
+            report.fail(report_name(run_path, name), e)
+        finally:
+            with pbar_lock:
+                pbar.update(sizes[path])
+
+    with pbar, ThreadPoolExecutor(
+        max_workers=max(1, jobs)
+    ) as resolvers, ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        batches = {
+            resolvers.submit(upload_urls, run_path, batch, api): (
+                run_path,
+                batch,
+            )
+            for run_path, files in by_run.items()
+            for batch in _batches(list(files), URLS_BATCH_SIZE)
+        }
+        futures: List[Future] = []
+
+        for future in as_completed(batches):
+            run_path, batch = batches[future]
+            files = by_run[run_path]
+            error = future.exception()
+
+            if error is not None:
+                for name in batch:
+                    report.fail(report_name(run_path, name), error)
+                    with pbar_lock:
+                        pbar.update(sizes[files[name]])
+
+                continue
+            headers, urls = future.result()
+
+            for name in batch:
+                if name not in urls:
+                    report.fail(
+                        report_name(run_path, name),
+                        RuntimeError("No upload url returned by the server"),
+                    )
+                    with pbar_lock:
+                        pbar.update(sizes[files[name]])
+
+                    continue
+                futures.append(
+                    pool.submit(
+                        work, run_path, name, files[name], urls[name], headers
+                    )
+                )
+        wait(futures)
+
+    return report
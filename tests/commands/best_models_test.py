@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+from wandb_utils.commands.best_models import find_best_model
+from wandb_utils.commands.common import Metric
+from wandb_utils.layout import to_long, to_sparse
+
+
+@pytest.fixture
+def runs_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "run": ["r1", "r2", "r3", "r4"],
+            "path": ["e/p/r1", "e/p/r2", "e/p/r3", "e/p/r4"],
+            "sweep": ["s1", "s1", "s2", "s2"],
+            "sweep_name": ["a", "a", "b", "b"],
+            "tags": ["", "", "", ""],
+            "acc": [0.1, 0.4, 0.3, None],
+            "rare": [None, None, 1.0, None],
+        }
+    )
+
+
+@pytest.mark.parametrize("layout", [lambda df: df, to_long, to_sparse])
+def test_best_model_on_layouts(runs_df, layout):
+    best = find_best_model(
+        None,
+        "e",
+        "p",
+        None,
+        Metric("acc"),
+        fields=["sweep", "sweep_name", "run", "tags", "acc"],
+        skip_writing=True,
+        df=layout(runs_df),
+    )
+    assert best["run"].tolist() == ["r2", "r3"]
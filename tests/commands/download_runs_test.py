@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from fakes import FakeApi, FakeFile, FakeRun
+from wandb_utils.commands import common, wandb_utils
+from wandb_utils.misc import write_df
+
+
+@pytest.fixture
+def api(file_server, monkeypatch):
+    api = FakeApi(
+        [
+            FakeRun(
+                "r1",
+                [
+                    FakeFile(file_server, "config.json", b"1"),
+                    FakeFile(file_server, "model.th", b"22"),
+                    FakeFile(file_server, "logs/out.json", b"3"),
+                ],
+            ),
+            FakeRun("r2", [FakeFile(file_server, "config.json", b"4")]),
+        ]
+    )
+    monkeypatch.setenv("WANDB_API_KEY", "x" * 40)
+    # the listings would be cached under the home directory
+    monkeypatch.setenv("WANDB_UTILS_LISTING_CACHE", "0")
+    monkeypatch.setattr(common.wandb, "Api", lambda: api)
+    monkeypatch.setattr(common, "govern_api", lambda api: api)
+
+    return api
+
+
+def download_runs(tmp_path, df, *options):
+    input_file = tmp_path / "runs.tsv"
+    write_df(df, input_file, skip_writing=False)
+
+    return CliRunner().invoke(
+        wandb_utils,
+        ["-e", "e", "-p", "p", "from-file", str(input_file), "download-runs"]
+        + list(options),
+    )
+
+
+def test_download_runs_to_output_dir_field(tmp_path, api):
+    df = pd.DataFrame(
+        {"run": ["r1", "r2"], "out": ["best", "second"]}
+    ).set_index("run")
+    result = download_runs(
+        tmp_path,
+        df,
+        "-o",
+        str(tmp_path / "models"),
+        "--output_dir_field",
+        "out",
+        "--include_filter",
+        "*.json",
+        "--exclude_filter",
+        "logs/*",
+    )
+    assert result.exit_code == 0, result.output
+
+    downloaded = sorted(
+        str(p.relative_to(tmp_path / "models"))
+        for p in (tmp_path / "models").rglob("*")
+        if p.is_file()
+    )
+    assert downloaded == ["best/config.json", "second/config.json"]
+    assert (tmp_path / "models/second/config.json").read_bytes() == b"4"
+    # the runs are resolved with one query
+    assert len(api.queries) == 1
+
+
+def test_download_runs_to_run_id_dirs(tmp_path, api):
+    df = pd.DataFrame({"run": ["r1", "r2"]}).set_index("run")
+    result = download_runs(
+        tmp_path, df, "-o", str(tmp_path / "runs"), "--include_filter", "*.th"
+    )
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "runs/r1/model.th").read_bytes() == b"22"
+    assert list((tmp_path / "runs/r2").iterdir()) == []
@@ -0,0 +1,45 @@
+import pandas as pd
+from click.testing import CliRunner
+from wandb_utils.commands import wandb_utils
+from wandb_utils.misc import write_df
+from wandb_utils.tag_index import TagIndex
+
+
+def test_tag_index_exact_match():
+    index = TagIndex.from_tags(["a|model@b", "model@bc", float("nan"), "a"])
+    assert index.mask("model@b").tolist() == [True, False, False, False]
+    assert index.any(["model@b", "model@bc"]).tolist() == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert index.all(["a", "model@b"]).tolist() == [True, False, False, False]
+    assert index.mask("missing").tolist() == [False] * 4
+
+
+def test_filter_df_tags(tmp_path, monkeypatch):
+    monkeypatch.setenv("WANDB_API_KEY", "x" * 40)
+    input_file = tmp_path / "runs.tsv"
+    df = pd.DataFrame(
+        {"run": ["r1", "r2", "r3"], "tags": ["x|y", "y", "xy"]}
+    ).set_index("run")
+    write_df(df, input_file, skip_writing=False)
+    runner = CliRunner()
+    result = runner.invoke(
+        wandb_utils,
+        [
+            "from-file",
+            str(input_file),
+            "filter-df",
+            "--any-tag",
+            "x|y",
+            "--tag",
+            "y",
+            "-f",
+            "run",
+            "print",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert result.stdout.splitlines()[1:] == ["0\tr1", "1\tr2"]
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from wandb_utils.commands import wandb_utils
+from wandb_utils.commands.from_file import from_file
+from wandb_utils.misc import read_df, write_df
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def runs_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "run": ["a1", "b2", "c3"],
+            "sweep": ["s1", "s1", ""],
+            "seed": [1, 2, 3],
+            "best_validation_MAP": [0.5, None, 0.7],
+        }
+    )
+
+
+def test_arrow_file_round_trip(tmp_path, runs_df):
+    path = tmp_path / "runs.arrow"
+    write_df(runs_df, path, skip_writing=False, output_format="arrow")
+    df = read_df(path)
+    pd.testing.assert_frame_equal(df, runs_df)
+
+
+def test_print_arrow_piped_into_from_file(tmp_path, runs_df, monkeypatch):
+    monkeypatch.setenv("WANDB_API_KEY", "x" * 40)
+    input_file = tmp_path / "runs.tsv"
+    write_df(runs_df.set_index("run"), input_file, skip_writing=False)
+    runner = CliRunner()
+    first = runner.invoke(
+        wandb_utils,
+        ["from-file", str(input_file), "print", "--format", "arrow"],
+    )
+    assert first.exit_code == 0, first.output
+    assert first.stdout_bytes.startswith(b"\xff\xff\xff\xff")
+    second = runner.invoke(
+        wandb_utils,
+        ["from-file", "-i", "run", "-f", "seed", "-", "print"],
+        input=first.stdout_bytes,
+    )
+    assert second.exit_code == 0, second.output
+    assert second.stdout.splitlines() == [
+        "run\tseed",
+        "a1\t1",
+        "b2\t2",
+        "c3\t3",
+    ]
+
+
+def test_from_file_index_of_arrow_input(tmp_path, runs_df):
+    path = tmp_path / "runs.arrow"
+    write_df(
+        runs_df.set_index("run"),
+        path,
+        skip_writing=False,
+        output_format="arrow",
+    )
+    df = from_file(path, ["seed"], "run")
+    assert df.index.name == "run"
+    assert list(df.columns) == ["seed"]
+    df = from_file(path, index="sweep")
+    assert df.index.name == "sweep"
+    assert list(df["run"]) == ["a1", "b2", "c3"]
@@ -0,0 +1,108 @@
+import gc
+import json
+import weakref
+import pandas as pd
+import pytest
+from wandb_utils.commands.print import print_command
+from wandb_utils.commands.wandb_utils import process_commands
+from wandb_utils.misc import RunStream
+
+
+def test_print_jsonl_consumes_stream_without_materializing(capsys):
+    records = [
+        {"run": "a1", "config": {"lr": 0.1}, "summary": {"acc": 0.5}},
+        {"run": "b2", "config": {"lr": 0.2}, "summary": {"h": {"bins": [1]}}},
+    ]
+
+    def to_df() -> pd.DataFrame:
+        pytest.fail("The stream should not be turned into a DataFrame.")
+
+    stream = RunStream(lambda: iter(records), to_df)
+    process_commands(
+        [
+            lambda df: stream,
+            print_command.callback(output_file=None, output_format="jsonl"),
+        ]
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == records
+
+
+class Record(dict):
+    """A record that can be tracked with a weak reference."""
+
+
+def test_print_jsonl_does_not_keep_the_records(capsys):
+    alive = []
+
+    def query():
+        for i in range(100):
+            # the records written before the previous one were released
+            gc.collect()
+            assert sum(r() is not None for r in alive) <= 1
+            record = Record(run=f"r{i}", config={}, summary={"acc": i})
+            alive.append(weakref.ref(record))
+
+            yield record
+
+    stream = RunStream(query, lambda: pd.DataFrame())
+    process_commands(
+        [
+            lambda df: stream,
+            print_command.callback(output_file=None, output_format="jsonl"),
+        ]
+    )
+    assert len(capsys.readouterr().out.splitlines()) == 100
+    assert stream._cached is None
+
+
+def test_print_jsonl_keeps_the_records_for_the_next_command(capsys):
+    records = [
+        {
+            "run": "a1",
+            "run_name": "a",
+            "entity": "e",
+            "project": "p",
+            "path": "e/p/a1",
+            "tags": ["t"],
+            "sweep": "",
+            "sweep_name": "",
+            "config": {"lr": 0.1},
+            "summary": {"acc": 0.5},
+        }
+    ]
+    queries = []
+
+    def query():
+        queries.append(1)
+
+        return iter(records)
+
+    def to_df() -> pd.DataFrame:
+        pytest.fail("The records should not be fetched again.")
+
+    process_commands(
+        [
+            lambda df: RunStream(query, to_df),
+            print_command.callback(output_file=None, output_format="jsonl"),
+            print_command.callback(output_file=None, output_format="tsv"),
+        ]
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert len(queries) == 1
+    assert lines[1:] == [
+        "\trun\trun_name\tentity\tproject\tpath\ttags\tsweep\tsweep_name\tlr\tacc",
+        "0\ta1\ta\te\tp\te/p/a1\tt\t\t\t0.1\t0.5",
+    ]
+
+
+def test_print_tsv_materializes_stream(capsys):
+    df = pd.DataFrame({"run": ["a1"], "acc": [0.5]})
+    stream = RunStream(lambda: iter([]), lambda: df)
+    process_commands(
+        [
+            lambda df: stream,
+            print_command.callback(output_file=None, output_format="tsv"),
+        ]
+    )
+    assert capsys.readouterr().out.splitlines() == ["\trun\tacc", "0\ta1\t0.5"]
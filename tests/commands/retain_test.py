@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+from fakes import FakeApi, FakeClient, FakeRun, listed_file
+from wandb_utils.commands.common import Metric
+from wandb_utils.commands.retain import retain_runs, runs_to_retain
+
+
+@pytest.fixture
+def runs_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "path": [f"e/p/r{i}" for i in range(1, 8)],
+            # as listed by all-data, the runs that are not in a sweep have ""
+            "sweep": ["s1", "s1", "s1", "s2", "s2", "", ""],
+            "acc": [0.1, 0.4, 0.3, None, 0.2, 0.5, 0.05],
+        }
+    )
+
+
+def test_runs_to_retain(runs_df):
+    assert runs_to_retain(
+        runs_df, Metric("acc"), 2, prune_missing=True
+    ).tolist() == [
+        False,
+        True,
+        True,
+        False,
+        True,
+        True,
+        True,
+    ]
+    assert runs_to_retain(
+        runs_df, Metric("acc", False), 1, prune_missing=True
+    ).tolist() == [
+        True,
+        False,
+        False,
+        False,
+        True,
+        True,
+        True,
+    ]
+    # the runs without a value of the metric are retained by default
+    assert runs_to_retain(runs_df, Metric("acc"), 1).tolist() == [
+        False,
+        True,
+        False,
+        True,
+        True,
+        True,
+        True,
+    ]
+    # the runs without a group are groups of their own
+    assert runs_to_retain(
+        runs_df.assign(sweep=[None] * 7), Metric("acc"), 1, prune_missing=True
+    ).tolist() == [True, True, True, False, True, True, True]
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_retain_deletes_files_of_other_runs(runs_df, dry_run):
+    client = FakeClient()
+    api = FakeApi(
+        [
+            FakeRun(
+                f"r{i}",
+                [
+                    listed_file(n, 10, client=client, id=f"r{i}/{n}")
+                    for n in ["model.th", "config.json"]
+                ],
+                client,
+            )
+            for i in range(1, 7)
+        ]
+    )
+    table, report = retain_runs(
+        api,
+        runs_df,
+        "e",
+        "p",
+        Metric("acc"),
+        1,
+        globs=["+ *.th"],
+        dry_run=dry_run,
+        prune_missing=True,
+    )
+
+    assert table.loc[table["retain"], "path"].tolist() == [
+        "e/p/r2",
+        "e/p/r5",
+        "e/p/r6",
+        "e/p/r7",
+    ]
+    assert table["bytes"].tolist() == [10, 0, 10, 10, 0, 0, 0]
+    assert report.ok
+
+    if dry_run:
+        assert client.deleted == []
+    else:
+        assert sorted(client.deleted) == [
+            "r1/model.th",
+            "r3/model.th",
+            "r4/model.th",
+        ]
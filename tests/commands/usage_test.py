@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from fakes import FakeApi, FakeRun, listed_file
+from wandb_utils.commands.usage import files_usage
+
+
+@pytest.fixture
+def api():
+    return FakeApi(
+        [
+            FakeRun(
+                "r1",
+                [
+                    listed_file("model.th", 100),
+                    listed_file("a.json", 1),
+                    listed_file("tmp/x.th", 7),
+                ],
+            ),
+            FakeRun(
+                "r2",
+                [
+                    listed_file("model.th", 50),
+                    listed_file("b.json", 2),
+                    listed_file("log.txt", 3),
+                ],
+            ),
+            FakeRun("r3", [listed_file("best.th", 500)]),
+        ]
+    )
+
+
+@pytest.fixture
+def runs_df():
+    return pd.DataFrame(
+        {
+            "path": ["e/p/r1", "e/p/r2", "e/p/r3", "e/p/missing"],
+            "sweep": ["s1", "s1", "s2", "s2"],
+        }
+    )
+
+
+def test_usage_per_run(api, runs_df):
+    usage = files_usage(api, runs_df, "e", "p", jobs=2)
+
+    assert usage.to_dict("records") == [
+        {"run": "r3", "files": 1, "bytes": 500},
+        {"run": "r1", "files": 3, "bytes": 108},
+        {"run": "r2", "files": 3, "bytes": 55},
+    ]
+
+
+def test_usage_per_sweep_and_glob(api, runs_df):
+    usage = files_usage(
+        api,
+        runs_df,
+        "e",
+        "p",
+        globs=["+ *.th", "+ *.json", "- tmp/*"],
+        by=["sweep", "glob"],
+    )
+
+    assert usage.to_dict("records") == [
+        {"sweep": "s2", "glob": "*.th", "files": 1, "bytes": 500},
+        {"sweep": "s1", "glob": "*.th", "files": 2, "bytes": 150},
+        {"sweep": "s1", "glob": "*.json", "files": 2, "bytes": 3},
+        {"sweep": "s1", "glob": "other", "files": 1, "bytes": 3},
+    ]
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from wandb_utils import governor as governor_module
+
+
+class FileServer(object):
+    """Local stand-in for the wandb file storage."""
+
+    def __init__(self):
+        self.files = {}
+        self.failing = set()
+        # name -> number of bytes to send before dropping the connection (once)
+        self.interrupt = {}
+        # names whose direct (signed) url is rejected
+        self.expired = set()
+        self.paths = []
+        # path -> client address (host, port) of the connection
+        self.clients = {}
+        self.ranges = []
+        self.gets = Counter()
+        # name -> content of the uploads (PUT requests)
+        self.uploads = {}
+        # name -> number of requests to reject with 429 before accepting one
+        self.throttle = Counter()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.host = f"127.0.0.1:{self.httpd.server_port}"
+        self.url = f"http://{self.host}"
+
+    def add(self, name: str, content: bytes) -> str:
+        """Serve `content` and return its key (the path of its url)."""
+        key = f"{len(self.files)}/{name}"
+        self.files[key] = content
+
+        return key
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.paths.append(self.path)
+                server.clients[self.path] = self.client_address
+                name = self.path.lstrip("/")
+
+                if name.startswith("direct/"):
+                    name = name[len("direct/") :]
+
+                    if name in server.expired:
+                        self.send_error(403)
+
+                        return
+                server.gets[name] += 1
+                server.ranges.append((name, self.headers.get("Range")))
+
+                if server.throttle[name] > 0:
+                    server.throttle[name] -= 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+                    return
+
+                if name in server.failing or name not in server.files:
+                    self.send_error(500 if name in server.files else 404)
+
+                    return
+                content = server.files[name]
+                etag = f'"{hashlib.md5(content).hexdigest()}"'
+                start = 0
+                range_ = self.headers.get("Range")
+
+                if self.headers.get("If-Range", etag) != etag:
+                    # the file changed, send all of it
+                    range_ = None
+
+                if range_:
+                    start = int(range_.split("=")[1].split("-")[0])
+
+                if start >= len(content) > 0:
+                    self.send_response(416)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+                    return
+
+                if range_:
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range",
+                        f"bytes {start}-{len(content) - 1}/{len(content)}",
+                    )
+                else:
+                    self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(content) - start))
+                self.end_headers()
+                body = content[start:]
+
+                if name in server.interrupt:
+                    body = body[: server.interrupt.pop(name)]
+                    self.close_connection = True
+                self.wfile.write(body)
+
+            def do_PUT(self):
+                name = self.path.lstrip("/")
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+
+                if server.throttle[name] > 0:
+                    server.throttle[name] -= 1
+                    self.send_error(429)
+
+                    return
+
+                if name in server.failing:
+                    self.send_error(403)
+
+                    return
+                server.uploads[name] = body
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler
+
+
+@pytest.fixture
+def file_server():
+    server = FileServer()
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def governor(monkeypatch):
+    """
+    Fresh process governors per test, retrying without delay. Returns the
+    function that gets the governor of a key (see `governor.governor`).
+    """
+    monkeypatch.setattr(governor_module, "_governors", {})
+    monkeypatch.setattr(
+        governor_module,
+        "_new_governor",
+        lambda: governor_module.Governor(backoff=0),
+    )
+
+    return governor_module.governor
@@ -0,0 +1,158 @@
+"""Stand-ins for the objects of the wandb public api, shared by the tests."""
+
+import base64
+import hashlib
+import threading
+import requests
+from wandb.apis.public import File
+
+
+def b64_md5(content: bytes) -> str:
+    """md5 of `content`, base64 encoded as reported by wandb."""
+
+    return base64.b64encode(hashlib.md5(content).digest()).decode()
+
+
+class FakeClient(object):
+    """
+    Stands in for the graphql client of the public api.
+
+    Records the ids of the files deleted with the `deleteFiles` mutation,
+    after rejecting the first `throttle` mutations with a 429 and the ones
+    that delete any of the `bad` ids. Answers the version query of the
+    listing cache for the runs created with it (see `FakeRun`).
+    """
+
+    def __init__(self, throttle: int = 0, bad=()):
+        self.throttle = throttle
+        self.bad = set(bad)
+        self.deleted = []
+        self.calls = 0
+        self.queries = 0
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def execute(self, query, variable_values):
+        if "files" not in variable_values:
+            self.queries += 1
+            run = self.runs[variable_values["name"]]
+
+            return {
+                "project": {
+                    "run": {
+                        "heartbeatAt": run.heartbeat,
+                        "fileCount": len(run.files_),
+                    }
+                }
+            }
+        ids = variable_values["files"]
+
+        with self.lock:
+            self.calls += 1
+
+            if self.throttle > 0:
+                self.throttle -= 1
+                response = requests.Response()
+                response.status_code = 429
+                raise requests.HTTPError(
+                    "429 Too Many Requests", response=response
+                )
+
+            if self.bad & set(ids):
+                raise ValueError("cannot delete")
+            self.deleted += ids
+
+        return {"deleteFiles": {"success": True}}
+
+
+class FakeFile(File):
+    """
+    A file named `name` (also its id) with `content` served by the
+    `file_server` fixture. `md5` overrides the md5 of the content, `fail`
+    makes the server fail its downloads and `direct` gives it a direct url.
+    """
+
+    def __init__(
+        self,
+        server,
+        name: str,
+        content: bytes,
+        md5=None,
+        client=None,
+        fail: bool = False,
+        direct: bool = False,
+    ):
+        self.key = server.add(name, content)
+        super().__init__(
+            client,
+            {
+                "id": name,
+                "name": name,
+                "sizeBytes": len(content),
+                "md5": md5 or b64_md5(content),
+                "url": f"{server.url}/{self.key}",
+                "directUrl": (
+                    f"{server.url}/direct/{self.key}" if direct else None
+                ),
+            },
+        )
+
+        if fail:
+            server.failing.add(self.key)
+        self.deleted = False
+
+    def delete(self) -> None:
+        self.deleted = True
+
+
+def listed_file(name: str, size: int = 1, md5=None, client=None, id=None):
+    """A file as listed by a run, without content."""
+
+    return File(
+        client, {"id": id or name, "name": name, "sizeBytes": size, "md5": md5}
+    )
+
+
+class FakeRun(object):
+    """Stands in for a run of the public api in the project "e/p"."""
+
+    def __init__(
+        self,
+        id: str,
+        files=(),
+        client=None,
+        heartbeat: str = "2022-01-01T00:00:00",
+    ):
+        self.id = id
+        self.entity = "e"
+        self.project = "p"
+        self.path = [self.entity, self.project, id]
+        self.sweep = None
+        self.client = client if client is not None else FakeClient()
+        self.client.runs[id] = self
+        self.heartbeat = heartbeat
+        self.files_ = list(files)
+        self.listings = 0
+
+    def files(self) -> list:
+        self.listings += 1
+
+        return list(self.files_)
+
+
+class FakeApi(object):
+    """Stands in for the public api, with the `runs`."""
+
+    def __init__(self, runs: list):
+        self.runs_ = {r.id: r for r in runs}
+        self.queries = []
+
+    def runs(self, path, filters=None):
+        self.queries.append((path, filters))
+
+        if filters is None:
+            return list(self.runs_.values())
+
+        return [
+            self.runs_[r] for r in filters["name"]["$in"] if r in self.runs_
+        ]
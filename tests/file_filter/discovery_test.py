@@ -0,0 +1,99 @@
+import glob
+import os
+import random
+from wandb_utils.file_filter import discover_files, GlobBasedFileFilter
+
+
+def make_tree(root, names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+
+
+def test_discover_files(tmp_path, monkeypatch):
+    make_tree(
+        tmp_path,
+        [
+            "sd/config.json",
+            "sd/important.txt",
+            "sd/extra.json",
+            "sd/.hidden.json",
+            "sd/configs/a.json",
+            "sd/checkpoints/e1/meta.json",
+            "sd/checkpoints/e1/shard.bin",
+            "other/b.json",
+        ],
+    )
+    monkeypatch.chdir(tmp_path)
+    files = discover_files(
+        ["sd/*.json", "sd/**/*.json", "sd/important.txt"],
+        ["sd/extra.json"],
+    )
+    # overlapping globs give each file once, hidden files are not matched
+    # and directories are not returned
+    assert sorted(map(str, files)) == [
+        "sd/config.json",
+        "sd/configs/a.json",
+        "sd/important.txt",
+    ]
+
+    # as in PurePath.match, "**" in an exclude glob matches a single part,
+    # so the files deeper in the directory are kept
+    files = discover_files(["**/*.json"], ["sd/checkpoints/**"])
+    assert sorted(map(str, files)) == [
+        "other/b.json",
+        "sd/checkpoints/e1/meta.json",
+        "sd/config.json",
+        "sd/configs/a.json",
+        "sd/extra.json",
+    ]
+    files = discover_files(["**/*.json"], ["sd/checkpoints/*/**"])
+    assert "sd/checkpoints/e1/meta.json" not in map(str, files)
+
+
+def reference(include_globs, exclude_globs):
+    """The files found by glob.iglob and kept by the filter."""
+    file_filter = GlobBasedFileFilter(
+        include_filter=include_globs, exclude_filter=exclude_globs
+    )
+
+    return {
+        os.path.normpath(f)
+        for g in include_globs
+        for f in glob.iglob(g, recursive=True)
+        if os.path.isfile(f) and file_filter(f)
+    }
+
+
+def test_discover_files_as_iglob_and_filter(tmp_path, monkeypatch):
+    make_tree(
+        tmp_path,
+        [
+            "a.json",
+            "ckpt/model.th",
+            "ckpt/deep/model.th",
+            "ckpt/deep/deeper/meta.json",
+            "sd/config.json",
+            "sd/.hidden/a.json",
+            "sd/ckpt/e1/model.th",
+            "sd/ckpt/e1/meta.json",
+            "sd/logs/out.txt",
+        ],
+    )
+    monkeypatch.chdir(tmp_path)
+    parts = ["**", "*", "ckpt", "sd", "deep", "e1", "*.json", "model.th", "m*"]
+    rng = random.Random(0)
+
+    def random_glob():
+        return "/".join(rng.choice(parts) for _ in range(rng.randint(1, 4)))
+
+    for _ in range(500):
+        include_globs = [random_glob() for _ in range(rng.randint(1, 3))]
+        exclude_globs = [random_glob() for _ in range(rng.randint(0, 2))]
+        files = discover_files(include_globs, exclude_globs)
+
+        assert len(files) == len(set(files))
+        assert set(map(str, files)) == reference(
+            include_globs, exclude_globs
+        ), (include_globs, exclude_globs)
@@ -0,0 +1,73 @@
+import itertools
+import pathlib
+import pytest
+from wandb.apis.public import File
+from wandb_utils.file_filter import GlobBasedFileFilter
+
+NAMES = [
+    "config.json",
+    "files/config.json",
+    "serialization_dir/configs/config.json",
+    "serialization_dir/important.txt",
+    "serialization_dir/extra.json",
+    "serialization_dir/model.tar.gz",
+    "wandb-summary.json",
+    "media/images/a_1.png",
+    "media/images/b[1].png",
+    "/abs/path/log.txt",
+    "output.log",
+    "a.b",
+]
+GLOBS = [
+    "*.json",
+    "*",
+    "**/*.json",
+    "serialization_dir/*.json",
+    "serialization_dir/*",
+    "configs/config.json",
+    "*/*/*.png",
+    "media/**",
+    "*_[0-9].png",
+    "*[!0-9].png",
+    "b[[]1].png",
+    "/abs/*/*.txt",
+    "/*.log",
+    "?.?",
+    "*.t*.gz",
+    "*log*",
+]
+
+
+def reference(name, include, exclude):
+    path = pathlib.PurePath(name)
+    included = not include or any(path.match(g) for g in include)
+
+    return included and not any(path.match(g) for g in exclude)
+
+
+@pytest.mark.parametrize("glob", GLOBS)
+def test_single_glob_matches_like_purepath(glob):
+    include = GlobBasedFileFilter(include_filter=[glob])
+    exclude = GlobBasedFileFilter(exclude_filter=[glob])
+
+    for name in NAMES:
+        assert include(name) == reference(name, [glob], []), name
+        assert exclude(name) == reference(name, [], [glob]), name
+
+
+def test_combined_globs_and_filter_many():
+    for include, exclude in itertools.product(
+        [[], GLOBS[:3], GLOBS[6:9]], [[], ["*.txt", "*/extra.json"]]
+    ):
+        ff = GlobBasedFileFilter(
+            include_filter=include, exclude_filter=exclude
+        )
+        expected = [n for n in NAMES if reference(n, include, exclude)]
+        assert ff.filter_many(NAMES) == expected
+        assert [n for n in NAMES if ff(pathlib.Path(n))] == expected
+
+    files = [File(None, {"name": n}) for n in NAMES]
+    ff = GlobBasedFileFilter(include_filter=["*.json"])
+    assert [f.name for f in ff.filter_many(files)] == [
+        n for n in NAMES if n.endswith(".json")
+    ]
@@ -0,0 +1,146 @@
+import click
+import numpy as np
+import pandas as pd
+import pytest
+from fakes import FakeApi
+from wandb_utils.api.all_data import get_all_data
+from wandb_utils.commands.filter import filter_df
+from wandb_utils.layout import (
+    index_and_select,
+    long_from_records,
+    sparse_from_records,
+)
+
+
+def record(run: str, config: dict, summary: dict) -> dict:
+    return {
+        "run": run,
+        "run_name": f"name-{run}",
+        "entity": "e",
+        "project": "p",
+        "path": f"e/p/{run}",
+        "tags": ["t"],
+        "sweep": "",
+        "sweep_name": "",
+        "config": config,
+        "summary": summary,
+    }
+
+
+RECORDS = [
+    record("r1", {"lr": 0.1}, {"acc": 0.1}),
+    record("r2", {"lr": 0.2}, {"acc": 0.5, "loss": 1.0}),
+]
+
+
+class FakeSummary(object):
+    def __init__(self, values: dict):
+        self._json_dict = values
+
+
+class FakeRun(object):
+    """Stands in for a run of the public api."""
+
+    def __init__(self, record: dict):
+        self.id = record["run"]
+        self.name = record["run_name"]
+        self.entity = "e"
+        self.project = "p"
+        self.tags = record["tags"]
+        self.sweep = None
+        self.config = record["config"]
+        self.summary = FakeSummary(record["summary"])
+
+
+def test_long_from_records():
+    df = long_from_records(RECORDS)
+    assert list(df.columns) == ["path", "key", "value"]
+    assert df[df["key"] == "acc"].values.tolist() == [
+        ["e/p/r1", "acc", 0.1],
+        ["e/p/r2", "acc", 0.5],
+    ]
+    # a key is present only in the runs that have it
+    assert df[df["key"] == "loss"].values.tolist() == [["e/p/r2", "loss", 1.0]]
+    assert (df["key"] == "tags").sum() == 2
+
+
+def test_sparse_from_records():
+    df = sparse_from_records(RECORDS)
+    assert df["run"].tolist() == ["r1", "r2"]
+    assert df["tags"].tolist() == ["t", "t"]
+    assert isinstance(df["loss"].dtype, pd.SparseDtype)
+    assert df["acc"].sparse.to_dense().tolist() == [0.1, 0.5]
+    loss = df["loss"].sparse.to_dense().tolist()
+    assert np.isnan(loss[0]) and loss[1] == 1.0
+
+
+def test_index_and_select_long():
+    df = long_from_records(RECORDS)
+    selected = index_and_select(df, "path", ["path", "acc"])
+    assert selected.index.tolist() == ["e/p/r1", "e/p/r2"]
+    assert list(selected.columns) == ["acc"]
+    assert selected["acc"].tolist() == [0.1, 0.5]
+
+    # the same as for the wide layout
+    wide = pd.DataFrame.from_records(
+        [{"path": f"e/p/r{i}", "acc": a} for i, a in ((1, 0.1), (2, 0.5))]
+    )
+    pd.testing.assert_frame_equal(
+        index_and_select(wide, "path", ["path", "acc"]), selected
+    )
+
+
+def filter_long(**kwargs) -> pd.DataFrame:
+    options = dict(
+        fields=(),
+        index=None,
+        tag=(),
+        any_tag=None,
+        all_tags=None,
+        load_summary=(),
+        query=None,
+        pd_eval=None,
+        python_eval=None,
+        python_exec=None,
+    )
+    options.update(kwargs)
+
+    return filter_df.callback(**options)(long_from_records(RECORDS))
+
+
+def test_filter_df_index_and_fields_of_long_layout():
+    df = filter_long(index="path", fields=("path", "acc"))
+    assert df.index.tolist() == ["e/p/r1", "e/p/r2"]
+    assert df["acc"].tolist() == [0.1, 0.5]
+
+
+@pytest.mark.parametrize("option", ["query", "pd_eval"])
+def test_filter_df_query_of_long_layout(option):
+    with pytest.raises(click.UsageError, match="long layout"):
+        filter_long(**{option: "acc > 0.15"})
+
+
+def test_get_all_data_long_layout():
+    api = FakeApi([FakeRun(r) for r in RECORDS])
+    df = get_all_data(
+        api,
+        "e",
+        "p",
+        None,
+        fields=["path", "acc"],
+        index="path",
+        skip_writing=True,
+        layout="long",
+    )
+    assert df["acc"].tolist() == [0.1, 0.5]
+
+    with pytest.raises(ValueError, match="long layout"):
+        get_all_data(
+            api,
+            "e",
+            "p",
+            None,
+            df_filter="+acc > 0.15",
+            skip_writing=True,
+            layout="long",
+        )
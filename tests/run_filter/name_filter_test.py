@@ -0,0 +1,16 @@
+from wandb_utils.run_filter import NameBasedRunFilter
+
+
+def test_allowed_names_are_chunked_into_server_filters():
+    run_filter = NameBasedRunFilter(allowed_names=["c", "a", "b"])
+
+    assert run_filter.query_filters(2) == [
+        {"name": {"$in": ["a", "b"]}},
+        {"name": {"$in": ["c"]}},
+    ]
+
+
+def test_not_allowed_names_are_not_applied_on_the_server():
+    run_filter = NameBasedRunFilter(not_allowed_names=["a"])
+
+    assert run_filter.query_filters(2) is None
@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+from fakes import FakeApi
+from wandb_utils.commands.filter import filter_df
+from wandb_utils.commands.print import print_command
+from wandb_utils.commands.wandb_utils import process_commands
+from wandb_utils.misc import all_data_df
+from wandb_utils.summary_store import (
+    SummaryStore,
+    SUMMARY_STORE_ATTR,
+    load_summary,
+    split_summary,
+)
+
+
+class FakeSummary(object):
+    def __init__(self, values: dict):
+        self._json_dict = values
+
+
+class FakeRun(object):
+    """Stands in for a run of the public api."""
+
+    def __init__(self, id: str, summary: dict):
+        self.id = id
+        self.name = f"name-{id}"
+        self.entity = "e"
+        self.project = "p"
+        self.tags = []
+        self.sweep = None
+        self.config = {"lr": 0.1}
+        self.summary = FakeSummary(summary)
+
+
+@pytest.fixture
+def api():
+    return FakeApi(
+        [
+            FakeRun("r1", {"acc": 0.1, "h": {"bins": [1]}}),
+            FakeRun("r2", {"acc": 0.5, "h": {"bins": [2]}, "t": ["x"]}),
+            FakeRun("r3", {"acc": 0.7}),
+        ]
+    )
+
+
+def test_split_summary():
+    scalars, nested = split_summary(
+        {"acc": 0.5, "name": "a", "none": None, "h": {"bins": []}, "l": [1]}
+    )
+    assert scalars == {"acc": 0.5, "name": "a", "none": None}
+    assert nested == ["h", "l"]
+
+
+def test_store_fetches_the_summaries_once(api):
+    store = SummaryStore(api)
+    store.add("e/p/r1", ["h"])
+    store.add("e/p/r2", ["h", "t"])
+    store.add("e/p/r3", [])
+    df = pd.DataFrame({"path": ["e/p/r1", "e/p/r2", "e/p/r3"], "t": [1, 2, 3]})
+    loaded = store.load(df, ["h", "t"])
+
+    assert loaded["h"].tolist() == [{"bins": [1]}, {"bins": [2]}, None]
+    # the values that are not in the store are kept
+    assert loaded["t"].tolist() == [1, ["x"], 3]
+    assert store.get("e/p/r2", "h") == {"bins": [2]}
+    # one query for the runs of the project with nested values
+    assert api.queries == [("e/p", {"name": {"$in": ["r1", "r2"]}})]
+
+
+def test_lazy_summary_through_filter_and_print(api, capsys):
+    df = all_data_df("e", "p", api=api, lazy_summary=True)
+    assert "h" not in df.columns
+    assert isinstance(df.attrs[SUMMARY_STORE_ATTR], SummaryStore)
+
+    process_commands(
+        [
+            lambda _: df,
+            filter_df.callback(
+                fields=("run", "h"),
+                index=None,
+                tag=(),
+                any_tag=None,
+                all_tags=None,
+                load_summary=("h",),
+                query="acc > 0.3",
+                pd_eval=None,
+                python_eval=None,
+                python_exec=None,
+            ),
+            print_command.callback(output_file=None, output_format="jsonl"),
+        ]
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        '{"index":1,"run":"r2","h":{"bins":[2]}}',
+        '{"index":2,"run":"r3","h":null}',
+    ]
+
+
+def test_load_summary_rejects_the_long_layout(api):
+    df = all_data_df("e", "p", api=api, layout="long", lazy_summary=True)
+
+    with pytest.raises(ValueError, match="one row per run"):
+        load_summary(df, ["h"])
@@ -0,0 +1,101 @@
+import json
+import tarfile
+import zipfile
+from fakes import FakeFile
+from wandb_utils.transfer import export_all, read_member, INDEX_SUFFIX
+from wandb_utils.transfer import archive as archive_module
+from wandb_utils.transfer.archive import INDEX_MEMBER, SpoolBudget
+
+
+def test_export_to_tar_shards_with_index(tmp_path, file_server):
+    contents = {f"r{i % 3}/{i}.txt": b"x" * (10 * i) for i in range(10)}
+    items = [
+        (name, FakeFile(file_server, name, content))
+        for name, content in contents.items()
+    ]
+    corrupt = FakeFile(file_server, "corrupt.txt", b"abc", md5="bad")
+    failing = FakeFile(file_server, "failing.txt", b"abc", fail=True)
+    # dropped once after 5 bytes, and resumed
+    file_server.interrupt[f"{len(file_server.files) - 3}/r0/9.txt"] = 5
+    items += [("r0/corrupt.txt", corrupt), ("r0/failing.txt", failing)]
+    archive = tmp_path / "out" / "export.tar"
+    report = export_all(
+        items, archive, shard_size=100, jobs=3, verify=True, queue_size=2
+    )
+
+    assert sorted(report.done) == sorted(contents)
+    assert sorted(report.failed) == ["r0/corrupt.txt", "r0/failing.txt"]
+    index_path = archive.with_name(archive.name + INDEX_SUFFIX)
+    index = [json.loads(line) for line in index_path.read_text().splitlines()]
+
+    assert sorted(e["member"] for e in index) == sorted(contents)
+    shards = sorted({e["shard"] for e in index})
+    assert len(shards) > 1 and shards[0] == "export-00000.tar"
+
+    for shard in shards:
+        with tarfile.open(archive.parent / shard) as tar:
+            members = tar.getnames()
+            # the shard ends with its own index
+            assert members[-1] == INDEX_MEMBER
+            entries = tar.extractfile(INDEX_MEMBER).read().splitlines()
+
+            assert len(entries) == len(members) - 1
+            assert sum(e["size"] for e in index if e["shard"] == shard) <= 100
+            for name in members[:-1]:
+                assert tar.extractfile(name).read() == contents[name]
+
+    for name, content in contents.items():
+        assert read_member(index_path, name) == content
+
+
+def test_export_to_zip(tmp_path, file_server):
+    contents = {"r1/a.json": b"{}", "r1/empty.txt": b"", "r2/b.bin": b"b" * 5}
+    items = [
+        (name, FakeFile(file_server, name, content))
+        for name, content in contents.items()
+    ]
+    archive = tmp_path / "export.zip"
+    report = export_all(items, archive, jobs=2)
+
+    assert sorted(report.done) == sorted(contents)
+
+    with zipfile.ZipFile(archive) as zf:
+        assert sorted(zf.namelist()) == sorted(list(contents) + [INDEX_MEMBER])
+
+        for name, content in contents.items():
+            assert zf.read(name) == content
+
+    index_path = tmp_path / f"export.zip{INDEX_SUFFIX}"
+
+    for name, content in contents.items():
+        assert read_member(index_path, name) == content
+
+
+def test_spool_budget_bounds_the_memory(monkeypatch):
+    monkeypatch.setattr(archive_module, "SPOOL_SIZE", 50)
+    budget = SpoolBudget(100)
+    spools = [budget.spool(40), budget.spool(40), budget.spool(40)]
+
+    # the third file does not fit in memory
+    assert [reserved for _, reserved in spools] == [40, 40, 0]
+    # larger than SPOOL_SIZE
+    assert budget.spool(60)[1] == 0
+    budget.release(spools[0][1])
+    assert budget.spool(20)[1] == 20
+    assert budget.used == 60 and budget.peak == 80
+
+
+def test_export_without_memory(tmp_path, file_server):
+    contents = {f"r1/{i}.txt": bytes([i]) * 100 for i in range(5)}
+    items = [
+        (name, FakeFile(file_server, name, content))
+        for name, content in contents.items()
+    ]
+    archive = tmp_path / "export.tar"
+    report = export_all(items, archive, jobs=2, spool_memory=0)
+
+    assert sorted(report.done) == sorted(contents)
+    index_path = archive.with_name(archive.name + INDEX_SUFFIX)
+
+    for name, content in contents.items():
+        assert read_member(index_path, name) == content
@@ -0,0 +1,44 @@
+from fakes import FakeClient, listed_file
+from wandb_utils.transfer import delete_all
+from wandb_utils.transfer import delete
+
+
+def files(client, n):
+    return [
+        (
+            f"r/{i}.txt",
+            listed_file(f"{i}.txt", client=client, id=str(i)),
+        )
+        for i in range(n)
+    ]
+
+
+def test_delete_all_batches_and_retries_throttled(monkeypatch):
+    monkeypatch.setattr(delete, "RETRY_BACKOFF", 0)
+    client = FakeClient(throttle=3)
+    report = delete_all(iter(files(client, 25)), jobs=3, batch_size=10)
+
+    assert sorted(client.deleted, key=int) == [str(i) for i in range(25)]
+    assert len(report.done) == 25 and report.ok
+    # 3 mutations for 25 files, plus the 3 throttled ones
+    assert client.calls == 6
+
+
+def test_delete_all_isolates_failing_files(monkeypatch):
+    client = FakeClient(bad=["3"])
+    report = delete_all(files(client, 10), batch_size=5)
+
+    assert list(report.failed) == ["r/3.txt"]
+    assert len(report.done) == 9
+    assert "3" not in client.deleted
+
+
+def test_delete_all_fails_throttled_batch_as_a_whole(monkeypatch):
+    monkeypatch.setattr(delete, "RETRY_BACKOFF", 0)
+    monkeypatch.setattr(delete, "MAX_RETRIES", 1)
+    client = FakeClient(throttle=100)
+    report = delete_all(files(client, 10), batch_size=5, jobs=1)
+
+    assert len(report.failed) == 10 and not client.deleted
+    # 2 attempts per batch, no mutation per file
+    assert client.calls == 4
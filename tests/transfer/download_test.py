@@ -0,0 +1,237 @@
+import base64
+import hashlib
+import pytest
+from fakes import FakeFile, FakeRun
+from wandb_utils.file_filter import GlobBasedFileFilter
+from wandb_utils.transfer import (
+    download_files,
+    download_runs,
+    stream_download,
+    ContentStore,
+    ListingCache,
+    Manifest,
+    MANIFEST_FILENAME,
+    PARTIAL_SUFFIX,
+)
+from wandb_utils.transfer.stream import CHUNK_SIZE, validator_path
+
+
+def test_download_files_collects_failures(tmp_path, file_server):
+    (tmp_path / "exists.txt").write_text("old")
+    files = [
+        FakeFile(file_server, "a.txt", b"a"),
+        FakeFile(file_server, "dir/b.txt", b"bb"),
+        FakeFile(file_server, "bad.txt", b"x", fail=True),
+        FakeFile(file_server, "exists.txt", b"new"),
+    ]
+    report = download_files(
+        files, tmp_path, jobs=3, after_download=lambda f: f.delete()
+    )
+    assert sorted(report.done) == ["a.txt", "dir/b.txt"]
+    assert list(report.failed) == ["bad.txt"]
+    assert list(report.skipped) == ["exists.txt"]
+    assert report.num_bytes == 3
+    assert (tmp_path / "dir/b.txt").read_bytes() == b"bb"
+    assert (tmp_path / "exists.txt").read_text() == "old"
+    assert [f.deleted for f in files] == [True, True, False, False]
+
+
+def test_download_runs_uses_per_run_directories(tmp_path, file_server):
+    runs = [
+        (
+            FakeRun(
+                "r1",
+                [
+                    FakeFile(file_server, "c.json", b"1"),
+                    FakeFile(file_server, "m.th", b"22"),
+                ],
+            ),
+            tmp_path / "r1",
+        ),
+        (
+            FakeRun("r2", [FakeFile(file_server, "c.json", b"3")]),
+            tmp_path / "r2",
+        ),
+    ]
+    report = download_runs(
+        runs, GlobBasedFileFilter(include_filter=["*.json"]), jobs=4
+    )
+    assert sorted(report.done) == ["r1/c.json", "r2/c.json"]
+    assert (tmp_path / "r1" / "c.json").read_bytes() == b"1"
+    assert (tmp_path / "r2" / "c.json").read_bytes() == b"3"
+    assert not (tmp_path / "r1" / "m.th").exists()
+
+
+def test_sync_lists_runs_from_the_server(tmp_path, file_server):
+    cache = ListingCache(tmp_path / "cache")
+    run = FakeRun("r1", [FakeFile(file_server, "a.txt", b"old")])
+    cache.files(run)
+    # replaced by a file with the same name: the version of the run is the same
+    run.files_ = [FakeFile(file_server, "a.txt", b"new")]
+
+    for option in ["sync", "verify"]:
+        output_dir = tmp_path / option
+        report = download_runs(
+            [(run, output_dir)], cache=cache, **{option: True}
+        )
+        assert report.done == ["r1/a.txt"] and report.ok
+        assert (output_dir / "a.txt").read_bytes() == b"new"
+    assert run.listings == 3
+
+
+def test_sync_downloads_only_changed_files(tmp_path, file_server):
+    (tmp_path / "same.txt").write_text("same")
+    (tmp_path / "changed.txt").write_text("old!")
+    files = [
+        FakeFile(file_server, "same.txt", b"same"),
+        FakeFile(file_server, "changed.txt", b"new!"),
+        FakeFile(file_server, "missing.txt", b"m"),
+    ]
+    report = download_files(files, tmp_path, sync=True)
+    assert sorted(report.done) == ["changed.txt", "missing.txt"]
+    assert list(report.skipped) == ["same.txt"]
+    assert (tmp_path / "changed.txt").read_bytes() == b"new!"
+    assert (tmp_path / MANIFEST_FILENAME).exists()
+
+    # second sync: nothing to download and the md5s come from the manifest
+    manifest = Manifest(tmp_path)
+    assert set(manifest.entries) == {"same.txt", "changed.txt", "missing.txt"}
+    report = download_files(files, tmp_path, sync=True)
+    assert len(report.skipped) == 3
+    assert [file_server.gets[f.key] for f in files] == [0, 1, 1]
+
+
+def test_interrupted_download_resumes_with_range(tmp_path, file_server):
+    content = bytes(range(256)) * 4096 * 3
+    file_ = FakeFile(file_server, "model.th", content)
+    file_server.interrupt[file_.key] = len(content) // 2
+    report = download_files([file_], tmp_path)
+    assert report.done == ["model.th"]
+    assert (tmp_path / "model.th").read_bytes() == content
+    assert not (tmp_path / f"model.th{PARTIAL_SUFFIX}").exists()
+    assert file_server.ranges == [
+        (file_.key, None),
+        (file_.key, f"bytes={CHUNK_SIZE}-"),
+    ]
+
+
+def test_failed_download_leaves_only_partial_file(tmp_path, file_server):
+    file_ = FakeFile(file_server, "model.th", b"x" * 100)
+    # without a validator, a partial file is not resumed
+    (tmp_path / f"model.th{PARTIAL_SUFFIX}").write_bytes(b"x" * 40)
+    file_server.interrupt[file_.key] = 10
+    path = tmp_path / "model.th"
+
+    with pytest.raises(IOError):
+        stream_download(
+            f"{file_server.url}/{file_.key}",
+            path,
+            size=100,
+            chunk_size=10,
+            max_resumes=0,
+        )
+    assert not path.exists()
+    assert (tmp_path / f"model.th{PARTIAL_SUFFIX}").stat().st_size == 10
+    assert stream_download(f"{file_server.url}/{file_.key}", path, 100) == 100
+    assert file_server.ranges == [(file_.key, None), (file_.key, "bytes=10-")]
+    assert not validator_path(path).exists()
+
+
+def test_partial_file_of_changed_file_is_not_resumed(tmp_path, file_server):
+    file_ = FakeFile(file_server, "model.th", b"a" * 100)
+    url = f"{file_server.url}/{file_.key}"
+    path = tmp_path / "model.th"
+    file_server.interrupt[file_.key] = 40
+
+    with pytest.raises(IOError):
+        stream_download(url, path, size=100, max_resumes=0)
+    # the file is replaced by a smaller one on the server
+    file_server.files[file_.key] = b"b" * 60
+    assert stream_download(url, path, size=60) == 60
+    assert path.read_bytes() == b"b" * 60
+
+
+def test_complete_partial_file_of_unknown_size(tmp_path, file_server):
+    file_ = FakeFile(file_server, "model.th", b"a" * 100)
+    url = f"{file_server.url}/{file_.key}"
+    path = tmp_path / "model.th"
+    partial = tmp_path / f"model.th{PARTIAL_SUFFIX}"
+    partial.write_bytes(b"a" * 100)
+    validator_path(path).write_text(f'"{hashlib.md5(b"a" * 100).hexdigest()}"')
+    # the range past the end is rejected, the file is downloaded again
+    assert stream_download(url, path) == 100
+    assert file_server.ranges == [(file_.key, "bytes=100-"), (file_.key, None)]
+    assert path.read_bytes() == b"a" * 100
+
+
+def test_partial_file_without_validator_is_verified(tmp_path, file_server):
+    file_ = FakeFile(file_server, "model.th", b"a" * 100)
+    url = f"{file_server.url}/{file_.key}"
+    path = tmp_path / "model.th"
+    (tmp_path / f"model.th{PARTIAL_SUFFIX}").write_bytes(b"b" * 40)
+    assert stream_download(url, path, size=100, md5=file_.md5) == 100
+    assert path.read_bytes() == b"a" * 100
+    assert file_server.ranges == [(file_.key, "bytes=40-"), (file_.key, None)]
+
+
+def test_store_downloads_identical_files_once(tmp_path, file_server):
+    store = ContentStore(tmp_path / "store")
+    runs = [
+        (
+            FakeRun(f"r{i}", [FakeFile(file_server, "vocab.txt", b"a b c")]),
+            tmp_path / f"r{i}",
+        )
+        for i in range(3)
+    ]
+    report = download_runs(runs, jobs=3, store=store)
+    assert len(report.done) == 3
+    assert sum(file_server.gets.values()) == 1
+    assert store.num_linked == 2
+
+    for i in range(3):
+        path = tmp_path / f"r{i}" / "vocab.txt"
+        assert path.read_bytes() == b"a b c"
+        assert path.stat().st_nlink == 4  # 3 runs and the store
+
+
+def test_store_adds_only_verified_files(tmp_path, file_server):
+    store = ContentStore(tmp_path / "store")
+    file_ = FakeFile(file_server, "vocab.txt", b"a b c")
+    md5 = file_.md5
+    file_._attrs["md5"] = base64.b64encode(b"x" * 16).decode()
+    report = download_files([file_], tmp_path / "r1", store=store)
+
+    assert list(report.failed) == ["vocab.txt"]
+    assert not store.has(file_.md5) and not store.has(md5)
+    assert not (tmp_path / "r1" / "vocab.txt").exists()
+
+
+def test_direct_urls_over_pooled_connections(tmp_path, file_server):
+    files = [
+        FakeFile(file_server, f"{i}.txt", b"x" * i, direct=True)
+        for i in range(1, 6)
+    ]
+    file_server.expired.add(files[0].key)
+    report = download_files(files, tmp_path, jobs=1)
+    assert len(report.done) == 5
+    assert file_server.paths == [f"/direct/{f.key}" for f in files[:1]] + [
+        f"/{files[0].key}"
+    ] + [f"/direct/{f.key}" for f in files[1:]]
+    # the rejected request closes its connection, the others reuse one
+    clients = {file_server.clients[f"/direct/{f.key}"] for f in files[1:]}
+    assert len(clients) == 1
+
+
+def test_verify_reports_md5_mismatches(tmp_path, file_server):
+    corrupt = FakeFile(file_server, "corrupt.th", b"data")
+    corrupt._attrs["md5"] = FakeFile(file_server, "other", b"other").md5
+    resumed = FakeFile(file_server, "resumed.th", bytes(range(256)) * 8192)
+    file_server.interrupt[resumed.key] = CHUNK_SIZE + 10
+    (tmp_path / "local.txt").write_bytes(b"edited")
+    local = FakeFile(file_server, "local.txt", b"original")
+    report = download_files([corrupt, resumed, local], tmp_path, verify=True)
+    assert report.done == ["resumed.th"]
+    assert sorted(report.mismatched) == ["corrupt.th", "local.txt"]
+    assert not (tmp_path / "corrupt.th").exists()
+    assert not (tmp_path / f"corrupt.th{PARTIAL_SUFFIX}").exists()
+    assert (tmp_path / "local.txt").read_bytes() == b"edited"
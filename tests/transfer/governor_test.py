@@ -0,0 +1,149 @@
+import threading
+import time
+import pytest
+import requests
+from wandb.apis.public import RetryingClient
+from wandb_utils.governor import (
+    Governor,
+    GovernedClient,
+    TokenBucket,
+    govern_api,
+    is_governed,
+)
+from wandb_utils.transfer import put_file
+from wandb_utils.transfer.session import PooledSession
+
+
+def test_throttled_requests_are_retried(file_server, governor):
+    key = file_server.add("a.txt", b"content")
+    file_server.throttle[key] = 3
+    response = PooledSession().get(f"{file_server.url}/{key}")
+    storage = governor(file_server.host)
+
+    assert response.status_code == 200 and response.content == b"content"
+    assert file_server.gets[key] == 4
+    assert storage.retries == 3 and storage.requests == 4
+    # throttling decreases the concurrency of the host only
+    assert storage.limit < storage.max_concurrency
+    assert governor().limit == governor().max_concurrency
+
+
+def test_requests_give_up_after_max_retries(file_server, governor):
+    key = file_server.add("a.txt", b"content")
+    file_server.throttle[key] = 10
+    governor(file_server.host).max_retries = 2
+    response = PooledSession().get(f"{file_server.url}/{key}")
+
+    assert response.status_code == 429
+    assert file_server.gets[key] == 3
+
+
+def test_concurrency_is_limited():
+    governor = Governor(max_concurrency=3)
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def request():
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+
+    threads = [
+        threading.Thread(target=governor.call, args=(request,))
+        for _ in range(20)
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert active[1] <= 3 and governor.peak <= 3
+    assert governor.requests == 20
+
+
+def test_token_bucket_limits_the_rate():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(10, burst=2, clock=lambda: now[0], sleep=sleep)
+
+    for _ in range(12):
+        bucket.acquire()
+    # the burst is free, the other 10 requests take one second
+    assert abs(now[0] - 1.0) < 1e-9
+
+
+class Transport(object):
+    def __init__(self, throttle: int = 1):
+        self.calls = 0
+        self.throttle = throttle
+
+    def execute(self, query):
+        self.calls += 1
+
+        if self.calls <= self.throttle:
+            response = requests.Response()
+            response.status_code = 429
+            raise requests.HTTPError("429", response=response)
+
+        return {"data": query}
+
+
+class Client(object):
+    def __init__(self, throttle: int = 1):
+        self.transport = Transport(throttle)
+
+    def execute(self, query):
+        return self.transport.execute(query)
+
+
+class Api(object):
+    """Stands in for `wandb.Api`."""
+
+    def __init__(self, throttle: int = 1):
+        self._base_client = Client(throttle)
+        self._client = RetryingClient(self._base_client)
+
+
+def test_govern_api_retries_throttled_queries():
+    governor = Governor(backoff=0)
+    api = govern_api(Api(), governor)
+    # wrapping twice does not send the queries through the governor twice
+    govern_api(api, governor)
+
+    assert api._base_client.transport.execute("q") == {"data": "q"}
+    assert api._base_client.transport.calls == 2
+    assert governor.requests == 2 and governor.retries == 1
+
+
+def test_governed_api_is_not_retried_by_wandb():
+    governor = Governor(backoff=0, max_retries=2)
+    api = Api(throttle=10)
+    assert not is_governed(api._client)
+    govern_api(api, governor)
+    assert isinstance(api._client, GovernedClient)
+    assert is_governed(api._client)
+
+    with pytest.raises(requests.HTTPError):
+        api._client.execute("q")
+    # only the retries of the governor
+    assert api._base_client.transport.calls == 3
+
+
+def test_put_file_is_retried_by_the_governor(tmp_path, file_server, governor):
+    path = tmp_path / "model.th"
+    path.write_bytes(b"x" * 100)
+    file_server.throttle["model.th"] = 2
+    size = put_file(
+        f"{file_server.url}/model.th", path, session=PooledSession()
+    )
+
+    assert size == 100 and file_server.uploads["model.th"] == b"x" * 100
+    assert governor(file_server.host).retries == 2
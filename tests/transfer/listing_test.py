@@ -0,0 +1,74 @@
+from wandb.apis.public import File
+from fakes import FakeRun, listed_file
+from wandb_utils.file_filter import GlobBasedFileFilter
+from wandb_utils.transfer import (
+    ListingCache,
+    TransferReport,
+    filtered_runs_files,
+    run_files,
+)
+from wandb_utils.transfer.listing import list_concurrently
+
+
+def test_listing_is_cached_until_the_files_change(tmp_path):
+    cache = ListingCache(tmp_path)
+    run = FakeRun("r1", [listed_file("a.json"), listed_file("b.th")])
+    assert [f.name for f in cache.files(run)] == ["a.json", "b.th"]
+    files = cache.files(run)
+    assert run.listings == 1
+    assert isinstance(files[0], File) and files[0].size == 1
+    ff = GlobBasedFileFilter(include_filter=["*.json"])
+    assert [f.name for f in files if ff(f)] == ["a.json"]
+
+    # a file deleted from a finished run (same heartbeat)
+    run.files_.pop()
+    assert len(cache.files(run)) == 1
+    assert run.listings == 2
+
+    run.heartbeat = "2022-01-02T00:00:00"
+    assert len(cache.files(run)) == 1
+    assert run.listings == 3
+
+    cache.invalidate(run)
+    cache.files(run)
+    assert run.listings == 4
+
+
+def test_refresh_lists_from_the_server(tmp_path):
+    cache = ListingCache(tmp_path)
+    run = FakeRun("r1", [listed_file("a.json")])
+    run_files(run, cache)
+    run_files(run, cache, refresh=True)
+    assert run.listings == 2
+    # the fresh listing is cached
+    run_files(run, cache)
+    assert run.listings == 2
+
+
+def test_list_concurrently_consumes_the_runs_lazily():
+    consumed = []
+
+    def runs():
+        for i in range(100):
+            consumed.append(i)
+
+            yield FakeRun(f"r{i}", [listed_file("a.json")])
+
+    listings = list_concurrently(runs(), run_files, jobs=2)
+    run, future = next(listings)
+    # the listings in flight and done, but not consumed, are bounded
+    assert len(consumed) <= 4
+    assert [f.name for f in future.result()] == ["a.json"]
+    assert len(list(listings)) == 99 and len(consumed) == 100
+
+
+def test_filtered_runs_files_records_failures():
+    class BrokenRun(FakeRun):
+        def files(self):
+            raise ValueError("cannot list")
+
+    runs = [FakeRun("r1", [listed_file("a.th")]), BrokenRun("r2")]
+    report = TransferReport()
+    listings = filtered_runs_files(runs, jobs=2, report=report)
+    assert [(r.id, len(files)) for r, files in listings] == [("r1", 1)]
+    assert list(report.failed) == ["r2"]
@@ -0,0 +1,28 @@
+from fakes import FakeClient, FakeFile
+from wandb_utils.transfer import move_all
+
+
+def test_move_deletes_only_verified_files(tmp_path, file_server):
+    client = FakeClient()
+    files = [
+        FakeFile(file_server, f"{i}.txt", b"x" * i, client=client)
+        for i in range(20)
+    ]
+    corrupt = FakeFile(
+        file_server, "corrupt.txt", b"abc", md5="bad", client=client
+    )
+    failing = FakeFile(
+        file_server, "failing.txt", b"abc", client=client, fail=True
+    )
+    (tmp_path / "exists.txt").write_text("old")
+    exists = FakeFile(file_server, "exists.txt", b"new", client=client)
+    items = [(f.name, f, tmp_path) for f in files + [corrupt, failing, exists]]
+    report = move_all(items, jobs=4, verify_jobs=2, queue_size=2)
+
+    assert sorted(client.deleted) == sorted(f.name for f in files)
+    assert sorted(report.done) == sorted(f.name for f in files)
+    assert report.mismatched == ["corrupt.txt"]
+    assert sorted(report.failed) == ["corrupt.txt", "failing.txt"]
+    assert report.skipped == {"exists.txt": "exists"}
+    assert (tmp_path / "19.txt").read_bytes() == b"x" * 19
+    assert (tmp_path / "exists.txt").read_text() == "old"
@@ -0,0 +1,125 @@
+import pathlib
+import shutil
+import sys
+import pytest
+from fakes import FakeClient, FakeFile
+from wandb_utils.transfer import rclone_all, rcat, RcloneError
+from wandb_utils.transfer.download import ChecksumMismatch
+from wandb_utils.transfer.stream import PARTIAL_SUFFIX
+
+# stands in for `rclone rcat [--size N] DEST`, `rclone moveto SRC DEST` and
+# `rclone deletefile PATH` with a local path as the remote, and logs the
+# commands next to itself. Like rclone, rcat stores the data as soon as it
+# has read the announced size (or at the end of its input).
+FAKE_RCLONE = """#!{python}
+import pathlib, sys
+args = sys.argv[1:]
+with open(__file__ + ".log", "a") as log:
+    log.write(" ".join(args) + "\\n")
+if args[0] == "moveto":
+    pathlib.Path(args[1]).replace(args[2])
+    sys.exit()
+if args[0] == "deletefile":
+    pathlib.Path(args[1]).unlink()
+    sys.exit()
+assert args[0] == "rcat", args
+dest = pathlib.Path(args[-1])
+if "fail" in dest.name:
+    sys.exit("cannot write " + str(dest))
+dest.parent.mkdir(parents=True, exist_ok=True)
+size = int(args[args.index("--size") + 1]) if "--size" in args else None
+data = b""
+while size is None or len(data) < size:
+    chunk = sys.stdin.buffer.read1(65536)
+    if not chunk:
+        break
+    data += chunk
+dest.write_bytes(data)
+assert size is None or size == len(data)
+sys.stdin.buffer.read()
+"""
+
+
+@pytest.fixture
+def fake_rclone(tmp_path):
+    path = tmp_path / "bin" / "rclone"
+    path.parent.mkdir()
+    path.write_text(FAKE_RCLONE.format(python=sys.executable))
+    path.chmod(0o755)
+
+    return str(path)
+
+
+def test_rclone_all_moves_streamed_files(tmp_path, file_server, fake_rclone):
+    client = FakeClient()
+    files = [
+        FakeFile(file_server, f"{i}.txt", b"x" * i, client=client)
+        for i in range(12)
+    ]
+    corrupt = FakeFile(file_server, "corrupt.txt", b"abc", "bad", client)
+    failing = FakeFile(file_server, "fail.txt", b"abc", client=client)
+    remote = tmp_path / "remote"
+    items = [
+        (f"r1/{f.name}", f, str(remote / "r1" / f.name))
+        for f in files + [corrupt, failing]
+    ]
+    report = rclone_all(
+        items, delete=True, jobs=4, rclone=fake_rclone, queue_size=2
+    )
+
+    assert sorted(report.done) == sorted(f"r1/{f.name}" for f in files)
+    assert sorted(report.failed) == ["r1/corrupt.txt", "r1/fail.txt"]
+    assert isinstance(report.failed["r1/fail.txt"], RcloneError)
+    # only the files that reached the remote are deleted from wandb
+    assert sorted(client.deleted) == sorted(f.name for f in files)
+
+    for i in range(12):
+        assert (remote / "r1" / f"{i}.txt").read_bytes() == b"x" * i
+    # the corrupt data does not stay on the remote, under any name
+    assert sorted(p.name for p in (remote / "r1").iterdir()) == sorted(
+        f.name for f in files
+    )
+
+
+def test_rclone_copy_keeps_files(tmp_path, file_server, fake_rclone):
+    client = FakeClient()
+    file_ = FakeFile(file_server, "a.txt", b"abc", client=client)
+    report = rclone_all(
+        [("r1/a.txt", file_, str(tmp_path / "r1" / "a.txt"))],
+        rclone=fake_rclone,
+    )
+
+    assert report.done == ["r1/a.txt"] and not client.deleted
+    assert (tmp_path / "r1" / "a.txt").read_bytes() == b"abc"
+
+
+def test_rcat_deletes_unverified_data(tmp_path, file_server, fake_rclone):
+    # large enough to reach rclone before the md5 is checked
+    content = b"abc" * 100000
+    file_ = FakeFile(file_server, "a.txt", content, md5="bad")
+    target = tmp_path / "remote" / "a.txt"
+
+    with pytest.raises(ChecksumMismatch):
+        rcat(file_, str(target), verify=True, rclone=fake_rclone)
+
+    assert list(target.parent.iterdir()) == []
+    log = pathlib.Path(fake_rclone + ".log").read_text().splitlines()
+    assert log[-1] == f"deletefile {target}{PARTIAL_SUFFIX}"
+
+    file_ = FakeFile(file_server, "b.txt", content)
+    target = tmp_path / "remote" / "b.txt"
+    assert rcat(file_, str(target), verify=True, rclone=fake_rclone) == len(
+        content
+    )
+    assert target.read_bytes() == content
+    log = pathlib.Path(fake_rclone + ".log").read_text().splitlines()
+    assert log[-1] == f"moveto {target}{PARTIAL_SUFFIX} {target}"
+
+
+@pytest.mark.skipif(shutil.which("rclone") is None, reason="needs rclone")
+def test_rcat_to_local_remote(tmp_path, file_server):
+    file_ = FakeFile(file_server, "a.txt", b"abc" * 1000)
+    target = tmp_path / "remote" / "a.txt"
+
+    assert rcat(file_, str(target), verify=True) == 3000
+    assert target.read_bytes() == b"abc" * 1000
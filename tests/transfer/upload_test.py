@@ -0,0 +1,173 @@
+import pytest
+import tqdm
+from fakes import FakeRun, listed_file
+from wandb_utils.transfer import (
+    upload_all,
+    remote_name,
+    split_unchanged,
+    md5_file,
+    Manifest,
+)
+from wandb_utils.transfer import upload, manifest
+
+
+class FakeApi(object):
+    """Stands in for the internal api, with upload urls on the file server."""
+
+    api_url = "http://unused"
+
+    def __init__(self, server, missing_runs=(), no_url=()):
+        self.server = server
+        self.missing_runs = set(missing_runs)
+        self.no_url = set(no_url)
+        self.requests = []
+
+    def upload_urls(self, project, files, run=None, entity=None):
+        self.requests.append((entity, project, run, list(files)))
+
+        if run in self.missing_runs:
+            raise ValueError(f"Run {run} not found")
+
+        return (
+            "bucket",
+            ["X-Test:1"],
+            {
+                name: {"url": f"{self.server.url}/{run}/{name}"}
+                for name in files
+                if name not in self.no_url
+            },
+        )
+
+
+def test_remote_name(tmp_path):
+    assert remote_name("out/a/b.json") == "out/a/b.json"
+    assert remote_name("out/a/b.json", "out") == "a/b.json"
+    assert remote_name(tmp_path / "b.json") == "b.json"
+
+
+def test_upload_all_across_runs(tmp_path, file_server, monkeypatch):
+    monkeypatch.setattr(upload, "URLS_BATCH_SIZE", 2)
+    monkeypatch.setattr(upload, "RETRY_BACKOFF", 0)
+    items = []
+
+    for run in ["r1", "r2", "gone"]:
+        for i in range(3):
+            path = tmp_path / run / f"{i}.json"
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(f"{run} {i}")
+            items.append((f"e/p/{run}", f"eval/{i}.json", path))
+    (tmp_path / "r1" / "empty.txt").touch()
+    items.append(("e/p/r1", "empty.txt", tmp_path / "r1" / "empty.txt"))
+    file_server.throttle["r2/eval/0.json"] = 2
+    api = FakeApi(file_server, missing_runs=["gone"])
+    moved = []
+    report = upload_all(items, jobs=4, after_upload=moved.append, api=api)
+
+    assert sorted(report.done) == sorted(
+        [f"{r}/eval/{i}.json" for r in ["r1", "r2"] for i in range(3)]
+        + ["r1/empty.txt"]
+    )
+    assert sorted(report.failed) == [f"gone/eval/{i}.json" for i in range(3)]
+    assert file_server.uploads["r2/eval/0.json"] == b"r2 0"
+    assert file_server.uploads["r1/empty.txt"] == b""
+    assert len(moved) == 7
+    # one request for the upload urls per batch of names of each run
+    assert sorted((r[2], len(r[3])) for r in api.requests) == [
+        ("gone", 1),
+        ("gone", 2),
+        ("r1", 2),
+        ("r1", 2),
+        ("r2", 1),
+        ("r2", 2),
+    ]
+
+
+def test_upload_gives_up_after_max_retries(tmp_path, file_server, governor):
+    # the uploads are only retried by the governor of the storage
+    governor(file_server.host).max_retries = 1
+    path = tmp_path / "a.txt"
+    path.write_text("a")
+    file_server.throttle["r1/a.txt"] = 2
+    report = upload_all([("e/p/r1", "a.txt", path)], api=FakeApi(file_server))
+
+    assert list(report.failed) == ["r1/a.txt"]
+    assert "r1/a.txt" not in file_server.uploads
+
+
+def test_upload_without_url_completes_the_progress_bar(
+    tmp_path, file_server, monkeypatch
+):
+    bars = []
+
+    class Bar(tqdm.tqdm):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            bars.append(self)
+
+    monkeypatch.setattr(tqdm, "tqdm", Bar)
+    items = []
+
+    for name in ["a.txt", "b.txt"]:
+        path = tmp_path / name
+        path.write_text("abc")
+        items.append(("e/p/r1", name, path))
+    api = FakeApi(file_server, no_url=["b.txt"])
+    report = upload_all(items, api=api)
+
+    assert report.done == ["r1/a.txt"] and list(report.failed) == ["r1/b.txt"]
+    assert bars[0].n == bars[0].total == 6
+
+
+def test_split_unchanged_hashes_candidates_once(tmp_path, monkeypatch):
+    items = []
+
+    for name, content in [
+        ("same.txt", "same"),
+        ("changed.txt", "new!"),
+        ("resized.txt", "longer"),
+        ("missing.txt", "x"),
+    ]:
+        (tmp_path / name).write_text(content)
+        items.append(("e/p/r1", name, tmp_path / name))
+    remote = {}
+
+    for name, content in [
+        ("same.txt", "same"),
+        ("changed.txt", "old!"),
+        ("resized.txt", "short"),
+    ]:
+        remote[name] = tmp_path / f"remote_{name}"
+        remote[name].write_text(content)
+    run = FakeRun(
+        "r1",
+        [
+            listed_file(n, p.stat().st_size, md5_file(p))
+            for n, p in remote.items()
+        ],
+    )
+    items.append(("e/p/gone", "same.txt", tmp_path / "same.txt"))
+    hashed = []
+    monkeypatch.setattr(
+        manifest, "md5_file", lambda p: hashed.append(p) or md5_file(p)
+    )
+    hashes = Manifest(tmp_path, tmp_path / "cache" / "hashes.json")
+    to_upload, unchanged = split_unchanged(
+        items, {"e/p/r1": run}, jobs=2, hashes=hashes
+    )
+
+    assert [i[1] for i in unchanged] == ["same.txt"]
+    assert [(i[0], i[1]) for i in to_upload] == [
+        ("e/p/r1", "changed.txt"),
+        ("e/p/r1", "resized.txt"),
+        ("e/p/r1", "missing.txt"),
+        ("e/p/gone", "same.txt"),
+    ]
+    # the run is listed once, only the files of the same size are hashed
+    assert run.listings == 1
+    assert len(hashed) == 2
+    # the md5s are cached by size and modification time
+    hashes = Manifest(tmp_path, tmp_path / "cache" / "hashes.json")
+    _, unchanged = split_unchanged(items, {"e/p/r1": run}, hashes=hashes)
+
+    assert [i[1] for i in unchanged] == ["same.txt"]
+    assert len(hashed) == 2